@@ -1,7 +1,15 @@
+import contextlib
+import json
+
 import streamlit as st
 import pandas as pd
-import numpy as np
+import cache
 import calculator
+import graph
+import instrument
+import logistics
+import optimizer
+import results
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -51,6 +59,19 @@ with st.sidebar:
     plant_lifetime = st.slider("Plant Lifetime (years)", 10, 40, 25, 1)
 
     st.markdown("---")
+
+    st.header("4. Delivery")
+    transport_mode = st.selectbox("Transport Mode", ("None", "Truck", "Pipeline", "Ship"),
+                                  help="Cost curves of logistics.py, scaled by the annual production volume.")
+    transport_cost_per_tonne = 0.0
+    if transport_mode != "None":
+        transport_distance_km = st.number_input("Distance to Customer (km)", 10, 20000, 500, 10)
+        transport_cost_per_tonne = float(logistics.transport_cost(transport_mode.lower(), transport_distance_km,
+                                                                  target_ammonia_tonne))
+
+    st.markdown("---")
+    record_performance = st.checkbox("Record performance", key='record_performance',
+                                     help="Time each calculation stage of the next run (shown at the bottom of the page).")
     st.info("© 2025, HWAN-OH. All rights reserved.")
 
 # --- Main Page ---
@@ -68,69 +89,138 @@ with st.expander("View Project Vision & Info"):
     This project shares its philosophy with his core vision, the **[MirrorMind Identity Protocol](https://github.com/HWAN-OH/MirrorMind-Identity-Protocol)**, and acts as a tangible, specialized digital persona with deep expertise in energy economics.
     """)
 
-if st.button("🚀 Run Analysis", use_container_width=True):
-    # --- 1. Reverse Calculation ---
-    total_kwh_needed = calculator.calculate_required_kwh(target_ammonia_tonne)
-    required_re_capacity_kw = calculator.calculate_required_re_capacity(total_kwh_needed, solar_cf, wind_cf, solar_wind_ratio / 100)
-    electrolyzer_capacity_kw = required_re_capacity_kw
-    electrolyzer_utilization = calculator.calculate_electrolyzer_utilization(total_kwh_needed, electrolyzer_capacity_kw)
-
-    # --- 2. Reconstruct config for LCOA calculation ---
-    base_config = {
-        'ELECTROLYZER_CAPACITY_KW': electrolyzer_capacity_kw,
-        'SOLAR_CAPACITY_KW': required_re_capacity_kw * (solar_wind_ratio / 100),
-        'WIND_CAPACITY_KW': required_re_capacity_kw * (1 - solar_wind_ratio / 100),
-        'DISCOUNT_RATE': discount_rate,
-        'PLANT_LIFETIME': plant_lifetime,
-    }
-
-    with st.spinner(f'Analyzing economics for **{energy_strategy}** scenario...'):
-        # --- FIX: Pass 'total_kwh_needed' to the function ---
-        capex_costs = calculator.calculate_capital_costs(
-            base_config, 
-            target_ammonia_tonne,
-            total_kwh_needed, # This argument is now correctly passed
-            energy_strategy, 
-            ess_config, 
-            solar_wind_ratio / 100
-        )
-        
-        opex_costs = calculator.calculate_annual_operating_costs(base_config, capex_costs, total_kwh_needed, energy_strategy, grid_config)
-        lcoa_results = calculator.calculate_lcoa(base_config, capex_costs['total_capex'], opex_costs['total_annual_opex'], target_ammonia_tonne)
-
-    st.success("✅ Analysis Complete!")
-    st.markdown("---")
+# --- Live Analysis ---
+# Each session keeps an incremental calculation graph: when a slider moves,
+# only the stages downstream of the changed input are recomputed, and those
+# are first looked up in the process-wide cache shared by every session.
+if 'graph' not in st.session_state:
+    st.session_state.graph = graph.Graph(shared=cache.graph_nodes)
+recording = instrument.recording() if record_performance else contextlib.nullcontext()
+with recording as recorder, st.spinner(f'Analyzing economics for **{energy_strategy}** scenario...'):
+    analysis = graph.analysis(
+        st.session_state.graph,
+        target_ammonia_tonne=target_ammonia_tonne, strategy=energy_strategy,
+        solar_cf=solar_cf, wind_cf=wind_cf, solar_wind_ratio=solar_wind_ratio / 100,
+        discount_rate=discount_rate, plant_lifetime=plant_lifetime,
+        ess_capex_per_kwh=ess_config.get('capex_per_kwh', st.session_state.graph.parameter('ess_capex_per_kwh')),
+        grid_purchase_price=grid_config.get('purchase_price', st.session_state.graph.parameter('grid_purchase_price')),
+        transport_cost_per_tonne=transport_cost_per_tonne,
+    )
+if recorder is not None:
+    st.session_state.performance = recorder
+electrolyzer_capacity_kw = analysis['electrolyzer_capacity_kw']
+base_config = analysis['base_config']
+capex_costs = analysis['capex_costs']
+opex_costs = analysis['opex_costs']
+lcoa_results = analysis['lcoa_results']
 
-    # --- Display Results ---
-    st.header(f"Analysis Results: *{energy_strategy}*")
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Final LCOA", f"${lcoa_results['lcoa_final']:.2f}", "/tonne-NH3")
-    col2.metric("Total CAPEX", f"${capex_costs['total_capex']/1_000_000:.1f}M")
-    col3.metric("Annual OPEX", f"${opex_costs['total_annual_opex']/1_000_000:.2f}M")
+st.markdown("---")
 
-    tab1, tab2 = st.tabs(["📊 Cost Breakdown", "📋 Infrastructure Specs"])
+# --- Display Results ---
+st.header(f"Analysis Results: *{energy_strategy}*")
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Final LCOA", f"${lcoa_results['lcoa_final']:.2f}", "/tonne-NH3")
+col2.metric("Delivered LCOA", f"${lcoa_results['delivered_lcoa']:.2f}", f"{transport_mode.lower()} delivery"
+            if transport_mode != "None" else "at the plant gate", delta_color="off")
+col3.metric("Total CAPEX", f"${capex_costs['total_capex']/1_000_000:.1f}M")
+col4.metric("Annual OPEX", f"${opex_costs['total_annual_opex']/1_000_000:.2f}M")
+
+tab1, tab2, tab3 = st.tabs(["📊 Cost Breakdown", "📋 Infrastructure Specs", "🧾 All Results"])
+
+with tab1:
+    st.subheader("LCOA Cost Components")
+    if 'breakdown' in lcoa_results and lcoa_results['breakdown']:
+        cost_df = pd.DataFrame.from_dict(
+            lcoa_results['breakdown'], orient='index', columns=['Cost ($/tonne)']
+        )
+        st.bar_chart(cost_df)
+    else:
+        st.warning("Could not generate cost breakdown.")
+
+with tab2:
+    st.subheader("Calculated Infrastructure Specifications")
+    specs = {
+        "Energy Strategy": energy_strategy,
+        "Target Production (tonne/year)": target_ammonia_tonne,
+        "Required Electrolyzer Capacity (MW)": electrolyzer_capacity_kw / 1000,
+        "Required Solar PV Capacity (MW)": base_config['SOLAR_CAPACITY_KW'] / 1000,
+        "Required Wind Power Capacity (MW)": base_config['WIND_CAPACITY_KW'] / 1000,
+    }
+    if energy_strategy == 'ESS Balancing':
+        specs["Calculated ESS Storage Duration (Hours)"] = capex_costs.get('calculated_storage_duration_hours', 0)
+        specs["Required ESS Capacity (MWh)"] = capex_costs.get('ess_capacity_mwh', 0)
+    
+    st.dataframe(pd.Series(specs, name="Value"), use_container_width=True)
 
-    with tab1:
-        st.subheader("LCOA Cost Components")
-        if 'breakdown' in lcoa_results and lcoa_results['breakdown']:
-            cost_df = pd.DataFrame.from_dict(
-                lcoa_results['breakdown'], orient='index', columns=['Cost ($/tonne)']
+with tab3:
+    st.subheader("Every Input and Cost Component")
+    result_table = results.to_table(
+        st.session_state.graph.results(),
+        {name: st.session_state.graph.parameter(name) for name in graph.PARAMETERS if name != 'costs'},
+    )
+    row = results.to_pandas(result_table).iloc[0]
+    st.dataframe(pd.DataFrame({
+        "Value": row.astype(str),
+        "Group": [field.metadata[b'group'].decode() for field in result_table.schema],
+        "Unit": [field.metadata[b'unit'].decode() for field in result_table.schema],
+    }), use_container_width=True)
+    col1, col2 = st.columns(2)
+    col1.download_button("Download results (Parquet)", results.to_bytes(result_table, 'parquet'),
+                         file_name="lcoa-results.parquet", mime="application/vnd.apache.parquet")
+    col2.download_button("Download results (Feather)", results.to_bytes(result_table, 'feather'),
+                         file_name="lcoa-results.feather", mime="application/vnd.apache.arrow.file")
+
+with st.expander("🎯 Optimize Capacities"):
+    st.caption("The sizing above sets the electrolyzer to the required RE capacity. The optimizer instead searches the "
+               "electrolyzer, solar, wind and ESS sizes with the least LCOA that still meet the target under hourly "
+               "dispatch. A repeat run starts from the previous optimum.")
+    previous = st.session_state.get('optimum')
+    if previous is not None and previous['strategy'] != energy_strategy:
+        previous = None  # a warm start needs the same set of design variables
+    if st.button("Optimize", help="Takes a few seconds from scratch, less when warm started."):
+        with st.spinner("Searching capacities..."):
+            st.session_state.optimum = optimizer.optimize_capacity(
+                target_ammonia_tonne, energy_strategy,
+                scenario={name: st.session_state.graph.parameter(name) for name in calculator.SCENARIO_DEFAULTS},
+                initial=previous, efficiency=ess_config.get('efficiency', 0.85),
             )
-            st.bar_chart(cost_df)
+        previous = st.session_state.optimum
+    if previous is not None:
+        design = previous['design']
+        st.metric("Optimized LCOA", f"${previous['lcoa_final']:.2f}",
+                  f"{previous['lcoa_final'] - lcoa_results['lcoa_final']:+.2f} vs. the sizing above", delta_color="inverse")
+        st.dataframe(pd.DataFrame({
+            "Sizing rule": [electrolyzer_capacity_kw / 1000, base_config['SOLAR_CAPACITY_KW'] / 1000,
+                                 base_config['WIND_CAPACITY_KW'] / 1000, capex_costs.get('ess_capacity_mwh', 0)],
+            "Optimized": [design['electrolyzer_capacity_kw'] / 1000, design['solar_capacity_kw'] / 1000,
+                               design['wind_capacity_kw'] / 1000, design['ess_capacity_kwh'] / 1000],
+        }, index=["Electrolyzer (MW)", "Solar PV (MW)", "Wind (MW)", "ESS (MWh)"]), use_container_width=True)
+        st.caption(f"{previous['evaluations']:,} dispatch evaluations in {previous['iterations']} iterations"
+                   f"{'' if previous['feasible'] else '; no design met the target'}.")
+
+with st.expander("⚡ Incremental Evaluation"):
+    recomputed = st.session_state.graph.recomputed
+    st.caption(f"{len(recomputed)} of {len(graph.NODES)} calculation stages recomputed on the last update.")
+    st.write(", ".join(recomputed) if recomputed else "Nothing recomputed; every stage was reused or served from the shared cache.")
+
+with st.expander("⚡ Cache Statistics"):
+    st.dataframe(pd.DataFrame(cache.stats()).T[["hits", "misses", "size", "hit_rate"]], use_container_width=True)
+
+if record_performance and 'performance' in st.session_state:
+    with st.expander("⚡ Performance"):
+        performance = st.session_state.performance
+        summary = performance.summary()
+        memory = f", peak RSS {summary['peak_rss_mb']:.0f} MB" if summary['peak_rss_mb'] is not None else ""
+        st.caption(f"Last run: {summary['wall_ms']:.2f} ms{memory}.")
+        if summary['stages']:
+            st.dataframe(pd.DataFrame.from_dict(summary['stages'], orient='index')[
+                ['category', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'mean_items']], use_container_width=True)
         else:
-            st.warning("Could not generate cost breakdown.")
-
-    with tab2:
-        st.subheader("Calculated Infrastructure Specifications")
-        specs = {
-            "Energy Strategy": energy_strategy,
-            "Target Production (tonne/year)": target_ammonia_tonne,
-            "Required Electrolyzer Capacity (MW)": electrolyzer_capacity_kw / 1000,
-            "Required Solar PV Capacity (MW)": base_config['SOLAR_CAPACITY_KW'] / 1000,
-            "Required Wind Power Capacity (MW)": base_config['WIND_CAPACITY_KW'] / 1000,
-        }
-        if energy_strategy == 'ESS Balancing':
-            specs["Calculated ESS Storage Duration (Hours)"] = capex_costs.get('calculated_storage_duration_hours', 0)
-            specs["Required ESS Capacity (MWh)"] = capex_costs.get('ess_capacity_mwh', 0)
-        
-        st.dataframe(pd.Series(specs, name="Value"), use_container_width=True)
+            st.write("No stage ran; every result was reused.")
+        if summary['caches']:
+            st.dataframe(pd.DataFrame.from_dict(summary['caches'], orient='index'), use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("Download summary (JSON)", json.dumps(summary, indent=1),
+                             file_name="lcoa-profile.json", mime="application/json")
+        col2.download_button("Download Chrome trace", json.dumps(performance.chrome_trace()),
+                             file_name="lcoa-profile.trace.json", mime="application/json")
@@ -0,0 +1,233 @@
+"""Benchmark and performance-regression suite for the cost engine.
+
+Usage:
+    python benchmark.py run --output baseline.json
+    python benchmark.py run --output current.json --quick
+    python benchmark.py compare baseline.json current.json --threshold 0.2
+
+Every case runs in a fresh subprocess so its peak RSS is its own. A case
+records the best wall time over several repeats, throughput (scenarios/s),
+peak RSS (including child processes, for the import cases) and the peak of
+traced Python/NumPy allocations. `compare` flags cases whose time or memory
+grew by more than the threshold, or that are missing from or failed in the
+current run, and exits with status 1, so it can gate changes; `run` also
+exits with status 1 when a case fails. The cases need NumPy, except
+import/app, which imports the app and so needs its requirements too
+(streamlit, pandas, pyarrow); without them that case fails. No network
+access is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Cases ---
+def _scalar_inputs():
+    import calculator
+
+    target = 180000
+    total_kwh_needed = calculator.calculate_required_kwh(target)
+    re_kw = calculator.calculate_required_re_capacity(total_kwh_needed, 0.18, 0.35, 0.5)
+    base_config = {'ELECTROLYZER_CAPACITY_KW': re_kw, 'SOLAR_CAPACITY_KW': re_kw * 0.5,
+                   'WIND_CAPACITY_KW': re_kw * 0.5, 'DISCOUNT_RATE': 0.08, 'PLANT_LIFETIME': 25}
+    return target, total_kwh_needed, base_config
+
+def _stage_case(stage, strategy='Grid Balancing'):
+    def setup():
+        import calculator
+
+        target, total_kwh_needed, base_config = _scalar_inputs()
+        ess_config = {'capex_per_kwh': 350, 'efficiency': 0.85}
+        grid_config = {'purchase_price': 0.15}
+        capex = calculator.calculate_capital_costs(base_config, target, total_kwh_needed, strategy, ess_config, 0.5)
+        calls = {
+            'required_kwh': lambda: calculator.calculate_required_kwh(target),
+            'required_re_capacity': lambda: calculator.calculate_required_re_capacity(total_kwh_needed, 0.18, 0.35, 0.5),
+            'capital_costs': lambda: calculator.calculate_capital_costs(base_config, target, total_kwh_needed,
+                                                                        strategy, ess_config, 0.5),
+            'annual_operating_costs': lambda: calculator.calculate_annual_operating_costs(
+                base_config, capex, total_kwh_needed, strategy, grid_config),
+            'lcoa': lambda: calculator.calculate_lcoa(base_config, capex['total_capex'], 1e8, target),
+        }
+        return calls[stage], 1
+    return setup
+
+def _pipeline_case(n, strategy):
+    def setup():
+        import numpy as np
+
+        import calculator
+
+        rng = np.random.default_rng(0)
+        columns = {
+            'target_ammonia_tonne': rng.uniform(1e4, 1e7, n),
+            'solar_cf': rng.uniform(0.10, 0.30, n),
+            'wind_cf': rng.uniform(0.20, 0.50, n),
+            'solar_wind_ratio': rng.uniform(0, 1, n),
+            'discount_rate': rng.uniform(0.01, 0.15, n),
+            'plant_lifetime': rng.integers(10, 41, n).astype(float),
+            'strategy': strategy,
+        }
+        return lambda: calculator.evaluate_batch(columns), n
+    return setup
+
+def _import_case(module):
+    def setup():
+        command = [sys.executable, '-c', f'import {module}']
+
+        def cold_import():
+            subprocess.run(command, cwd=REPO_DIR, check=True, capture_output=True)
+        return cold_import, 1
+    return setup
+
+CASES = {}
+for _stage in ('required_kwh', 'required_re_capacity', 'capital_costs', 'annual_operating_costs', 'lcoa'):
+    for _strategy in ('Grid Balancing', 'ESS Balancing'):
+        CASES[f"stage/{_stage}/{_strategy.split()[0].lower()}"] = _stage_case(_stage, _strategy)
+for _n in (1, 1_000, 1_000_000):
+    for _strategy in ('Grid Balancing', 'ESS Balancing'):
+        CASES[f"pipeline/{_n}/{_strategy.split()[0].lower()}"] = _pipeline_case(_n, _strategy)
+CASES['import/calculator'] = _import_case('calculator')
+CASES['import/app'] = _import_case('app')
+
+QUICK_CASES = [name for name in CASES if not name.startswith('pipeline/1000000')]
+
+# --- Measurement ---
+def measure_case(name, repeats=5, min_seconds=0.2):
+    """Runs one case in this process and returns its measurements."""
+    func, scenarios = CASES[name]()
+    func()  # warm-up
+
+    number, elapsed = 1, 0.0
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_seconds or number >= 1_000_000:
+            break
+        number *= 10
+    best = min(timeit.repeat(func, number=number, repeat=repeats)) / number
+
+    tracemalloc.start()
+    func()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "scenarios": scenarios,
+        "throughput": scenarios / best if best else float('inf'),
+        "alloc_peak_mb": alloc_peak / 2**20,
+        "peak_rss_mb": max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                           resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024,
+    }
+
+def run_suite(names, repeats=5, report=print):
+    """Measures each case in a fresh process; a case that raises is recorded with its `error`."""
+    results = {}
+    for name in names:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '_case', name, str(repeats)],
+                                   cwd=REPO_DIR, capture_output=True, text=True)
+        if completed.returncode != 0:
+            report(f"{name:42s} FAILED\n{completed.stderr.strip()}")
+            results[name] = {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                             else f"exit code {completed.returncode}"}
+            continue
+        results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+        case = results[name]
+        report(f"{name:42s} {case['seconds'] * 1e3:11.4f} ms {case['throughput']:14,.0f} scen/s "
+               f"{case['peak_rss_mb']:8.1f} MB RSS {case['alloc_peak_mb']:8.2f} MB alloc")
+    return results
+
+def environment():
+    import numpy as np
+
+    return {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+# --- Comparison ---
+def compare(baseline, current, threshold=0.2, memory_threshold=0.2):
+    """Returns a list of (case, metric, baseline, current, change) rows that regressed.
+
+    A baseline case that is missing from the current run or failed in it is a
+    regression too, reported with metric 'missing' or 'failed'.
+    """
+    regressions = []
+    for name, base in baseline['cases'].items():
+        if 'error' in base:
+            continue
+        now = current['cases'].get(name)
+        if now is None or 'error' in now:
+            regressions.append((name, 'missing' if now is None else 'failed', base['seconds'], float('nan'),
+                                float('inf')))
+            continue
+        for metric, limit in (('seconds', threshold), ('peak_rss_mb', memory_threshold),
+                              ('alloc_peak_mb', memory_threshold)):
+            if base[metric] > 0:
+                change = now[metric] / base[metric] - 1
+                if change > limit:
+                    regressions.append((name, metric, base[metric], now[metric], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LCOA cost engine.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="Run the benchmarks and write a JSON baseline")
+    run.add_argument('-o', '--output', default='benchmark-results.json')
+    run.add_argument('--quick', action='store_true', help="Skip the 10^6-scenario cases")
+    run.add_argument('--repeats', type=int, default=5)
+    run.add_argument('--cases', nargs='*', help="Run only cases whose name starts with one of these prefixes")
+    cmp_ = commands.add_parser('compare', help="Flag regressions of CURRENT against BASELINE")
+    cmp_.add_argument('baseline')
+    cmp_.add_argument('current')
+    cmp_.add_argument('--threshold', type=float, default=0.2, help="Allowed relative slowdown (default 0.2)")
+    cmp_.add_argument('--memory-threshold', type=float, default=0.2, help="Allowed relative memory growth")
+    case = commands.add_parser('_case')
+    case.add_argument('name')
+    case.add_argument('repeats', type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == '_case':
+        sys.path.insert(0, REPO_DIR)
+        print(json.dumps(measure_case(args.name, args.repeats)))
+        return 0
+
+    if args.command == 'run':
+        names = QUICK_CASES if args.quick else list(CASES)
+        if args.cases:
+            names = [name for name in names if name.startswith(tuple(args.cases))]
+        results = {"environment": environment(), "cases": run_suite(names, args.repeats)}
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        failed = [name for name, case in results['cases'].items() if 'error' in case]
+        print(f"Wrote {len(results['cases'])} results to {args.output}")
+        if failed:
+            print(f"{len(failed)} case(s) failed: {', '.join(failed)}")
+        return 1 if failed else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold, args.memory_threshold)
+    for name, metric, before, after, change in regressions:
+        if metric in ('missing', 'failed'):
+            print(f"REGRESSION {name:42s} {metric} in the current run")
+        else:
+            print(f"REGRESSION {name:42s} {metric:14s} {before:12.6g} -> {after:12.6g} ({change:+.1%})")
+    print(f"{len(regressions)} regression(s) beyond threshold.")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
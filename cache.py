@@ -0,0 +1,101 @@
+import math
+import threading
+from collections import OrderedDict
+
+import instrument
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_DIGITS = 10
+
+class LRUCache:
+    """Thread-safe, size-bounded mapping with least-recently-used eviction and hit/miss counters.
+
+    Module-level instances live for the whole server process, so they are
+    shared by every Streamlit session it serves.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, name='lru'):
+        self.maxsize = maxsize
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        recorder = instrument.current()
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                if recorder is not None:
+                    recorder.count_cache(self.name, True)
+                return self._data[key]
+            self.misses += 1
+            if recorder is not None:
+                recorder.count_cache(self.name, False)
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def normalize_key(value, digits=DEFAULT_DIGITS):
+    """Hashable key for `value` with floats rounded to `digits` significant digits."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_key(item, digits)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_key(item, digits) for item in value)
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if hasattr(value, 'item'):  # NumPy scalar
+        value = value.item()
+    if isinstance(value, (int, float)):
+        if value == 0 or not math.isfinite(value):
+            return float(value)
+        return round(float(value), digits - 1 - int(math.floor(math.log10(abs(value)))))
+    return value
+
+# --- Shared Graph Node Cache ---
+# graph.Graph instances given this cache look up each node they recompute in
+# it, keyed on the node's normalized inputs, so a scenario already evaluated by
+# any session in the server process is reused instead of recomputed.
+graph_nodes = LRUCache(DEFAULT_MAXSIZE, name='graph_nodes')
+
+CACHES = {"graph_nodes": graph_nodes}
+
+def stats():
+    """Hit/miss statistics of every shared cache."""
+    return {name: shared.stats() for name, shared in CACHES.items()}
+
+def clear():
+    for shared in CACHES.values():
+        shared.clear()
@@ -19,100 +19,314 @@ ESS_OPEX_RATE = 0.01
 
 INFLATION_RATE = 0.02
 
-# --- Calculation Functions ---
-def calculate_required_kwh(target_ammonia_tonne):
-    required_h2_kg = target_ammonia_tonne * H2_KG_PER_TONNE_NH3
-    kwh_per_kg_h2 = H2_LHV / ELECTROLYZER_EFFICIENCY
+# --- Model Assumptions ---
+HOURS_PER_YEAR = 365 * 24
+GRID_SHARE = 0.30
+MIN_STORAGE_HOURS = 6
+MAX_STORAGE_HOURS = 14
+REPLACEMENT_YEAR = 10
+STORAGE_BUFFER_SHARE = 0.1
+
+STRATEGIES = ('Grid Balancing', 'ESS Balancing')
+
+# Constants that batch functions accept as (possibly array-valued) overrides.
+COST_CONSTANTS = (
+    'H2_LHV', 'ELECTROLYZER_EFFICIENCY',
+    'ELECTROLYZER_CAPEX_PER_KW', 'SOLAR_CAPEX_PER_KW', 'WIND_CAPEX_PER_KW',
+    'HB_CAPEX_PER_KW_ELECTROLYZER', 'STORAGE_CAPEX_PER_TONNE',
+    'ELECTROLYZER_OPEX_RATE', 'RE_OPEX_RATE', 'HB_OPEX_RATE',
+    'STORAGE_OPEX_RATE', 'ESS_OPEX_RATE', 'INFLATION_RATE',
+)
+
+# Scenario columns understood by evaluate_batch, with the app's default values.
+SCENARIO_DEFAULTS = {
+    'target_ammonia_tonne': 180000,
+    'solar_cf': 0.18,
+    'wind_cf': 0.35,
+    'solar_wind_ratio': 0.5,
+    'discount_rate': 0.08,
+    'plant_lifetime': 25,
+    'strategy': 'Grid Balancing',
+    'ess_capex_per_kwh': 350,
+    'grid_purchase_price': 0.15,
+    'transport_cost_per_tonne': 0.0,  # delivery to the customer, e.g. from logistics.py
+}
+
+def _constant(costs, name):
+    """Returns a cost constant, preferring an override from `costs`."""
+    if costs is not None and name in costs:
+        return costs[name]
+    return globals()[name]
+
+def _as_float(value):
+    return np.asarray(value, dtype=float)
+
+def ess_mask(strategy):
+    """Boolean mask that is True where the strategy is 'ESS Balancing'."""
+    strategy = np.asarray(strategy)
+    if strategy.dtype == bool:
+        return strategy
+    return strategy == 'ESS Balancing'
+
+# --- Batch Calculation Functions ---
+# Each function takes scalars or NumPy arrays (broadcast against each other)
+# and returns arrays, so a whole scenario grid is evaluated column-wise.
+
+def calculate_required_kwh_batch(target_ammonia_tonne, costs=None):
+    required_h2_kg = _as_float(target_ammonia_tonne) * H2_KG_PER_TONNE_NH3
+    kwh_per_kg_h2 = _constant(costs, 'H2_LHV') / _as_float(_constant(costs, 'ELECTROLYZER_EFFICIENCY'))
     return required_h2_kg * kwh_per_kg_h2
 
-def calculate_required_re_capacity(total_kwh_needed, solar_cf, wind_cf, solar_ratio):
-    avg_re_cf = (solar_cf * solar_ratio) + (wind_cf * (1 - solar_ratio))
-    if avg_re_cf == 0: return 0
-    avg_power_kw = total_kwh_needed / (365 * 24)
-    return avg_power_kw / avg_re_cf
+def calculate_required_re_capacity_batch(total_kwh_needed, solar_cf, wind_cf, solar_ratio):
+    solar_ratio = _as_float(solar_ratio)
+    avg_re_cf = (_as_float(solar_cf) * solar_ratio) + (_as_float(wind_cf) * (1 - solar_ratio))
+    avg_power_kw = _as_float(total_kwh_needed) / HOURS_PER_YEAR
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_re_cf == 0, 0.0, avg_power_kw / avg_re_cf)
 
-def calculate_electrolyzer_utilization(total_kwh_needed, electrolyzer_capacity_kw):
-    if electrolyzer_capacity_kw == 0: return 0
-    return total_kwh_needed / (electrolyzer_capacity_kw * 365 * 24)
+def calculate_electrolyzer_utilization_batch(total_kwh_needed, electrolyzer_capacity_kw):
+    capacity = _as_float(electrolyzer_capacity_kw)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(capacity == 0, 0.0, _as_float(total_kwh_needed) / (capacity * HOURS_PER_YEAR))
 
-# --- FIX: Added 'total_kwh_needed' as an argument ---
-def calculate_capital_costs(base_config, target_ammonia_tonne, total_kwh_needed, strategy, ess_config={}, solar_wind_ratio=0.5):
-    """Calculates total CAPEX based on the selected energy strategy."""
-    electrolyzer_capex = base_config['ELECTROLYZER_CAPACITY_KW'] * ELECTROLYZER_CAPEX_PER_KW
-    solar_capex = base_config['SOLAR_CAPACITY_KW'] * SOLAR_CAPEX_PER_KW
-    wind_capex = base_config['WIND_CAPACITY_KW'] * WIND_CAPEX_PER_KW
-    hb_capex = base_config['ELECTROLYZER_CAPACITY_KW'] * HB_CAPEX_PER_KW_ELECTROLYZER
-    storage_capex = target_ammonia_tonne * 0.1 * STORAGE_CAPEX_PER_TONNE
-    
-    replacement_cost = electrolyzer_capex * ((1 + INFLATION_RATE) ** 10)
-    replacement_pv = replacement_cost / ((1 + base_config['DISCOUNT_RATE']) ** 10)
-    
-    total_capex = electrolyzer_capex + solar_capex + wind_capex + hb_capex + storage_capex + replacement_pv
-    
-    capex_breakdown = {
-        "electrolyzer_capex": electrolyzer_capex, "solar_capex": solar_capex,
-        "wind_capex": wind_capex, "haber_bosch_capex": hb_capex,
-        "storage_capex": storage_capex, "electrolyzer_replacement_pv": replacement_pv
+def calculate_component_capex_batch(electrolyzer_kw, solar_kw, wind_kw, target_ammonia_tonne, costs=None):
+    """CAPEX of each plant component, excluding the replacement and the ESS."""
+    electrolyzer_kw = _as_float(electrolyzer_kw)
+    return {
+        "electrolyzer_capex": electrolyzer_kw * _constant(costs, 'ELECTROLYZER_CAPEX_PER_KW'),
+        "solar_capex": _as_float(solar_kw) * _constant(costs, 'SOLAR_CAPEX_PER_KW'),
+        "wind_capex": _as_float(wind_kw) * _constant(costs, 'WIND_CAPEX_PER_KW'),
+        "haber_bosch_capex": electrolyzer_kw * _constant(costs, 'HB_CAPEX_PER_KW_ELECTROLYZER'),
+        "storage_capex": _as_float(target_ammonia_tonne) * STORAGE_BUFFER_SHARE * _constant(costs, 'STORAGE_CAPEX_PER_TONNE'),
     }
 
-    if strategy == 'ESS Balancing':
-        max_storage_hours = 14
-        min_storage_hours = 6
-        storage_duration_hours = (max_storage_hours - min_storage_hours) * solar_wind_ratio + min_storage_hours
-        
-        # Now this calculation will work correctly
-        avg_power_consumption_kw = total_kwh_needed / (365 * 24)
+def calculate_replacement_pv_batch(electrolyzer_capex, discount_rate, costs=None):
+    """Present value of the single electrolyzer stack replacement at REPLACEMENT_YEAR."""
+    replacement_cost = _as_float(electrolyzer_capex) * ((1 + _as_float(_constant(costs, 'INFLATION_RATE'))) ** REPLACEMENT_YEAR)
+    return replacement_cost / ((1 + _as_float(discount_rate)) ** REPLACEMENT_YEAR)
+
+def calculate_ess_sizing_batch(total_kwh_needed, solar_wind_ratio, ess_capex_per_kwh, is_ess, ess_capacity_kwh=None):
+    """ESS duration, capacity and CAPEX; zero wherever `is_ess` is False.
+
+    Without `ess_capacity_kwh` the ESS is sized by the linear duration rule
+    between MIN_STORAGE_HOURS and MAX_STORAGE_HOURS.
+    """
+    avg_power_consumption_kw = _as_float(total_kwh_needed) / HOURS_PER_YEAR
+    if ess_capacity_kwh is None:
+        storage_duration_hours = (MAX_STORAGE_HOURS - MIN_STORAGE_HOURS) * _as_float(solar_wind_ratio) + MIN_STORAGE_HOURS
         ess_capacity_kwh = avg_power_consumption_kw * storage_duration_hours
-        
-        ess_capex = ess_capacity_kwh * ess_config['capex_per_kwh']
-        total_capex += ess_capex
-        
-        capex_breakdown['ess_capex'] = ess_capex
-        capex_breakdown['ess_capacity_mwh'] = ess_capacity_kwh / 1000
-        capex_breakdown['calculated_storage_duration_hours'] = storage_duration_hours
-
-    capex_breakdown['total_capex'] = total_capex
-    return capex_breakdown
-
-def calculate_annual_operating_costs(base_config, capex_costs, total_kwh_needed, strategy, grid_config={}):
-    """Calculates total annual OPEX based on the selected energy strategy."""
-    electrolyzer_opex = capex_costs['electrolyzer_capex'] * ELECTROLYZER_OPEX_RATE
-    re_opex = (capex_costs['solar_capex'] + capex_costs['wind_capex']) * RE_OPEX_RATE
-    hb_opex = capex_costs['haber_bosch_capex'] * HB_OPEX_RATE
-    storage_opex = capex_costs['storage_capex'] * STORAGE_OPEX_RATE
-    
-    fixed_opex = electrolyzer_opex + re_opex + hb_opex + storage_opex
-    variable_opex = 0
-
-    if strategy == 'Grid Balancing':
-        grid_power_kwh = total_kwh_needed * 0.30
-        variable_opex = grid_power_kwh * grid_config['purchase_price']
-    else: # ESS Balancing
-        ess_opex = capex_costs.get('ess_capex', 0) * ESS_OPEX_RATE
-        fixed_opex += ess_opex
-    
-    total_opex = fixed_opex + variable_opex
-    
+    else:
+        ess_capacity_kwh = _as_float(ess_capacity_kwh)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            storage_duration_hours = np.where(avg_power_consumption_kw == 0, 0.0, ess_capacity_kwh / avg_power_consumption_kw)
+    ess_capex = ess_capacity_kwh * _as_float(ess_capex_per_kwh)
+    return {
+        "ess_capex": np.where(is_ess, ess_capex, 0.0),
+        "ess_capacity_kwh": np.where(is_ess, ess_capacity_kwh, 0.0),
+        "calculated_storage_duration_hours": np.where(is_ess, storage_duration_hours, 0.0),
+    }
+
+def calculate_capital_costs_batch(electrolyzer_kw, solar_kw, wind_kw, target_ammonia_tonne, total_kwh_needed,
+                                  discount_rate, is_ess, ess_capex_per_kwh, solar_wind_ratio, costs=None,
+                                  ess_capacity_kwh=None):
+    """Column-wise equivalent of calculate_capital_costs; `is_ess` selects the ESS branch."""
+    capex = calculate_component_capex_batch(electrolyzer_kw, solar_kw, wind_kw, target_ammonia_tonne, costs)
+    replacement_pv = calculate_replacement_pv_batch(capex["electrolyzer_capex"], discount_rate, costs)
+    ess = calculate_ess_sizing_batch(total_kwh_needed, solar_wind_ratio, ess_capex_per_kwh, is_ess, ess_capacity_kwh)
+    return combine_capital_costs(capex, replacement_pv, ess)
+
+def combine_capital_costs(component_capex, replacement_pv, ess):
+    """Assembles the CAPEX result from component CAPEX, the replacement PV and the ESS sizing."""
+    capex = dict(component_capex)
+    capex["electrolyzer_replacement_pv"] = replacement_pv
+    total_capex = (capex["electrolyzer_capex"] + capex["solar_capex"] + capex["wind_capex"] + capex["haber_bosch_capex"]
+                   + capex["storage_capex"] + capex["electrolyzer_replacement_pv"])
+    capex["ess_capex"] = ess["ess_capex"]
+    capex["ess_capacity_mwh"] = ess["ess_capacity_kwh"] / 1000
+    capex["calculated_storage_duration_hours"] = ess["calculated_storage_duration_hours"]
+    capex["total_capex"] = total_capex + ess["ess_capex"]
+    return capex
+
+def calculate_annual_operating_costs_batch(capex_costs, total_kwh_needed, is_ess, grid_purchase_price, costs=None,
+                                           grid_kwh=None):
+    """Column-wise equivalent of calculate_annual_operating_costs.
+
+    `grid_kwh` replaces the fixed GRID_SHARE assumption when actual grid
+    imports are known, e.g. from dispatch.simulate_dispatch.
+    """
+    electrolyzer_opex = capex_costs['electrolyzer_capex'] * _constant(costs, 'ELECTROLYZER_OPEX_RATE')
+    re_opex = (capex_costs['solar_capex'] + capex_costs['wind_capex']) * _constant(costs, 'RE_OPEX_RATE')
+    hb_opex = capex_costs['haber_bosch_capex'] * _constant(costs, 'HB_OPEX_RATE')
+    storage_opex = capex_costs['storage_capex'] * _constant(costs, 'STORAGE_OPEX_RATE')
+    ess_opex = np.where(is_ess, capex_costs['ess_capex'] * _constant(costs, 'ESS_OPEX_RATE'), 0.0)
+
+    fixed_opex = electrolyzer_opex + re_opex + hb_opex + storage_opex + ess_opex
+
+    if grid_kwh is None:
+        grid_kwh = _as_float(total_kwh_needed) * GRID_SHARE
+    variable_opex = np.where(is_ess, 0.0, _as_float(grid_kwh) * _as_float(grid_purchase_price))
+
     return {
         "fixed_opex": fixed_opex,
         "variable_opex (grid_cost)": variable_opex,
-        "total_annual_opex": total_opex
+        "total_annual_opex": fixed_opex + variable_opex,
+    }
+
+def calculate_crf_batch(discount_rate, plant_lifetime):
+    """Capital recovery factor; NaN where it is undefined (zero discount rate)."""
+    discount_rate = _as_float(discount_rate)
+    growth = (1 + discount_rate) ** _as_float(plant_lifetime)
+    crf_denominator = growth - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(crf_denominator == 0, np.nan, (discount_rate * growth) / crf_denominator)
+
+def calculate_lcoa_batch(total_capex, total_annual_opex, target_ammonia_tonne, discount_rate, plant_lifetime, crf=None):
+    """Column-wise equivalent of calculate_lcoa; invalid rows give an LCOA of 0. A precomputed `crf` may be passed."""
+    target = _as_float(target_ammonia_tonne)
+    if crf is None:
+        crf = calculate_crf_batch(discount_rate, plant_lifetime)
+    valid = (target != 0) & ~np.isnan(crf)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annualized_capex = _as_float(total_capex) * crf
+        total_annual_cost = annualized_capex + total_annual_opex
+        return {
+            "lcoa_final": np.where(valid, total_annual_cost / target, 0.0),
+            "annualized_capex_per_tonne": np.where(valid, annualized_capex / target, 0.0),
+            "opex_per_tonne": np.where(valid, _as_float(total_annual_opex) / target, 0.0),
+            "crf": crf,
+        }
+
+def calculate_delivered_lcoa_batch(lcoa_final, transport_cost_per_tonne):
+    """Production LCOA plus the cost of delivering a tonne to the customer."""
+    transport = _as_float(transport_cost_per_tonne)
+    return {
+        "transport_cost_per_tonne": transport + np.zeros_like(lcoa_final),
+        "delivered_lcoa": lcoa_final + transport,
     }
 
+def _column(scenarios, columns, name):
+    if name in columns:
+        return columns[name]
+    if scenarios is not None:
+        names = scenarios.dtype.names if hasattr(scenarios, 'dtype') and scenarios.dtype.names else scenarios
+        if name in names:
+            return np.asarray(scenarios[name])
+    return None
+
+def evaluate_batch(scenarios=None, costs=None, **columns):
+    """Runs the full CAPEX -> OPEX -> CRF -> LCOA chain for many scenarios at once.
+
+    Scenarios are given as a DataFrame, structured array or mapping of columns
+    (see SCENARIO_DEFAULTS for the names; `solar_wind_ratio` is a 0-1 fraction),
+    and/or as keyword arrays which take precedence. The strategy is either a
+    `strategy` column of strategy names or a boolean `ess` column. Capacities
+    default to the app's sizing rule (electrolyzer = required RE capacity) but can
+    be passed as `electrolyzer_capacity_kw`, `solar_capacity_kw`,
+    `wind_capacity_kw` and `ess_capacity_kwh`. A `grid_kwh` column (e.g. from
+    dispatch.simulate_dispatch) replaces the fixed grid share in the OPEX, and
+    `transport_cost_per_tonne` (e.g. from logistics.py) gives `delivered_lcoa`.
+
+    Returns a dict of equally shaped arrays, one per result column.
+    """
+    def get(name):
+        value = _column(scenarios, columns, name)
+        return SCENARIO_DEFAULTS.get(name) if value is None else value
+
+    ess = _column(scenarios, columns, 'ess')
+    is_ess = ess_mask(get('strategy') if ess is None else ess)
+
+    overrides = {name: get(name) for name in ('electrolyzer_capacity_kw', 'solar_capacity_kw', 'wind_capacity_kw',
+                                              'ess_capacity_kwh', 'grid_kwh')}
+    inputs = [_as_float(get('target_ammonia_tonne')), _as_float(get('solar_cf')), _as_float(get('wind_cf')),
+              _as_float(get('solar_wind_ratio')), _as_float(get('discount_rate')), _as_float(get('plant_lifetime')),
+              _as_float(get('ess_capex_per_kwh')), _as_float(get('grid_purchase_price')),
+              _as_float(get('transport_cost_per_tonne')), is_ess]
+    shape = np.broadcast_shapes(*(np.shape(value) for value in inputs + list(overrides.values()) if value is not None))
+    (target, solar_cf, wind_cf, ratio, discount_rate, lifetime, ess_capex_per_kwh, grid_price, transport,
+     is_ess) = (np.broadcast_to(value, shape) for value in inputs)
+    overrides = {name: None if value is None else np.broadcast_to(_as_float(value), shape)
+                 for name, value in overrides.items()}
+
+    total_kwh_needed = calculate_required_kwh_batch(target, costs)
+    re_capacity_kw = calculate_required_re_capacity_batch(total_kwh_needed, solar_cf, wind_cf, ratio)
+
+    electrolyzer_kw = overrides['electrolyzer_capacity_kw']
+    electrolyzer_kw = re_capacity_kw if electrolyzer_kw is None else electrolyzer_kw
+    solar_kw = overrides['solar_capacity_kw']
+    solar_kw = re_capacity_kw * ratio if solar_kw is None else solar_kw
+    wind_kw = overrides['wind_capacity_kw']
+    wind_kw = re_capacity_kw * (1 - ratio) if wind_kw is None else wind_kw
+
+    capex = calculate_capital_costs_batch(electrolyzer_kw, solar_kw, wind_kw, target, total_kwh_needed,
+                                          discount_rate, is_ess, ess_capex_per_kwh, ratio, costs,
+                                          overrides['ess_capacity_kwh'])
+    opex = calculate_annual_operating_costs_batch(capex, total_kwh_needed, is_ess, grid_price, costs,
+                                                  overrides['grid_kwh'])
+    lcoa = calculate_lcoa_batch(capex['total_capex'], opex['total_annual_opex'], target, discount_rate, lifetime)
+
+    results = {
+        "total_kwh_needed": total_kwh_needed,
+        "electrolyzer_capacity_kw": electrolyzer_kw,
+        "solar_capacity_kw": solar_kw,
+        "wind_capacity_kw": wind_kw,
+        "electrolyzer_utilization": calculate_electrolyzer_utilization_batch(total_kwh_needed, electrolyzer_kw),
+        "ess": is_ess,
+    }
+    results.update(capex)
+    results.update(opex)
+    results.update(lcoa)
+    results.update(calculate_delivered_lcoa_batch(lcoa['lcoa_final'], transport))
+    return results
+
+# --- Calculation Functions ---
+def calculate_required_kwh(target_ammonia_tonne):
+    return float(calculate_required_kwh_batch(target_ammonia_tonne))
+
+def calculate_required_re_capacity(total_kwh_needed, solar_cf, wind_cf, solar_ratio):
+    return float(calculate_required_re_capacity_batch(total_kwh_needed, solar_cf, wind_cf, solar_ratio))
+
+def calculate_electrolyzer_utilization(total_kwh_needed, electrolyzer_capacity_kw):
+    return float(calculate_electrolyzer_utilization_batch(total_kwh_needed, electrolyzer_capacity_kw))
+
+# --- FIX: Added 'total_kwh_needed' as an argument ---
+def calculate_capital_costs(base_config, target_ammonia_tonne, total_kwh_needed, strategy, ess_config={}, solar_wind_ratio=0.5):
+    """Calculates total CAPEX based on the selected energy strategy."""
+    is_ess = strategy == 'ESS Balancing'
+    capex = calculate_capital_costs_batch(
+        base_config['ELECTROLYZER_CAPACITY_KW'], base_config['SOLAR_CAPACITY_KW'], base_config['WIND_CAPACITY_KW'],
+        target_ammonia_tonne, total_kwh_needed, base_config['DISCOUNT_RATE'],
+        is_ess, ess_config['capex_per_kwh'] if is_ess else 0, solar_wind_ratio
+    )
+
+    keys = ["electrolyzer_capex", "solar_capex", "wind_capex", "haber_bosch_capex",
+            "storage_capex", "electrolyzer_replacement_pv"]
+    if is_ess:
+        keys += ["ess_capex", "ess_capacity_mwh", "calculated_storage_duration_hours"]
+    keys.append("total_capex")
+    return {key: float(capex[key]) for key in keys}
+
+def calculate_annual_operating_costs(base_config, capex_costs, total_kwh_needed, strategy, grid_config={}, grid_kwh=None):
+    """Calculates total annual OPEX based on the selected energy strategy.
+
+    Pass `grid_kwh` from an hourly dispatch simulation to price actual grid
+    imports instead of the fixed GRID_SHARE of `total_kwh_needed`.
+    """
+    is_ess = strategy == 'ESS Balancing'
+    capex_costs = dict(capex_costs, ess_capex=capex_costs.get('ess_capex', 0))
+    opex = calculate_annual_operating_costs_batch(
+        capex_costs, total_kwh_needed, is_ess, 0 if is_ess else grid_config['purchase_price'], grid_kwh=grid_kwh
+    )
+    return {key: float(value) for key, value in opex.items()}
+
 def calculate_lcoa(base_config, total_capex, total_annual_opex, target_ammonia_tonne):
-    if target_ammonia_tonne == 0: return {"lcoa_final": 0, "breakdown": {}}
-
-    crf_denominator = ((1 + base_config['DISCOUNT_RATE']) ** base_config['PLANT_LIFETIME']) - 1
-    if crf_denominator == 0: return {"lcoa_final": 0, "breakdown": {}}
-    crf = (base_config['DISCOUNT_RATE'] * (1 + base_config['DISCOUNT_RATE']) ** base_config['PLANT_LIFETIME']) / crf_denominator
-          
-    annualized_capex = total_capex * crf
-    total_annual_cost = annualized_capex + total_annual_opex
-    lcoa_final = total_annual_cost / target_ammonia_tonne
-    
+    lcoa = calculate_lcoa_batch(total_capex, total_annual_opex, target_ammonia_tonne,
+                                base_config['DISCOUNT_RATE'], base_config['PLANT_LIFETIME'])
+    if target_ammonia_tonne == 0 or np.isnan(lcoa['crf']): return {"lcoa_final": 0, "breakdown": {}}
+
     breakdown = {
-        "Annualized CAPEX": annualized_capex / target_ammonia_tonne,
-        "Annual OPEX": total_annual_opex / target_ammonia_tonne
+        "Annualized CAPEX": float(lcoa['annualized_capex_per_tonne']),
+        "Annual OPEX": float(lcoa['opex_per_tonne'])
     }
-    
-    return {"lcoa_final": lcoa_final, "breakdown": breakdown}
+
+    return {"lcoa_final": float(lcoa['lcoa_final']), "breakdown": breakdown}
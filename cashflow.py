@@ -0,0 +1,181 @@
+import numpy as np
+
+import calculator
+
+# --- Financial Assumptions ---
+# Defaults for the annual cash-flow model. Each can be overridden per scenario
+# by a column of the same name. Prices and costs are nominal and escalate with
+# INFLATION_RATE from the first operating year; the discount rate is nominal.
+FINANCE_DEFAULTS = {
+    'ammonia_price': 700.0,                               # USD per tonne in year 1
+    'construction_years': 2,                              # initial CAPEX is spread evenly over these years
+    'replacement_interval': calculator.REPLACEMENT_YEAR,  # stack replaced every N operating years (0 = never)
+    'replacement_share': 1.0,                             # replacement cost as a share of electrolyzer CAPEX
+    'degradation_rate': 0.01,                             # annual output decline of an ageing stack
+    'tax_rate': 0.25,
+    'depreciation_years': 10,                             # straight-line, per capital outlay
+}
+
+IRR_BRACKET = (-0.9, 1.0)
+IRR_GRID_POINTS = 77
+IRR_TOLERANCE = 1e-7
+IRR_MAX_ITERATIONS = 100
+
+def _value(scenarios, columns, name, shape):
+    """A scenario or finance column as a (scenario, 1) array, or (1, 1) when it is a single value.
+
+    Keeping shared values unexpanded lets (scenario, year) expressions of them
+    be computed once per year instead of once per cell.
+    """
+    value = calculator._column(scenarios, columns, name)
+    if value is None:
+        value = FINANCE_DEFAULTS[name] if name in FINANCE_DEFAULTS else calculator.SCENARIO_DEFAULTS[name]
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0 or np.all(value == value.flat[0]):
+        return value.reshape(-1)[:1].reshape(1, 1)
+    return np.broadcast_to(value, shape).reshape(-1, 1)
+
+# --- Cash Flows ---
+def cash_flows(scenarios=None, costs=None, **columns):
+    """Year-by-year cash flows of every scenario as (scenario, year) arrays.
+
+    Takes scenarios the same way as calculator.evaluate_batch, plus the
+    FINANCE_DEFAULTS columns. Year 0 is the last construction year; years
+    1..plant_lifetime are operating years, and years past a scenario's
+    lifetime are zero. The electrolyzer stack is replaced every
+    `replacement_interval` years (the stack's degradation resets), each
+    capital outlay is depreciated straight-line, and income tax is charged on
+    positive taxable income. Returns a dict with `years` and the flow arrays.
+    """
+    r = calculator.evaluate_batch(scenarios, costs, **columns)
+    shape = r['lcoa_final'].shape
+    f = {name: _value(scenarios, columns, name, shape) for name in FINANCE_DEFAULTS}
+    lifetime = np.floor(_value(scenarios, columns, 'plant_lifetime', shape))
+    target = _value(scenarios, columns, 'target_ammonia_tonne', shape)
+    inflation = np.asarray(calculator._constant(costs, 'INFLATION_RATE'), dtype=float)
+    inflation = inflation.reshape(1, 1) if inflation.ndim == 0 else np.broadcast_to(inflation, shape).reshape(-1, 1)
+    construction = np.maximum(f['construction_years'], 1)
+
+    years = np.arange(1 - int(construction.max()), int(lifetime.max()) + 1)
+    t = years[None, :]
+    operating = (t >= 1) & (t <= lifetime)
+    escalation = (1 + inflation) ** np.maximum(t - 1, 0)
+
+    # Stack replacement schedule and the degradation it resets.
+    interval = np.where(f['replacement_interval'] > 0, f['replacement_interval'], np.inf)
+    replaced = (t >= 1) & (t % interval == 0) & (t < lifetime)
+    stack_age = np.where(np.isinf(interval), t - 1, (t - 1) % interval)
+    output = np.where(operating, target * (1 - f['degradation_rate']) ** stack_age, 0.0)
+
+    # Initial CAPEX without the CRF model's discounted replacement; replacements are scheduled explicitly.
+    initial_capex = (r['total_capex'] - r['electrolyzer_replacement_pv']).reshape(-1, 1)
+    replacement_cost = r['electrolyzer_capex'].reshape(-1, 1) * f['replacement_share']
+    capex = (np.where((t <= 0) & (t > -construction), initial_capex / construction, 0.0)
+             + np.where(replaced, replacement_cost * (1 + inflation) ** t, 0.0))
+
+    opex = np.where(operating, r['total_annual_opex'].reshape(-1, 1) * escalation, 0.0)
+    revenue = output * (f['ammonia_price'] * escalation)
+
+    # Straight-line depreciation: outlays made up to year t-1 (construction
+    # spend counts as made in year 0) are written off over depreciation_years.
+    placed = np.cumsum(capex, axis=1)
+    def placed_by(year):
+        column = np.clip(year - years[0], 0, len(years) - 1).astype(np.intp)
+        cumulative = placed[:, column[0]] if len(column) == 1 else np.take_along_axis(placed, column, axis=1)
+        return np.where(year >= 0, cumulative, 0.0)
+    depreciable = placed_by(t - 1) - placed_by(t - 1 - f['depreciation_years'])
+    depreciation = np.where(operating, depreciable / f['depreciation_years'], 0.0)
+
+    tax = f['tax_rate'] * np.maximum(revenue - opex - depreciation, 0.0)
+    return {
+        "years": years,
+        "output_tonne": np.broadcast_to(output, capex.shape),
+        "revenue": np.broadcast_to(revenue, capex.shape),
+        "capex": capex,
+        "opex": opex,
+        "depreciation": depreciation,
+        "tax": tax,
+        "net_cash_flow": revenue - opex - capex - tax,
+    }
+
+# --- Discounting ---
+def discount_factors(rate, years):
+    """(scenario, year) discount factors to year 0; a single rate gives one shared row."""
+    return np.exp(-np.log1p(np.asarray(rate, dtype=float)).reshape(-1, 1) * years[None, :])
+
+def npv_batch(flows, rate, years):
+    return (flows * discount_factors(rate, years)).sum(axis=1)
+
+def irr_batch(flows, years, bracket=IRR_BRACKET, grid_points=IRR_GRID_POINTS, tolerance=IRR_TOLERANCE,
+              max_iterations=IRR_MAX_ITERATIONS):
+    """Internal rate of return of every row of `flows`, vectorized over scenarios.
+
+    NPV is first evaluated on a rate grid shared by all rows (one matrix
+    product), which brackets the highest root in `bracket`; stack
+    replacements can give cash flows several sign changes, so the bracket
+    also picks the root consistently. Newton steps safeguarded by bisection
+    from the secant point refine it, re-evaluating only the rows still converging. Rows
+    without a root in `bracket`, or not converged within `max_iterations`,
+    give NaN.
+    """
+    flows = np.asarray(flows, dtype=float)
+    years = np.asarray(years, dtype=float)
+    grid = np.linspace(*bracket, grid_points)
+    npv_grid = flows @ discount_factors(grid, years).T
+    positive = npv_grid > 0
+    change = positive[:, :-1] != positive[:, 1:]
+    irr = np.full(len(flows), np.nan)
+    active = np.flatnonzero(change.any(axis=1))
+    last = grid_points - 2 - np.argmax(change[active, ::-1], axis=1)
+    low = grid[last]
+    high = grid[last + 1]
+    low_positive = positive[active, last]
+    npv_low = npv_grid[active, last]
+    npv_high = npv_grid[active, last + 1]
+    rate = low - npv_low * (high - low) / (npv_high - npv_low)  # secant start inside the bracket
+
+    for _ in range(max_iterations):
+        if not active.size:
+            break
+        weighted = flows[active] * discount_factors(rate, years)
+        npv = weighted.sum(axis=1)
+        slope = -(weighted @ years) / (1 + rate)
+
+        below = (npv > 0) == low_positive
+        low = np.where(below, rate, low)
+        high = np.where(below, high, rate)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = rate - npv / slope
+        new_rate = np.where(np.isfinite(step) & (step > low) & (step < high), step, (low + high) / 2)
+
+        done = (np.abs(new_rate - rate) < tolerance) | (npv == 0)
+        irr[active[done]] = new_rate[done]
+        active, rate, low, high, low_positive = (
+            value[~done] for value in (active, new_rate, low, high, low_positive))
+    return irr  # rows still active after max_iterations stay NaN
+
+# --- Scenario Metrics ---
+def evaluate_cash_flows(scenarios=None, costs=None, **columns):
+    """NPV, IRR and discounted LCOA of every scenario from its annual cash flows.
+
+    The LCOA is the present value of CAPEX and OPEX over the present value of
+    the (degrading) output, discounted at each scenario's discount rate.
+    Returns a dict of per-scenario arrays.
+    """
+    flows = cash_flows(scenarios, costs, **columns)
+    years = flows['years']
+    rate = _value(scenarios, columns, 'discount_rate', flows['net_cash_flow'].shape[:1])
+    factors = discount_factors(rate, years)
+
+    pv_cost = ((flows['capex'] + flows['opex']) * factors).sum(axis=1)
+    pv_output = (flows['output_tonne'] * factors).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lcoa = np.where(pv_output > 0, pv_cost / pv_output, np.nan)
+    return {
+        "npv": (flows['net_cash_flow'] * factors).sum(axis=1),
+        "irr": irr_batch(flows['net_cash_flow'], years),
+        "lcoa": lcoa,
+        "pv_cost": pv_cost,
+        "pv_output_tonne": pv_output,
+        "pv_tax": (flows['tax'] * factors).sum(axis=1),
+    }
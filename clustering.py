@@ -0,0 +1,348 @@
+"""Representative-period reduction of hourly solar/wind profiles for fast dispatch studies.
+
+Usage:
+    python clustering.py --periods 12 --period-hours 24 --scenarios 200
+    python clustering.py --store profile_store --site S001 --year 2019 --method kmedoids --periods 8
+
+The year is cut into days (or weeks), the periods are clustered on their
+normalized solar and wind shapes, and one representative per cluster stands
+in for its members. The order of the original periods is kept as a sequence
+of cluster labels, so storage state of charge still carries over from one
+period to the next. The CLI reports the LCOA error and speed-up against the
+full hourly simulation.
+
+The results are approximations, not a reproduction of the hourly run.
+Measured on the synthetic profiles against dispatch.simulate_dispatch
+(random scenarios, half with storage):
+
+    12 days, 2 SOC levels (default)   LCOA error max 3.7%, mean 0.8-1.0%;
+                                      10.7x faster at 1,000 scenarios,
+                                      9.7x at 2,000, ~20x at 100
+    12 days, 3 SOC levels             same error; 8.2-8.6x faster
+    4 weeks                           LCOA error max 12.3%, mean 3.0%; 6.9x
+
+The error comes from the clustering itself (averaged periods smooth the
+peaks that drive grid import), so more SOC levels cost time without
+improving it; more periods do. Always check lcoa_error on your own
+profiles before relying on the reduced run.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import calculator
+import dispatch
+
+DEFAULT_PERIODS = 12
+DEFAULT_PERIOD_HOURS = 24
+DEFAULT_SOC_LEVELS = 2
+BATCH_COLUMNS = 8192
+METHODS = ('kmeans', 'kmedoids')
+
+# --- Clustering ---
+def _kmeans_plus_plus(x, k, rng):
+    centers = [x[rng.integers(len(x))]]
+    distance = ((x - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distance.sum()
+        index = rng.choice(len(x), p=distance / total) if total > 0 else rng.integers(len(x))
+        centers.append(x[index])
+        distance = np.minimum(distance, ((x - x[index]) ** 2).sum(axis=1))
+    return np.array(centers)
+
+def _squared_distances(x, centers):
+    return ((x ** 2).sum(axis=1)[:, None] - 2 * x @ centers.T + (centers ** 2).sum(axis=1)[None, :]).clip(0)
+
+def kmeans(x, k, seed=0, n_init=4, max_iterations=100):
+    """Lloyd's k-means with k-means++ starts; returns (labels, centers, inertia) of the best start."""
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(n_init):
+        centers = _kmeans_plus_plus(x, k, rng)
+        for _ in range(max_iterations):
+            distance = _squared_distances(x, centers)
+            labels = distance.argmin(axis=1)
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, x)
+            new_centers = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+            for empty in np.flatnonzero(counts == 0):  # reseed on the worst-served period
+                new_centers[empty] = x[distance.min(axis=1).argmax()]
+            if np.allclose(new_centers, centers):
+                break
+            centers = new_centers
+        labels = _squared_distances(x, centers).argmin(axis=1)
+        inertia = float(((x - centers[labels]) ** 2).sum())
+        if best is None or inertia < best[2]:
+            best = (labels, centers, inertia)
+    return best
+
+def kmedoids(x, k, seed=0, n_init=4, max_iterations=100):
+    """Alternating k-medoids on the full distance matrix; returns (labels, medoid indices, inertia)."""
+    rng = np.random.default_rng(seed)
+    distance = _squared_distances(x, x)
+    best = None
+    for _ in range(n_init):
+        start = _kmeans_plus_plus(x, k, rng)
+        medoids = _squared_distances(start, x).argmin(axis=1)
+        for _ in range(max_iterations):
+            labels = distance[:, medoids].argmin(axis=1)
+            new_medoids = medoids.copy()
+            for cluster in range(k):
+                members = np.flatnonzero(labels == cluster)
+                if members.size:
+                    new_medoids[cluster] = members[distance[np.ix_(members, members)].sum(axis=1).argmin()]
+            if np.array_equal(new_medoids, medoids):
+                break
+            medoids = new_medoids
+        labels = distance[:, medoids].argmin(axis=1)
+        inertia = float(distance[np.arange(len(x)), medoids[labels]].sum())
+        if best is None or inertia < best[2]:
+            best = (labels, medoids, inertia)
+    return best
+
+# --- Representative Periods ---
+class RepresentativePeriods:
+    """Representative solar/wind periods, their weights and the chronological cluster sequence.
+
+    `solar` and `wind` are (cluster, hour) capacity factors, `weights` the
+    number of original periods each cluster stands for, and `sequence` the
+    cluster of every original period in order.
+    """
+
+    def __init__(self, solar, wind, sequence, period_hours, inertia=None):
+        self.solar = solar
+        self.wind = wind
+        self.sequence = sequence
+        self.period_hours = period_hours
+        self.weights = np.bincount(sequence, minlength=len(solar))
+        self.inertia = inertia
+
+    @property
+    def n_periods(self):
+        return len(self.solar)
+
+    def expand(self):
+        """Full-length (solar, wind) profiles rebuilt from the representatives in chronological order."""
+        return self.solar[self.sequence].reshape(-1), self.wind[self.sequence].reshape(-1)
+
+    def simulate(self, solar_kw, wind_kw, electrolyzer_kw, load_kw, ess_kwh=0.0, ess_kw=None, efficiency=0.85,
+                 allow_grid=True, initial_soc=0.5, soc_levels=DEFAULT_SOC_LEVELS):
+        """Approximate annual dispatch of many scenarios from the representative periods.
+
+        The totals estimate those of dispatch.simulate_dispatch on the full
+        profiles; lcoa_error reports how far apart they are.
+
+        Every representative period is simulated once, all of them side by
+        side, from `soc_levels` starting states of charge. Walking the
+        sequence then chains the periods: each one starts from the state
+        where the previous one ended, and its energy totals and end state are
+        interpolated between the simulated starting levels. More levels (and
+        more or shorter periods) trade speed for accuracy.
+        """
+        n = np.broadcast(*(np.asarray(value) for value in (solar_kw, wind_kw, electrolyzer_kw, load_kw, ess_kwh,
+                                                            allow_grid, initial_soc))).size
+
+        def per_scenario(value, dtype=float):
+            return np.broadcast_to(np.asarray(value, dtype=dtype), (n,))
+
+        plant = {name: per_scenario(value) for name, value in (
+            ('solar_kw', solar_kw), ('wind_kw', wind_kw), ('electrolyzer_kw', electrolyzer_kw), ('load_kw', load_kw),
+            ('ess_kwh', ess_kwh), ('ess_kw', np.inf if ess_kw is None else ess_kw), ('efficiency', efficiency))}
+        plant['allow_grid'] = per_scenario(allow_grid, bool)
+        initial_soc = per_scenario(initial_soc)
+        names = ("re_kwh", "direct_kwh", "grid_kwh", "curtailed_kwh", "unserved_kwh",
+                 "ess_charge_kwh", "ess_discharge_kwh")
+        totals = np.zeros((len(names), n))
+        final_soc = initial_soc.copy()
+
+        # Without storage the periods are independent: weight each cluster's totals by its size.
+        rows = np.flatnonzero(plant['ess_kwh'] <= 0)
+        if rows.size:
+            period = self._simulate_periods(plant, rows, np.zeros(1), names)[0]  # (name, cluster, 1, row)
+            totals[:, rows] = np.einsum('c,ncr->nr', self.weights, period[:, :, 0])
+
+        levels = np.linspace(0, 1, max(soc_levels, 2))
+        storage = np.flatnonzero(plant['ess_kwh'] > 0)
+        if storage.size:
+            period = np.empty((len(names), self.n_periods, len(levels), storage.size))
+            end_soc = np.empty((self.n_periods, len(levels), storage.size))
+            chunk = max(1, BATCH_COLUMNS // (self.n_periods * len(levels)))
+            for start in range(0, storage.size, chunk):  # keeps each dispatch batch small enough to stay in cache
+                rows = slice(start, start + chunk)
+                period[:, :, :, rows], end_soc[:, :, rows] = self._simulate_periods(plant, storage[rows], levels, names)
+
+            # Walk the sequence on the end states only, recording which (period,
+            # starting level) pair each step interpolates; the totals are linear in
+            # the accumulated weights. End states are laid out (cluster, row, level)
+            # so each step is two flat gathers.
+            n_levels, m = len(levels), storage.size
+            flat_end = end_soc.transpose(0, 2, 1).reshape(self.n_periods, m * n_levels)
+            base = np.arange(m) * n_levels
+            index = np.empty((len(self.sequence), m), dtype=np.intp)
+            shares = np.empty((len(self.sequence), m))
+            soc = initial_soc[storage]
+            for step, cluster in enumerate(self.sequence):
+                position = soc * (n_levels - 1)
+                low = np.minimum(position.astype(np.intp), n_levels - 2)
+                share = position - low
+                index[step] = cluster * m * n_levels + base + low
+                shares[step] = share
+                ends = flat_end[cluster]
+                soc = ends[base + low] * (1 - share) + ends[base + low + 1] * share
+            size = self.n_periods * m * n_levels
+            weight = (np.bincount(index.ravel(), (1 - shares).ravel(), size)
+                      + np.bincount(index.ravel() + 1, shares.ravel(), size))
+            weight = weight.reshape(self.n_periods, m, n_levels).transpose(0, 2, 1)
+            totals[:, storage] = np.einsum('clr,nclr->nr', weight, period)
+            final_soc[storage] = soc
+
+        annual = calculator.HOURS_PER_YEAR / (len(self.sequence) * self.period_hours)
+        results = dispatch.summarize({name: totals[i] * annual for i, name in enumerate(names)},
+                                     plant['electrolyzer_kw'], plant['ess_kwh'])
+        results["final_soc"] = final_soc
+        return results
+
+    def _simulate_periods(self, plant, rows, levels, names):
+        """Period totals (name, cluster, level, row) and end states (cluster, level, row) in one dispatch batch."""
+        k, n_levels, n_rows = self.n_periods, len(levels), rows.size
+        shape = (k, n_levels, n_rows)
+
+        def tiled(value):
+            return np.broadcast_to(value[rows], shape).reshape(-1)
+
+        flows = dispatch.simulate_dispatch(
+            np.repeat(self.solar, n_levels * n_rows, axis=0), np.repeat(self.wind, n_levels * n_rows, axis=0),
+            tiled(plant['solar_kw']), tiled(plant['wind_kw']), tiled(plant['electrolyzer_kw']),
+            tiled(plant['load_kw']), ess_kwh=tiled(plant['ess_kwh']), ess_kw=tiled(plant['ess_kw']),
+            efficiency=tiled(plant['efficiency']), allow_grid=tiled(plant['allow_grid']),
+            initial_soc=np.broadcast_to(levels[None, :, None], shape).reshape(-1),
+        )
+        per_period = self.period_hours / calculator.HOURS_PER_YEAR  # undo the annual scaling
+        period = np.stack([flows[name].reshape(shape) * per_period for name in names])
+        return period, flows['final_soc'].reshape(shape)
+
+def reduce_profiles(solar_profile, wind_profile, n_periods=DEFAULT_PERIODS, period_hours=DEFAULT_PERIOD_HOURS,
+                    method='kmeans', seed=0, n_init=4):
+    """Clusters hourly profiles into `n_periods` representative periods of `period_hours` hours.
+
+    Periods are compared on their solar and wind shapes, each variable
+    normalized by its peak so both count equally. 'kmeans' represents a
+    cluster by its mean profile, which keeps annual energy exact; 'kmedoids'
+    by its most central actual period. Hours after the last whole period are
+    dropped.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown clustering method '{method}'; expected one of {METHODS}")
+    solar_profile = np.asarray(solar_profile, dtype=float)
+    wind_profile = np.asarray(wind_profile, dtype=float)
+    count = len(solar_profile) // period_hours
+    if count < n_periods:
+        raise ValueError(f"{len(solar_profile)} hours hold only {count} periods of {period_hours} hours")
+    solar = solar_profile[:count * period_hours].reshape(count, period_hours)
+    wind = wind_profile[:count * period_hours].reshape(count, period_hours)
+    features = np.hstack([solar / max(solar.max(), 1e-12), wind / max(wind.max(), 1e-12)])
+
+    if method == 'kmeans':
+        labels, _, inertia = kmeans(features, n_periods, seed, n_init)
+        counts = np.bincount(labels, minlength=n_periods)[:, None]
+        solar_rep = np.zeros((n_periods, period_hours))
+        wind_rep = np.zeros((n_periods, period_hours))
+        np.add.at(solar_rep, labels, solar)
+        np.add.at(wind_rep, labels, wind)
+        solar_rep, wind_rep = solar_rep / np.maximum(counts, 1), wind_rep / np.maximum(counts, 1)
+    else:
+        labels, medoids, inertia = kmedoids(features, n_periods, seed, n_init)
+        solar_rep, wind_rep = solar[medoids], wind[medoids]
+    return RepresentativePeriods(solar_rep, wind_rep, labels, period_hours, inertia)
+
+# --- Accuracy Against the Full Run ---
+def _plant(sizing):
+    return dict(
+        solar_kw=sizing['solar_capacity_kw'], wind_kw=sizing['wind_capacity_kw'],
+        electrolyzer_kw=sizing['electrolyzer_capacity_kw'], load_kw=dispatch.firm_load_kw(sizing['total_kwh_needed']),
+        ess_kwh=sizing['ess_capacity_mwh'] * 1000, allow_grid=~sizing['ess'],
+    )
+
+def dispatch_lcoa(flows, sizing, scenarios=None, costs=None, **columns):
+    """LCOA per tonne actually produced, with the grid imports of a dispatch run.
+
+    Energy the dispatch could not serve lowers output, so shortfalls (mostly
+    under ESS balancing) show up in the LCOA.
+    """
+    results = calculator.evaluate_batch(scenarios, costs, grid_kwh=flows['grid_kwh'], **columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        produced = np.minimum(flows['electrolyzer_kwh'] / sizing['total_kwh_needed'], 1.0)
+        return np.where(produced > 0, results['lcoa_final'] / produced, np.inf)
+
+def lcoa_error(reduced, solar_profile, wind_profile, scenarios=None, costs=None, efficiency=0.85,
+               soc_levels=DEFAULT_SOC_LEVELS, **columns):
+    """Runs scenarios on the full profiles and on `reduced`; returns both LCOAs, their errors and the timings.
+
+    Scenarios are given as for calculator.evaluate_batch and sized with the
+    app's rules.
+    """
+    sizing = calculator.evaluate_batch(scenarios, costs, **columns)
+    plant = _plant(sizing)
+
+    started = time.perf_counter()
+    full = dispatch.simulate_dispatch(solar_profile, wind_profile, efficiency=efficiency, **plant)
+    full_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    fast = reduced.simulate(efficiency=efficiency, soc_levels=soc_levels, **plant)
+    reduced_seconds = time.perf_counter() - started
+
+    lcoa_full = dispatch_lcoa(full, sizing, scenarios, costs, **columns)
+    lcoa_reduced = dispatch_lcoa(fast, sizing, scenarios, costs, **columns)
+    relative = np.abs(lcoa_reduced - lcoa_full) / lcoa_full
+    return {
+        "lcoa_full": lcoa_full,
+        "lcoa_reduced": lcoa_reduced,
+        "max_relative_error": float(relative.max()),
+        "mean_relative_error": float(relative.mean()),
+        "share_errors": {name: float(np.abs(fast[name] - full[name]).max())
+                         for name in ("grid_share", "curtailment_share", "electrolyzer_utilization")},
+        "full_seconds": full_seconds,
+        "reduced_seconds": reduced_seconds,
+        "speedup": full_seconds / reduced_seconds if reduced_seconds else np.inf,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare representative-period dispatch with the full hourly run.")
+    parser.add_argument('--periods', type=int, default=DEFAULT_PERIODS, help="Representative periods")
+    parser.add_argument('--period-hours', type=int, default=DEFAULT_PERIOD_HOURS, help="24 for days, 168 for weeks")
+    parser.add_argument('--method', choices=METHODS, default='kmeans')
+    parser.add_argument('--soc-levels', type=int, default=DEFAULT_SOC_LEVELS,
+                        help="Starting states of charge simulated per period")
+    parser.add_argument('--scenarios', type=int, default=100, help="Random scenarios to compare")
+    parser.add_argument('--store', help="Profile store to read measured profiles from (see profiles.py)")
+    parser.add_argument('--site', help="Site in the profile store")
+    parser.add_argument('--year', type=int, help="Year in the profile store")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.store:
+        import profiles
+
+        store = profiles.ProfileStore(args.store)
+        solar, wind = (np.nan_to_num(np.asarray(store.profile(variable, args.year, [args.site])[0], dtype=float))
+                       for variable in profiles.VARIABLES)
+    else:
+        solar, wind = dispatch.synthetic_profiles(calculator.SCENARIO_DEFAULTS['solar_cf'],
+                                                  calculator.SCENARIO_DEFAULTS['wind_cf'], seed=args.seed)
+    started = time.perf_counter()
+    reduced = reduce_profiles(solar, wind, args.periods, args.period_hours, args.method, args.seed)
+    print(f"Clustered {len(reduced.sequence)} periods into {args.periods} in {time.perf_counter() - started:.2f}s "
+          f"(weights {reduced.weights.tolist()}).")
+
+    rng = np.random.default_rng(args.seed)
+    report = lcoa_error(reduced, solar, wind,
+                        strategy=np.where(rng.random(args.scenarios) < 0.5, 'ESS Balancing', 'Grid Balancing'),
+                        solar_wind_ratio=rng.uniform(0, 1, args.scenarios),
+                        solar_cf=np.full(args.scenarios, solar.mean()), wind_cf=np.full(args.scenarios, wind.mean()),
+                        soc_levels=args.soc_levels)
+    print(f"LCOA error: max {report['max_relative_error']:.3%}, mean {report['mean_relative_error']:.3%}")
+    print("Max absolute share errors: " + ", ".join(f"{name} {value:.4f}" for name, value in report['share_errors'].items()))
+    print(f"Full run {report['full_seconds']:.2f}s, reduced {report['reduced_seconds']:.3f}s "
+          f"({report['speedup']:.1f}x faster)")
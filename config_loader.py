@@ -1,52 +1,212 @@
-{
-  "cells": [
-    {
-      "cell_type": "markdown",
-      "metadata": {
-        "id": "view-in-github",
-        "colab_type": "text"
-      },
-      "source": [
-        "<a href=\"https://colab.research.google.com/github/HWAN-OH/H2-Ammonia-Simulator/blob/main/config_loader.py\" target=\"_parent\"><img src=\"https://colab.research.google.com/assets/colab-badge.svg\" alt=\"Open In Colab\"/></a>"
-      ]
-    },
-    {
-      "cell_type": "code",
-      "source": [
-        "import yaml\n",
-        "\n",
-        "def load_config(path='config.yml'):\n",
-        "    \"\"\"\n",
-        "    Loads the configuration from a YAML file.\n",
-        "    YAML 파일을 로드하여 설정을 불러옵니다.\n",
-        "    \"\"\"\n",
-        "    try:\n",
-        "        with open(path, 'r', encoding='utf-8') as f:\n",
-        "            return yaml.safe_load(f)\n",
-        "    except FileNotFoundError:\n",
-        "        st.error(f\"Error: The configuration file '{path}' was not found.\")\n",
-        "        return None\n",
-        "    except Exception as e:\n",
-        "        st.error(f\"Error loading or parsing the configuration file: {e}\")\n",
-        "        return None"
-      ],
-      "outputs": [],
-      "execution_count": null,
-      "metadata": {
-        "id": "UeeeRPdeM3YA"
-      }
-    }
-  ],
-  "metadata": {
-    "colab": {
-      "provenance": [],
-      "include_colab_link": true
-    },
-    "kernelspec": {
-      "display_name": "Python 3",
-      "name": "python3"
-    }
-  },
-  "nbformat": 4,
-  "nbformat_minor": 0
-}
\ No newline at end of file
+"""Scenario configuration: YAML/TOML loading, validated scenario objects and columnar batches.
+
+A scenario file holds either a single scenario at the top level or a list of
+them, with optional shared defaults:
+
+    defaults:
+      discount_rate: 0.08
+      plant_lifetime: 25
+    scenarios:
+      - name: base
+        target_ammonia_tonne: 180000
+        strategy: Grid Balancing
+        grid_purchase_price: 0.15
+      - name: off-grid
+        target_ammonia_tonne: 180000
+        strategy: ESS Balancing
+        ess_capex_per_kwh: 350
+
+Field names follow calculator.SCENARIO_DEFAULTS; `solar_wind_ratio` is a 0-1
+fraction. PyYAML is imported only when a YAML file is read, and nothing here
+imports pandas or Streamlit, so headless and CLI start-up stays fast.
+"""
+import math
+import os
+
+import numpy as np
+
+import calculator
+
+class ConfigError(ValueError):
+    """Raised when a configuration file is missing, unreadable or invalid."""
+
+def load_config(path='config.yml'):
+    """
+    Loads the configuration from a YAML or TOML file.
+    YAML 또는 TOML 파일을 로드하여 설정을 불러옵니다.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if path.endswith('.toml'):
+                import tomllib
+                return tomllib.load(f)
+            import yaml
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        raise ConfigError(f"The configuration file '{path}' was not found.") from None
+    except Exception as e:
+        raise ConfigError(f"Error loading or parsing the configuration file '{path}': {e}") from e
+
+# --- Scenario Objects ---
+# name -> (type, minimum, maximum); bounds are inclusive unless noted in _OPEN_BOUNDS.
+FIELDS = {
+    'target_ammonia_tonne': (float, 0, math.inf),
+    'solar_cf': (float, 0, 1),
+    'wind_cf': (float, 0, 1),
+    'solar_wind_ratio': (float, 0, 1),
+    'discount_rate': (float, 0, 1),
+    'plant_lifetime': (float, 1, 100),
+    'ess_capex_per_kwh': (float, 0, math.inf),
+    'ess_efficiency': (float, 0, 1),
+    'grid_purchase_price': (float, 0, math.inf),
+    'transport_cost_per_tonne': (float, 0, math.inf),
+}
+_OPEN_BOUNDS = {('discount_rate', 'min'), ('ess_efficiency', 'min')}
+DEFAULTS = dict(calculator.SCENARIO_DEFAULTS, ess_efficiency=0.85, name='')
+
+def _range_text(name):
+    _, low, high = FIELDS[name]
+    return f"{'(' if (name, 'min') in _OPEN_BOUNDS else '['}{low}, {high}]"
+
+def _check_field(name, value, where):
+    kind, low, high = FIELDS[name]
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{where}: '{name}' must be a number, got {value!r}") from None
+    below = value <= low if (name, 'min') in _OPEN_BOUNDS else value < low
+    if below or value > high or math.isnan(value):
+        raise ConfigError(f"{where}: '{name}' = {value} is outside {_range_text(name)}")
+    return value
+
+def _check_strategy(value, where):
+    if value not in calculator.STRATEGIES:
+        raise ConfigError(f"{where}: 'strategy' must be one of {calculator.STRATEGIES}, got {value!r}")
+    return value
+
+class Scenario:
+    """One immutable, validated scenario. Validation happens once, in the constructor."""
+
+    __slots__ = ('name', 'strategy') + tuple(FIELDS)
+
+    def __init__(self, **values):
+        where = f"Scenario '{values.get('name', '')}'"
+        unknown = set(values) - set(DEFAULTS)
+        if unknown:
+            raise ConfigError(f"{where}: unknown field(s) {sorted(unknown)}")
+        values = dict(DEFAULTS, **values)
+        set_ = object.__setattr__
+        set_(self, 'name', str(values['name']))
+        set_(self, 'strategy', _check_strategy(values['strategy'], where))
+        for name in FIELDS:
+            set_(self, name, _check_field(name, values[name], where))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Scenario objects are immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Scenario objects are immutable")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def replace(self, **changes):
+        return Scenario(**dict(self.as_dict(), **changes))
+
+    def __eq__(self, other):
+        return isinstance(other, Scenario) and self.as_dict() == other.as_dict()
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f"Scenario({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+    def __reduce__(self):
+        return (_scenario_from_dict, (self.as_dict(),))
+
+    @property
+    def is_ess(self):
+        return self.strategy == 'ESS Balancing'
+
+    @property
+    def grid_config(self):
+        return {} if self.is_ess else {'purchase_price': self.grid_purchase_price}
+
+    @property
+    def ess_config(self):
+        return {'capex_per_kwh': self.ess_capex_per_kwh, 'efficiency': self.ess_efficiency} if self.is_ess else {}
+
+    def base_config(self):
+        """The key-value config of the scalar calculator API, sized with the app's rule."""
+        total_kwh_needed = calculator.calculate_required_kwh(self.target_ammonia_tonne)
+        re_kw = calculator.calculate_required_re_capacity(total_kwh_needed, self.solar_cf, self.wind_cf,
+                                                          self.solar_wind_ratio)
+        return {
+            'ELECTROLYZER_CAPACITY_KW': re_kw,
+            'SOLAR_CAPACITY_KW': re_kw * self.solar_wind_ratio,
+            'WIND_CAPACITY_KW': re_kw * (1 - self.solar_wind_ratio),
+            'DISCOUNT_RATE': self.discount_rate,
+            'PLANT_LIFETIME': self.plant_lifetime,
+        }
+
+def _scenario_from_dict(values):
+    return Scenario(**values)
+
+def _scenario_records(config, path):
+    if not isinstance(config, dict):
+        raise ConfigError(f"'{path}' must contain a mapping at the top level")
+    if 'scenarios' not in config:
+        return [config]
+    defaults = config.get('defaults', {})
+    records = [dict(defaults, **record) for record in config['scenarios']]
+    for i, record in enumerate(records):
+        record.setdefault('name', f"{os.path.splitext(os.path.basename(path))[0]}-{i}")
+    return records
+
+def load_scenarios(path):
+    """Loads a YAML/TOML scenario file into a list of validated Scenario objects."""
+    return [Scenario(**record) for record in _scenario_records(load_config(path), path)]
+
+# --- Columnar Batches ---
+def to_columns(scenarios):
+    """Packs Scenario objects into the columnar input of calculator.evaluate_batch."""
+    columns = {name: np.fromiter((getattr(s, name) for s in scenarios), dtype=float, count=len(scenarios))
+               for name in FIELDS}
+    columns['ess'] = np.fromiter((s.is_ess for s in scenarios), dtype=bool, count=len(scenarios))
+    columns['name'] = np.array([s.name for s in scenarios])
+    return columns
+
+def load_batch(paths):
+    """Bulk-loads one or more scenario files straight into columns, validating column-wise.
+
+    Skips building per-scenario objects, which keeps loading thousands of
+    scenarios fast. Returns the same layout as to_columns.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    records = [record for path in paths for record in _scenario_records(load_config(path), str(path))]
+    unknown = set().union(*map(set, records)) - set(DEFAULTS) if records else set()
+    if unknown:
+        raise ConfigError(f"Unknown scenario field(s) {sorted(unknown)}")
+
+    columns = {}
+    for name, (kind, low, high) in FIELDS.items():
+        try:
+            values = np.array([record.get(name, DEFAULTS[name]) for record in records], dtype=float)
+        except (TypeError, ValueError) as e:
+            raise ConfigError(f"'{name}' must be numeric in every scenario: {e}") from None
+        below = values <= low if (name, 'min') in _OPEN_BOUNDS else values < low
+        bad = np.flatnonzero(below | (values > high) | np.isnan(values))
+        if bad.size:
+            raise ConfigError(f"'{name}' = {values[bad[0]]} is outside {_range_text(name)} "
+                              f"(scenario {records[bad[0]].get('name', bad[0])!r})")
+        columns[name] = values
+
+    strategies = np.array([record.get('strategy', DEFAULTS['strategy']) for record in records])
+    bad = np.flatnonzero(~np.isin(strategies, calculator.STRATEGIES))
+    if bad.size:
+        raise ConfigError(f"'strategy' must be one of {calculator.STRATEGIES}, got {strategies[bad[0]]!r}")
+    columns['ess'] = calculator.ess_mask(strategies)
+    columns['name'] = np.array([str(record.get('name', '')) for record in records])
+    return columns
@@ -0,0 +1,201 @@
+import numpy as np
+
+import calculator
+
+# --- Dispatch Model ---
+# Every time step, renewable output feeds the electrolyzer up to its capacity.
+# Surplus charges the battery (ESS) and the rest is curtailed. When direct
+# supply falls below the firm load the Haber-Bosch loop needs, the battery
+# discharges, and under 'Grid Balancing' the grid covers what is left. Energy
+# still missing is reported as unserved.
+
+TIME_BLOCK_HOURS = 24 * 31
+
+def firm_load_kw(total_kwh_needed):
+    """Flat electrolyzer load that delivers `total_kwh_needed` over a year."""
+    return np.asarray(total_kwh_needed, dtype=float) / calculator.HOURS_PER_YEAR
+
+def synthetic_profiles(solar_cf, wind_cf, hours=calculator.HOURS_PER_YEAR, seed=0):
+    """Illustrative hourly solar and wind capacity-factor profiles with the given means.
+
+    Solar follows a seasonal diurnal curve with random daily cloudiness; wind is
+    an autocorrelated log-normal series. Use measured profiles for real studies.
+    """
+    rng = np.random.default_rng(seed)
+    hour = np.arange(hours)
+    day = hour // 24
+    n_days = day[-1] + 1
+
+    season = 1 + 0.3 * np.cos(2 * np.pi * (day - 172) / 365)
+    daylight = np.clip(np.sin(np.pi * ((hour % 24) - 6) / 12), 0, None)
+    clearness = rng.beta(4, 1.5, n_days)[day]
+    solar = daylight * season * clearness
+
+    noise = rng.normal(0, 1, hours)
+    wind = np.empty(hours)
+    state = 0.0
+    for i in range(hours):
+        state = 0.95 * state + np.sqrt(1 - 0.95 ** 2) * noise[i]
+        wind[i] = state
+    wind = np.exp(0.6 * wind)
+
+    return _scale_to_mean(solar, solar_cf), _scale_to_mean(wind, wind_cf)
+
+def _scale_to_mean(profile, target_cf, iterations=50):
+    """Scales a profile to the target mean while keeping it within [0, 1]."""
+    factor = target_cf / max(profile.mean(), 1e-12)
+    for _ in range(iterations):
+        scaled = np.clip(profile * factor, 0, 1)
+        if scaled.mean() == 0 or abs(scaled.mean() - target_cf) < 1e-9:
+            break
+        factor *= target_cf / scaled.mean()
+    return scaled
+
+def _column_profiles(profile, n_scenarios):
+    """Returns profiles laid out time-major (T, S) or shared (T, 1)."""
+    profile = np.asarray(profile, dtype=float)
+    if profile.ndim == 1:
+        return profile[:, None]
+    if profile.shape[0] != n_scenarios:
+        raise ValueError("Per-scenario profiles must have shape (n_scenarios, n_steps)")
+    return profile.T
+
+def simulate_dispatch(solar_profile, wind_profile, solar_kw, wind_kw, electrolyzer_kw, load_kw,
+                      ess_kwh=0.0, ess_kw=None, efficiency=0.85, allow_grid=True, dt_hours=1.0,
+                      initial_soc=0.5):
+    """Simulates a year of electrolyzer, battery, grid and curtailment dispatch for many scenarios.
+
+    Profiles are capacity factors per time step, either shared (n_steps,) or per
+    scenario (n_scenarios, n_steps). Plant parameters are scalars or arrays of
+    length n_scenarios; `efficiency` is the ESS round-trip efficiency (the
+    `efficiency` entry of ess_config) and `ess_kw` limits charge/discharge power
+    (unlimited by default). `allow_grid` may also be a per-scenario mask,
+    e.g. ~calculator.ess_mask(strategy), and `initial_soc` a per-scenario
+    array; `final_soc` holds the state of charge after the last step.
+
+    Scenarios without storage are evaluated fully vectorized over time; the
+    state-of-charge recursion for the rest steps through time with all those
+    scenarios in one array. Energy totals are scaled to a 365-day year.
+
+    Returns a dict of per-scenario arrays whose `grid_kwh` and
+    `ess_capacity_kwh` can be passed straight to calculator.evaluate_batch.
+    """
+    n_steps = np.shape(solar_profile)[-1]
+    n_scenarios = np.broadcast(np.asarray(solar_kw), np.asarray(wind_kw), np.asarray(electrolyzer_kw),
+                               np.asarray(load_kw), np.asarray(ess_kwh), np.asarray(allow_grid)).size
+    if np.ndim(solar_profile) == 2:
+        n_scenarios = max(n_scenarios, np.shape(solar_profile)[0])
+    if np.ndim(wind_profile) == 2:
+        n_scenarios = max(n_scenarios, np.shape(wind_profile)[0])
+
+    def per_scenario(value):
+        return np.broadcast_to(np.asarray(value, dtype=float), (n_scenarios,)).copy()
+
+    solar_kw, wind_kw = per_scenario(solar_kw), per_scenario(wind_kw)
+    electrolyzer_kw, load_kw = per_scenario(electrolyzer_kw), per_scenario(load_kw)
+    ess_kwh = per_scenario(ess_kwh)
+    ess_kw = per_scenario(np.inf if ess_kw is None else ess_kw)
+    efficiency = per_scenario(efficiency)
+    allow_grid = np.broadcast_to(np.asarray(allow_grid, dtype=bool), (n_scenarios,))
+    initial_soc = per_scenario(initial_soc)
+    solar = _column_profiles(solar_profile, n_scenarios)
+    wind = _column_profiles(wind_profile, n_scenarios)
+
+    firm_kw = np.minimum(load_kw, electrolyzer_kw)
+    totals = {name: np.zeros(n_scenarios) for name in
+              ("re_kwh", "direct_kwh", "grid_kwh", "curtailed_kwh", "unserved_kwh",
+               "ess_charge_kwh", "ess_discharge_kwh")}
+
+    no_storage = np.flatnonzero(ess_kwh <= 0)
+    if no_storage.size:
+        _dispatch_without_storage(solar, wind, no_storage, solar_kw, wind_kw, electrolyzer_kw, firm_kw,
+                                  allow_grid, dt_hours, totals)
+    final_soc = initial_soc.copy()
+    storage = np.flatnonzero(ess_kwh > 0)
+    if storage.size:
+        final_soc[storage] = _dispatch_with_storage(solar, wind, storage, solar_kw, wind_kw, electrolyzer_kw, firm_kw,
+                                                    allow_grid, ess_kwh, ess_kw, efficiency, dt_hours, initial_soc,
+                                                    totals)
+
+    annual = calculator.HOURS_PER_YEAR / (n_steps * dt_hours)
+    results = summarize({name: value * annual for name, value in totals.items()}, electrolyzer_kw, ess_kwh)
+    results["final_soc"] = final_soc
+    return results
+
+def summarize(totals, electrolyzer_kw, ess_kwh):
+    """Adds the derived shares, utilization and cycle count to annual energy totals."""
+    results = dict(totals)
+    results["electrolyzer_kwh"] = results["direct_kwh"] + results["ess_discharge_kwh"] + results["grid_kwh"]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results["electrolyzer_utilization"] = np.where(
+            electrolyzer_kw > 0, results["electrolyzer_kwh"] / (electrolyzer_kw * calculator.HOURS_PER_YEAR), 0.0)
+        results["ess_cycles"] = np.where(ess_kwh > 0, results["ess_discharge_kwh"] / ess_kwh, 0.0)
+        results["curtailment_share"] = np.where(results["re_kwh"] > 0, results["curtailed_kwh"] / results["re_kwh"], 0.0)
+        results["grid_share"] = np.where(results["electrolyzer_kwh"] > 0,
+                                         results["grid_kwh"] / results["electrolyzer_kwh"], 0.0)
+    results["ess_capacity_kwh"] = ess_kwh
+    return results
+
+def _dispatch_without_storage(solar, wind, rows, solar_kw, wind_kw, electrolyzer_kw, firm_kw, allow_grid,
+                              dt_hours, totals):
+    solar_cols = rows if solar.shape[1] > 1 else slice(None)
+    wind_cols = rows if wind.shape[1] > 1 else slice(None)
+    capacity, firm, grid_ok = electrolyzer_kw[rows], firm_kw[rows], allow_grid[rows]
+
+    for start in range(0, solar.shape[0], TIME_BLOCK_HOURS):
+        block = slice(start, start + TIME_BLOCK_HOURS)
+        re_kw = solar[block, solar_cols] * solar_kw[rows] + wind[block, wind_cols] * wind_kw[rows]
+        direct = np.minimum(re_kw, capacity)
+        deficit = np.maximum(firm - direct, 0)
+        grid = np.where(grid_ok, deficit, 0.0)
+
+        totals["re_kwh"][rows] += re_kw.sum(axis=0) * dt_hours
+        totals["direct_kwh"][rows] += direct.sum(axis=0) * dt_hours
+        totals["curtailed_kwh"][rows] += (re_kw - direct).sum(axis=0) * dt_hours
+        totals["grid_kwh"][rows] += grid.sum(axis=0) * dt_hours
+        totals["unserved_kwh"][rows] += (deficit - grid).sum(axis=0) * dt_hours
+
+def _dispatch_with_storage(solar, wind, rows, solar_kw, wind_kw, electrolyzer_kw, firm_kw, allow_grid,
+                           ess_kwh, ess_kw, efficiency, dt_hours, initial_soc, totals):
+    solar_cols = rows if solar.shape[1] > 1 else slice(None)
+    wind_cols = rows if wind.shape[1] > 1 else slice(None)
+    s_kw, w_kw = solar_kw[rows], wind_kw[rows]
+    capacity, firm, grid_ok = electrolyzer_kw[rows], firm_kw[rows], allow_grid[rows]
+    energy, power_step = ess_kwh[rows], ess_kw[rows] * dt_hours
+    one_way = np.sqrt(efficiency[rows])
+
+    n = rows.size
+    soc = energy * initial_soc[rows]
+    sums = {name: np.zeros(n) for name in totals}
+    direct, surplus, deficit, charge, discharge, grid = (np.empty(n) for _ in range(6))
+
+    for start in range(0, solar.shape[0], TIME_BLOCK_HOURS):
+        block = slice(start, start + TIME_BLOCK_HOURS)
+        re_block = (solar[block, solar_cols] * s_kw + wind[block, wind_cols] * w_kw) * dt_hours
+        sums["re_kwh"] += re_block.sum(axis=0)
+        for re_step in re_block:
+            np.minimum(re_step, capacity * dt_hours, out=direct)
+            np.subtract(re_step, direct, out=surplus)
+            # Charge from surplus within power and headroom limits.
+            np.minimum(surplus, power_step, out=charge)
+            np.minimum(charge, (energy - soc) / one_way, out=charge)
+            soc += charge * one_way
+            # Discharge towards the firm load, then fall back to the grid.
+            np.subtract(firm * dt_hours, direct, out=deficit)
+            np.maximum(deficit, 0, out=deficit)
+            np.minimum(deficit, power_step, out=discharge)
+            np.minimum(discharge, soc * one_way, out=discharge)
+            soc -= discharge / one_way
+            deficit -= discharge
+            np.multiply(deficit, grid_ok, out=grid)
+
+            sums["direct_kwh"] += direct
+            sums["curtailed_kwh"] += surplus - charge
+            sums["ess_charge_kwh"] += charge
+            sums["ess_discharge_kwh"] += discharge
+            sums["grid_kwh"] += grid
+            sums["unserved_kwh"] += deficit - grid
+
+    for name, value in sums.items():
+        totals[name][rows] += value
+    return soc / energy
@@ -0,0 +1,237 @@
+import itertools
+
+import numpy as np
+
+import cache
+import calculator
+import instrument
+
+# --- Calculation Graph ---
+# Each node names the parameters or other nodes it reads and the function that
+# computes it from them. Nodes are built from the batch stage functions of
+# calculator.py, so the same graph evaluates one scenario or arrays of them.
+PARAMETERS = tuple(calculator.SCENARIO_DEFAULTS) + ('costs',)
+
+def _capacities(re_capacity_kw, solar_wind_ratio):
+    ratio = calculator._as_float(solar_wind_ratio)
+    return {
+        "electrolyzer_capacity_kw": re_capacity_kw,
+        "solar_capacity_kw": re_capacity_kw * ratio,
+        "wind_capacity_kw": re_capacity_kw * (1 - ratio),
+    }
+
+def _component_capex(capacities, target_ammonia_tonne, costs):
+    return calculator.calculate_component_capex_batch(
+        capacities['electrolyzer_capacity_kw'], capacities['solar_capacity_kw'], capacities['wind_capacity_kw'],
+        target_ammonia_tonne, costs)
+
+def _opex(component_capex, ess_sizing, total_kwh_needed, is_ess, grid_purchase_price, costs):
+    capex = dict(component_capex, ess_capex=ess_sizing['ess_capex'])
+    return calculator.calculate_annual_operating_costs_batch(capex, total_kwh_needed, is_ess, grid_purchase_price, costs)
+
+def _lcoa(capital_costs, opex, target_ammonia_tonne, crf):
+    return calculator.calculate_lcoa_batch(capital_costs['total_capex'], opex['total_annual_opex'],
+                                           target_ammonia_tonne, None, None, crf=crf)
+
+NODES = {
+    'is_ess': (('strategy',), calculator.ess_mask),
+    'total_kwh_needed': (('target_ammonia_tonne', 'costs'), calculator.calculate_required_kwh_batch),
+    're_capacity_kw': (('total_kwh_needed', 'solar_cf', 'wind_cf', 'solar_wind_ratio'),
+                       calculator.calculate_required_re_capacity_batch),
+    'capacities': (('re_capacity_kw', 'solar_wind_ratio'), _capacities),
+    'electrolyzer_utilization': (('total_kwh_needed', 're_capacity_kw'),
+                                 calculator.calculate_electrolyzer_utilization_batch),
+    'component_capex': (('capacities', 'target_ammonia_tonne', 'costs'), _component_capex),
+    'replacement_pv': ((('component_capex', 'electrolyzer_capex'), 'discount_rate', 'costs'),
+                       calculator.calculate_replacement_pv_batch),
+    'ess_sizing': (('total_kwh_needed', 'solar_wind_ratio', 'ess_capex_per_kwh', 'is_ess'),
+                   calculator.calculate_ess_sizing_batch),
+    'capital_costs': (('component_capex', 'replacement_pv', 'ess_sizing'), calculator.combine_capital_costs),
+    'opex': (('component_capex', 'ess_sizing', 'total_kwh_needed', 'is_ess', 'grid_purchase_price', 'costs'), _opex),
+    'crf': (('discount_rate', 'plant_lifetime'), calculator.calculate_crf_batch),
+    'lcoa': (('capital_costs', 'opex', 'target_ammonia_tonne', 'crf'), _lcoa),
+    'delivered_lcoa': ((('lcoa', 'lcoa_final'), 'transport_cost_per_tonne'), calculator.calculate_delivered_lcoa_batch),
+}
+
+def _source(name):
+    """The node or parameter an input reads; (node, key) inputs read one entry of a dict-valued node."""
+    return name[0] if isinstance(name, tuple) else name
+
+def topological_order(nodes):
+    """Node names ordered so every node comes after its inputs; rejects cycles and unknown inputs."""
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Cycle in calculation graph: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for source in map(_source, nodes[name][0]):
+            if source in nodes:
+                visit(source, path + [name])
+            elif source not in PARAMETERS:
+                raise ValueError(f"Node '{name}' reads unknown input '{source}'")
+        state[name] = 'done'
+        order.append(name)
+
+    for name in nodes:
+        visit(name, [])
+    return order
+
+def _same(a, b):
+    if a is b:
+        return True
+    if isinstance(a, dict) or isinstance(b, dict):
+        return (isinstance(a, dict) and isinstance(b, dict) and a.keys() == b.keys()
+                and all(_same(a[key], b[key]) for key in a))
+    if a is None or b is None:
+        return False
+    a, b = np.asarray(a), np.asarray(b)
+    return a.shape == b.shape and np.array_equal(a, b)
+
+def _scalar(value):
+    if isinstance(value, dict):
+        return all(_scalar(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_scalar(item) for item in value)
+    return value is None or isinstance(value, str) or np.ndim(value) == 0
+
+_MISSING = object()
+
+class Graph:
+    """Incremental evaluator: each node is recomputed only when one of its inputs changed.
+
+    Every parameter and node value carries a version number. A node is
+    memoized on the versions of its inputs, so after a parameter change only
+    the nodes downstream of it are recomputed; `recomputed` lists the nodes
+    actually computed by the last evaluate(). Parameters may be scalars or equal-length arrays (batch
+    mode), exactly as for the calculator's batch functions.
+
+    With a `shared` cache.LRUCache (e.g. cache.graph_nodes), a node about to
+    be recomputed on scalar inputs is first looked up there by its normalized
+    inputs, so graphs in different sessions reuse each other's results.
+    Cached values are shared, so callers must not mutate them.
+    """
+
+    def __init__(self, nodes=NODES, shared=None, **params):
+        self.nodes = nodes
+        self.shared = shared
+        self.order = topological_order(nodes)
+        self._counter = itertools.count(1)
+        self._values = dict(calculator.SCENARIO_DEFAULTS, costs=None)
+        self._versions = {name: next(self._counter) for name in PARAMETERS}
+        self._stamps = {}
+        self.recomputed = []
+        self.set(**params)
+
+    def set(self, **params):
+        """Updates parameters; returns the names of those whose value actually changed."""
+        changed = []
+        for name, value in params.items():
+            if name not in PARAMETERS:
+                raise KeyError(f"Unknown parameter '{name}'; expected one of {PARAMETERS}")
+            if not _same(self._values[name], value):
+                self._values[name] = value
+                self._versions[name] = next(self._counter)
+                changed.append(name)
+        return changed
+
+    def parameter(self, name):
+        """Current value of a parameter."""
+        return self._values[name]
+
+    def _input(self, name):
+        if isinstance(name, tuple):
+            return self._values[name[0]][name[1]]
+        return self._values[name]
+
+    def _needed(self, targets):
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name in self.nodes and name not in needed:
+                needed.add(name)
+                stack.extend(map(_source, self.nodes[name][0]))
+        return needed
+
+    def evaluate(self, targets=None, **params):
+        """Brings `targets` (default: every node) up to date and returns their values by name."""
+        self.set(**params)
+        targets = self.order if targets is None else [targets] if isinstance(targets, str) else list(targets)
+        needed = self._needed(targets)
+        self.recomputed = []
+        recorder = instrument.current()
+        for name in self.order:
+            if name not in needed:
+                continue
+            inputs, func = self.nodes[name]
+            stamp = tuple(self._versions[_source(source)] for source in inputs)
+            if recorder is not None:
+                recorder.count_cache('graph', self._stamps.get(name) == stamp)
+            if self._stamps.get(name) != stamp:
+                args = [self._input(source) for source in inputs]
+                key = (name, cache.normalize_key(args)) if self.shared is not None and _scalar(args) else None
+                value = _MISSING if key is None else self.shared.get(key, _MISSING)
+                if value is _MISSING:
+                    if recorder is None:
+                        value = func(*args)
+                    else:
+                        with recorder.span(f"graph/{name}", 'graph'):
+                            value = func(*args)
+                    if key is not None:
+                        self.shared.put(key, value)
+                    self.recomputed.append(name)
+                self._values[name] = value
+                self._versions[name] = next(self._counter)
+                self._stamps[name] = stamp
+        return {name: self._values[name] for name in targets}
+
+    def results(self, **params):
+        """All result columns in the flat layout of calculator.evaluate_batch."""
+        values = self.evaluate(**params)
+        results = {"total_kwh_needed": values['total_kwh_needed']}
+        results.update(values['capacities'])
+        results["electrolyzer_utilization"] = values['electrolyzer_utilization']
+        results["ess"] = values['is_ess']
+        results.update(values['capital_costs'])
+        results.update(values['opex'])
+        results.update(values['lcoa'])
+        results.update(values['delivered_lcoa'])
+        return results
+
+def analysis(graph, **params):
+    """One scenario evaluated on `graph`, in the nested layout used by app.py."""
+    r = graph.results(**params)
+    is_ess = bool(r['ess'])
+    params = {name: graph.parameter(name) for name in ('target_ammonia_tonne', 'discount_rate', 'plant_lifetime')}
+    base_config = {
+        'ELECTROLYZER_CAPACITY_KW': float(r['electrolyzer_capacity_kw']),
+        'SOLAR_CAPACITY_KW': float(r['solar_capacity_kw']),
+        'WIND_CAPACITY_KW': float(r['wind_capacity_kw']),
+        'DISCOUNT_RATE': params['discount_rate'],
+        'PLANT_LIFETIME': params['plant_lifetime'],
+    }
+    capex_keys = ["electrolyzer_capex", "solar_capex", "wind_capex", "haber_bosch_capex", "storage_capex",
+                  "electrolyzer_replacement_pv"]
+    if is_ess:
+        capex_keys += ["ess_capex", "ess_capacity_mwh", "calculated_storage_duration_hours"]
+    capex_keys.append("total_capex")
+
+    valid = params['target_ammonia_tonne'] != 0 and not np.isnan(r['crf'])
+    lcoa_results = {"lcoa_final": float(r['lcoa_final']), "breakdown": {
+        "Annualized CAPEX": float(r['annualized_capex_per_tonne']),
+        "Annual OPEX": float(r['opex_per_tonne']),
+    }} if valid else {"lcoa_final": 0, "breakdown": {}}
+    if valid and r['transport_cost_per_tonne'] > 0:
+        lcoa_results["breakdown"]["Transport"] = float(r['transport_cost_per_tonne'])
+    lcoa_results["delivered_lcoa"] = float(r['delivered_lcoa']) if valid else 0
+    return {
+        "total_kwh_needed": float(r['total_kwh_needed']),
+        "electrolyzer_capacity_kw": float(r['electrolyzer_capacity_kw']),
+        "electrolyzer_utilization": float(r['electrolyzer_utilization']),
+        "base_config": base_config,
+        "capex_costs": {key: float(r[key]) for key in capex_keys},
+        "opex_costs": {key: float(r[key]) for key in ("fixed_opex", "variable_opex (grid_cost)", "total_annual_opex")},
+        "lcoa_results": lcoa_results,
+    }
@@ -0,0 +1,194 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import calculator
+
+# Calculator functions wrapped on first enable(). Wrapping replaces the module
+# attributes once for the process, so calls through calculator (including
+# evaluate_batch's calls to its stages) are timed; a wrapper only looks up the
+# recorder of the calling context, so without one it costs a single lookup.
+STAGE_FUNCTIONS = (
+    'calculate_required_kwh_batch', 'calculate_required_re_capacity_batch',
+    'calculate_electrolyzer_utilization_batch', 'calculate_component_capex_batch',
+    'calculate_replacement_pv_batch', 'calculate_ess_sizing_batch', 'calculate_capital_costs_batch',
+    'calculate_annual_operating_costs_batch', 'calculate_crf_batch', 'calculate_lcoa_batch',
+    'calculate_delivered_lcoa_batch', 'evaluate_batch',
+)
+
+# The recorder is per context (thread or asyncio task), so concurrent runs,
+# e.g. two app sessions, each record only their own calls.
+_active = contextvars.ContextVar('instrument_recorder', default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+def _batch_size(result):
+    if isinstance(result, dict):
+        result = next(iter(result.values()), None)
+    return int(getattr(result, 'size', 1))
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class Recorder:
+    """Collects timed spans, batch sizes and cache hits while instrumentation is enabled.
+
+    Spans nest (evaluate_batch contains its stages), so per-stage times are
+    inclusive. Events from other processes can be merged in for sweeps.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.events = []
+        self.cache_counts = {}
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.peak_traced_mb = None
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add(self, name, category, start, end, items=None):
+        event = {"name": name, "cat": category, "start": start, "duration": end - start,
+                 "items": items, "pid": os.getpid(), "tid": threading.get_ident()}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category='run', items=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.perf_counter(), items)
+
+    def count_cache(self, name, hit):
+        with self._lock:
+            counts = self.cache_counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def merge(self, events, cache_counts=None):
+        """Adds events (and cache counters) recorded elsewhere, e.g. in a worker process."""
+        with self._lock:
+            self.events.extend(events)
+            for name, (hits, misses) in (cache_counts or {}).items():
+                counts = self.cache_counts.setdefault(name, [0, 0])
+                counts[0] += hits
+                counts[1] += misses
+
+    def summary(self):
+        """Per-span wall time, call counts and batch sizes, cache hit rates and peak memory."""
+        stages = {}
+        for event in self.events:
+            stage = stages.setdefault(event['name'], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "items": 0,
+                                                      "max_items": 0, "category": event['cat']})
+            stage["calls"] += 1
+            stage["total_ms"] += event['duration'] * 1e3
+            stage["max_ms"] = max(stage["max_ms"], event['duration'] * 1e3)
+            if event['items'] is not None:
+                stage["items"] += event['items']
+                stage["max_items"] = max(stage["max_items"], event['items'])
+        for stage in stages.values():
+            stage["mean_ms"] = stage["total_ms"] / stage["calls"]
+            stage["mean_items"] = stage["items"] / stage["calls"]
+        caches = {name: {"hits": hits, "misses": misses,
+                         "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                  for name, (hits, misses) in self.cache_counts.items()}
+        end = self.stopped if self.stopped is not None else time.perf_counter()
+        return {
+            "wall_ms": (end - self.started) * 1e3,
+            "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"])),
+            "caches": caches,
+            "peak_rss_mb": _peak_rss_mb(),
+            "peak_traced_mb": self.peak_traced_mb,
+        }
+
+    def chrome_trace(self):
+        """The events in Chrome trace format (load in chrome://tracing or Perfetto)."""
+        events = [{"name": event['name'], "cat": event['cat'], "ph": "X", "ts": event['start'] * 1e6,
+                   "dur": event['duration'] * 1e6, "pid": event['pid'], "tid": event['tid'],
+                   "args": {} if event['items'] is None else {"items": event['items']}}
+                  for event in self.events]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _active.get()
+        if recorder is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        recorder.add(name, 'stage', start, time.perf_counter(), _batch_size(result))
+        return result
+    return wrapper
+
+def install():
+    """Wraps the calculator stages once for the process; later calls do nothing."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            for name in STAGE_FUNCTIONS:
+                setattr(calculator, name, _wrap(name, getattr(calculator, name)))
+            _installed = True
+
+# --- Switching On and Off ---
+def current():
+    """The Recorder of the calling context, or None when instrumentation is off."""
+    return _active.get()
+
+def enable(trace_memory=False):
+    """Starts recording the calling context into a new Recorder and returns it.
+
+    `trace_memory` also tracks the traced peak memory with tracemalloc, which
+    is process-wide and slows every allocation; use it for single runs (CLI,
+    benchmarks), not inside a shared server.
+    """
+    install()
+    if _active.get() is not None:
+        disable()
+    recorder = Recorder(trace_memory and not tracemalloc.is_tracing())
+    recorder._token = _active.set(recorder)
+    if recorder.trace_memory:
+        tracemalloc.start()
+    return recorder
+
+def disable():
+    """Stops recording in the calling context and returns the finished Recorder."""
+    recorder = _active.get()
+    if recorder is None:
+        return None
+    _active.reset(recorder._token)
+    recorder.stopped = time.perf_counter()
+    if recorder.trace_memory and tracemalloc.is_tracing():
+        recorder.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return recorder
+
+@contextmanager
+def recording(trace_memory=False):
+    """Context manager form of enable()/disable(); yields the Recorder."""
+    recorder = enable(trace_memory)
+    try:
+        yield recorder
+    finally:
+        disable()
@@ -0,0 +1,158 @@
+"""Load generator for the local evaluation service (service.py).
+
+Usage:
+    python loadgen.py --spawn --processes 4 --connections 32 --duration 10
+    python loadgen.py --port 8750 --connections 16 --requests 20000 --scenarios-per-request 4
+
+Each connection sends POST /evaluate requests back to back over keep-alive
+HTTP/1.1, with random scenarios drawn from the app's slider ranges; a share
+of them repeats earlier scenarios to exercise the result cache. `--spawn`
+starts service.py on the given port for the duration of the run. Client-side
+latency and throughput are reported together with the service's /metrics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import service
+
+def random_scenario(rng, pool, repeat_share):
+    if pool and rng.random() < repeat_share:
+        return pool[rng.integers(len(pool))]
+    scenario = {
+        'target_ammonia_tonne': float(rng.integers(1, 1001) * 10_000),
+        'strategy': 'ESS Balancing' if rng.random() < 0.5 else 'Grid Balancing',
+        'solar_cf': round(float(rng.uniform(0.10, 0.30)), 3),
+        'wind_cf': round(float(rng.uniform(0.20, 0.50)), 3),
+        'solar_wind_ratio': round(float(rng.uniform(0, 1)), 2),
+        'discount_rate': round(float(rng.uniform(0.01, 0.15)), 3),
+        'plant_lifetime': float(rng.integers(10, 41)),
+    }
+    pool.append(scenario)
+    return scenario
+
+async def request(reader, writer, method, path, payload=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def client(host, port, deadline, budget, args, seed, latencies, statuses):
+    rng = np.random.default_rng(seed)
+    pool = []
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            scenarios = [random_scenario(rng, pool, args.repeat_share) for _ in range(args.scenarios_per_request)]
+            started = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', '/evaluate', {'scenarios': scenarios})
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 503:
+                await asyncio.sleep(0.01)
+    finally:
+        writer.close()
+
+async def run_clients(args, index):
+    latencies, statuses = [], {}
+    budget = [args.requests // args.processes if args.requests else float('inf')]
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(client(args.host, args.port, deadline, budget, args, args.seed + index * args.connections + i,
+                                  latencies, statuses)
+                           for i in range(args.connections)))
+    return latencies, statuses
+
+def drive(args, index=0):
+    """Runs one process's share of the connections; returns its latencies and status counts."""
+    return asyncio.run(run_clients(args, index))
+
+async def fetch_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    return metrics
+
+def report(args, latencies, statuses, elapsed, metrics):
+    ok = statuses.get(200, 0)
+    latency_ms = np.array(latencies) * 1e3
+    print(f"{len(latencies):,} requests in {elapsed:.2f}s over {args.processes * args.connections} connections "
+          f"({len(latencies) / elapsed:,.0f} req/s, {ok * args.scenarios_per_request / elapsed:,.0f} scenarios/s)")
+    print(f"Status counts: {dict(sorted(statuses.items()))}")
+    if latencies:
+        print("Client latency (ms): " + ", ".join(
+            f"p{q} {np.percentile(latency_ms, q):.2f}" for q in (50, 95, 99)) + f", max {latency_ms.max():.2f}")
+    print("Service metrics:")
+    print(json.dumps(metrics, indent=1))
+
+async def wait_until_up(host, port, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            await request(reader, writer, 'GET', '/health')
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise SystemExit(f"Error: service did not come up on {host}:{port}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the local evaluation service.")
+    parser.add_argument('--host', default=service.DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=service.DEFAULT_PORT)
+    parser.add_argument('--spawn', action='store_true', help="Start service.py for the duration of the run")
+    parser.add_argument('--connections', type=int, default=32, help="Connections per process")
+    parser.add_argument('--processes', type=int, default=1, help="Client processes (one Python client saturates early)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run (default 10)")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument('--scenarios-per-request', type=int, default=1)
+    parser.add_argument('--repeat-share', type=float, default=0.2, help="Share of repeated scenarios")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.spawn:
+        process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'service.py'), '--port', str(args.port)],
+                                   stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(args.host, args.port))
+        started = time.perf_counter()
+        if args.processes > 1:
+            with ProcessPoolExecutor(args.processes) as pool:
+                shares = list(pool.map(drive, [args] * args.processes, range(args.processes)))
+        else:
+            shares = [drive(args)]
+        elapsed = time.perf_counter() - started
+        latencies = [latency for share, _ in shares for latency in share]
+        statuses = {}
+        for _, counts in shares:
+            for status, count in counts.items():
+                statuses[status] = statuses.get(status, 0) + count
+        report(args, latencies, statuses, elapsed, asyncio.run(fetch_metrics(args.host, args.port)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""Ammonia transport costs over a network of ports, hubs and demand centers.
+
+Usage:
+    python logistics.py network.json sites.csv --volume 180000 -o assignments.csv
+
+A network file lists nodes with coordinates and the links between them:
+
+    {
+      "nodes": [
+        {"name": "Port Hedland", "kind": "port", "lat": -20.31, "lon": 118.58},
+        {"name": "Ulsan", "kind": "port", "lat": 35.50, "lon": 129.39},
+        {"name": "Ulsan industrial", "kind": "demand", "lat": 35.54, "lon": 129.31}
+      ],
+      "links": [
+        {"from": "Port Hedland", "to": "Ulsan", "mode": "ship", "distance_km": 6900},
+        {"from": "Ulsan", "to": "Ulsan industrial", "mode": "pipeline"}
+      ]
+    }
+
+Links are two-way; without `distance_km` the great-circle distance times the
+mode's detour factor is used. Every leg is priced with its mode's cost curve.
+The candidate routes from every node to every demand center are found once
+per network by shortest-path searches toward the demand centers at a range
+of volumes, and only the distinct routes of each pair are kept, as leg counts
+and distances per mode. Production sites reach the network by truck from their nearest
+nodes, so assigning thousands of sites, each at its own volume, to demand
+centers is array arithmetic on those candidates.
+"""
+import argparse
+import json
+
+import numpy as np
+
+import cache
+
+# --- Transport Modes ---
+# Cost per tonne of one leg: handling + distance * cost_per_ton_km * (volume / REFERENCE_VOLUME_TONNE) ** -scale_exponent.
+# Handling covers loading and unloading; the scale exponent gives capital-heavy
+# modes (pipelines, larger carriers) their economies of scale.
+REFERENCE_VOLUME_TONNE = 1_000_000
+TRANSPORT_MODES = {
+    'truck': {'handling_per_tonne': 4.0, 'cost_per_ton_km': 0.10, 'scale_exponent': 0.0, 'detour_factor': 1.3},
+    'pipeline': {'handling_per_tonne': 1.0, 'cost_per_ton_km': 0.02, 'scale_exponent': 0.4, 'detour_factor': 1.1},
+    'ship': {'handling_per_tonne': 12.0, 'cost_per_ton_km': 0.004, 'scale_exponent': 0.15, 'detour_factor': 1.25},
+}
+ACCESS_MODE = 'truck'
+ACCESS_NODES = 8
+EARTH_RADIUS_KM = 6371.0
+SITE_ELEMENTS = 1 << 22  # (site, access node, demand center, candidate) cells per chunk
+# Volumes (tonnes/year) at which candidate routes are searched; see Network.route_candidates.
+ROUTE_VOLUMES = np.geomspace(1e4, 1e8, 17)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast against each other."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def transport_cost(mode, distance_km, volume_tonne=REFERENCE_VOLUME_TONNE, modes=TRANSPORT_MODES):
+    """USD per tonne of moving ammonia `distance_km` by `mode` at an annual volume; vectorized."""
+    curve = modes[mode]
+    scale = (np.asarray(volume_tonne, dtype=float) / REFERENCE_VOLUME_TONNE) ** -curve['scale_exponent']
+    return curve['handling_per_tonne'] + np.asarray(distance_km, dtype=float) * curve['cost_per_ton_km'] * scale
+
+# --- Shortest Paths ---
+def all_pairs_shortest_paths(weights):
+    """Floyd-Warshall on a dense (node, node) weight matrix with inf for missing links.
+
+    Each pass relaxes every pair through one intermediate node as a single
+    array operation. Returns the cost matrix and the next-hop matrix (-1
+    where there is no route) for recovering routes.
+    """
+    cost = np.array(weights, dtype=float)
+    n = len(cost)
+    np.fill_diagonal(cost, np.minimum(np.diag(cost), 0.0))
+    next_hop = np.where(np.isfinite(cost), np.arange(n)[None, :], -1)
+    through = np.empty_like(cost)
+    better = np.empty(cost.shape, dtype=bool)
+    for k in range(n):
+        np.add(cost[:, k, None], cost[None, k, :], out=through)
+        np.less(through, cost, out=better)
+        np.copyto(cost, through, where=better)
+        np.copyto(next_hop, next_hop[:, k, None], where=better)
+    return cost, next_hop
+
+def shortest_paths_to(weights, targets):
+    """Cheapest cost from every node to each of `targets` on a dense weight matrix (inf for missing links).
+
+    Bellman-Ford over the link list, relaxing all links against all targets
+    as one array operation per pass, so the work follows the number of links
+    rather than the cube of the node count. Weights must be positive. Returns
+    (node, target) cost and next-hop matrices (-1 where there is no route).
+    """
+    weights = np.asarray(weights, dtype=float)
+    n, columns = len(weights), np.arange(len(targets))
+    source, hop = np.nonzero(np.isfinite(weights) & ~np.eye(n, dtype=bool))  # sorted by source
+    link_cost = weights[source, hop][:, None]
+    sources, first = np.unique(source, return_index=True)
+    cost = np.full((n, len(targets)), np.inf)
+    cost[targets, columns] = 0.0
+    next_hop = np.full((n, len(targets)), -1, dtype=np.intp)
+    next_hop[targets, columns] = targets
+    for _ in range(n):
+        through = link_cost + cost[hop]                 # (link, target)
+        best = cost.copy()
+        if len(sources):
+            best[sources] = np.minimum(cost[sources], np.minimum.reduceat(through, first, axis=0))
+        improved = best < cost
+        if not improved.any():
+            break
+        link, target = np.nonzero((through == best[source]) & improved[source])
+        next_hop[source[link], target] = hop[link]
+        cost = best
+    return cost, next_hop
+
+class Network:
+    """Ports, hubs and demand centers joined by ship, pipeline and truck links.
+
+    Cost and next-hop matrices for route() and cost_matrix() are computed per
+    shipped volume and kept in an LRU cache. Site assignment instead prices a
+    fixed set of candidate routes, searched once per network, at each site's
+    volume.
+    """
+
+    def __init__(self, nodes, links, modes=TRANSPORT_MODES, cache_size=16):
+        self.names = [node['name'] for node in nodes]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Network node names must be unique")
+        self.kinds = np.array([node.get('kind', 'hub') for node in nodes])
+        self.lat = np.array([node['lat'] for node in nodes], dtype=float)
+        self.lon = np.array([node['lon'] for node in nodes], dtype=float)
+        self.modes = modes
+        self.links = []
+        for link in links:
+            if link['mode'] not in modes:
+                raise ValueError(f"Unknown transport mode '{link['mode']}'; expected one of {tuple(modes)}")
+            a, b = self.index[link['from']], self.index[link['to']]
+            distance = link.get('distance_km')
+            if distance is None:
+                distance = (haversine_km(self.lat[a], self.lon[a], self.lat[b], self.lon[b])
+                            * modes[link['mode']]['detour_factor'])
+            self.links.append((a, b, link['mode'], float(distance)))
+        self.demand = np.flatnonzero(self.kinds == 'demand')
+        self.mode_names = list(modes)
+        self._matrices = cache.LRUCache(cache_size, name='logistics')
+        self._candidates = None
+        self._prices = None
+
+    @classmethod
+    def load(cls, path, **options):
+        """Reads a network from a JSON file (see the module docstring for the layout)."""
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec['nodes'], spec['links'], **options)
+
+    def _cheapest_links(self, volume_tonne):
+        """(node, node) cost per tonne, mode index and distance of the cheapest direct link at a volume."""
+        n = len(self.names)
+        weights = np.full((n, n), np.inf)
+        modes = np.full((n, n), -1, dtype=np.intp)
+        distances = np.zeros((n, n))
+        for a, b, mode, distance in self.links:
+            cost = float(transport_cost(mode, distance, volume_tonne, self.modes))
+            for i, j in ((a, b), (b, a)):
+                if cost < weights[i, j]:
+                    weights[i, j], modes[i, j], distances[i, j] = cost, self.mode_names.index(mode), distance
+        return weights, modes, distances
+
+    def link_weights(self, volume_tonne=REFERENCE_VOLUME_TONNE):
+        """(node, node) cost per tonne of the cheapest direct link, and the mode of that link."""
+        weights, modes, _ = self._cheapest_links(volume_tonne)
+        names = np.array(self.mode_names + [''], dtype=object)
+        return weights, names[modes]
+
+    def matrices(self, volume_tonne=REFERENCE_VOLUME_TONNE):
+        """Cached (cost, next_hop, link_modes) for an annual volume."""
+        key = float(volume_tonne)
+        result = self._matrices.get(key)
+        if result is None:
+            weights, modes = self.link_weights(key)
+            result = all_pairs_shortest_paths(weights) + (modes,)
+            self._matrices.put(key, result)
+        return result
+
+    def cost_matrix(self, volume_tonne=REFERENCE_VOLUME_TONNE):
+        """Cheapest cost per tonne between every pair of nodes."""
+        return self.matrices(volume_tonne)[0]
+
+    def route(self, origin, destination, volume_tonne=REFERENCE_VOLUME_TONNE):
+        """The cheapest route between two nodes as a list of (from, to, mode) legs."""
+        _, next_hop, modes = self.matrices(volume_tonne)
+        i, j = self.index[origin], self.index[destination]
+        if next_hop[i, j] < 0:
+            raise ValueError(f"No route from '{origin}' to '{destination}'")
+        legs = []
+        while i != j:
+            k = next_hop[i, j]
+            legs.append((self.names[i], self.names[k], modes[i, k]))
+            i = k
+        return legs
+
+    # --- Site Assignment ---
+    def route_candidates(self):
+        """Distinct candidate routes from every node to every demand center, as leg counts and km per mode.
+
+        A route's cost per tonne is sum over modes of legs * handling +
+        km * cost_per_ton_km * volume scale, so once its legs and km per mode
+        are known it can be priced at any volume by array arithmetic. The
+        candidates are the cheapest routes at each volume of ROUTE_VOLUMES,
+        found by one shortest-path search each when first needed, and deduplicated
+        per (node, demand center) pair; between those volumes the cheapest
+        candidate is used. Returns (legs, km, valid), shaped (node, demand
+        center, candidate, mode) and (node, demand center, candidate), with
+        the candidate axis as long as the largest number of distinct routes of
+        any pair.
+        """
+        if self._candidates is None:
+            n, targets = len(self.names), self.demand[None, :]
+            found = []
+            for volume in ROUTE_VOLUMES:
+                weights, modes, distances = self._cheapest_links(volume)
+                _, next_hop = shortest_paths_to(weights, self.demand)
+                legs = np.zeros((n, len(self.demand), len(self.mode_names)))
+                km = np.zeros_like(legs)
+                node = np.broadcast_to(np.arange(n)[:, None], (n, len(self.demand))).copy()
+                valid = next_hop >= 0
+                pair = np.indices(node.shape)
+                for _ in range(n):
+                    moving = valid & (node != targets)
+                    if not moving.any():
+                        break
+                    i, d = pair[0][moving], pair[1][moving]
+                    current = node[moving]
+                    step = next_hop[current, d]
+                    legs[i, d, modes[current, step]] += 1
+                    km[i, d, modes[current, step]] += distances[current, step]
+                    node[moving] = step
+                found.append((legs, km, valid))
+
+            legs, km, valid = (np.stack(arrays, axis=2) for arrays in zip(*found))
+            # Routes of a pair are compared by a random projection of their legs and km.
+            weights = np.random.default_rng(0).uniform(1, 2, 2 * len(self.mode_names))
+            key = np.concatenate([legs, km], axis=-1) @ weights    # (node, demand, volume)
+            keep = valid.copy()
+            for v in range(1, len(found)):
+                keep[:, :, v] &= ~((key[:, :, :v] == key[:, :, v, None]) & keep[:, :, :v]).any(axis=-1)
+            count = max(int(keep.sum(axis=2).max()), 1)
+            order = np.argsort(~keep, axis=2, kind='stable')[:, :, :count]  # kept candidates first
+            self._candidates = (np.take_along_axis(legs, order[..., None], axis=2),
+                                np.take_along_axis(km, order[..., None], axis=2),
+                                np.take_along_axis(keep, order, axis=2))
+        return self._candidates
+
+    def _candidate_prices(self):
+        """Volume-independent parts of every candidate's cost: handling (inf if unused) and per-mode distance cost."""
+        if self._prices is None:
+            legs, km, valid = self.route_candidates()
+            curves = [self.modes[mode] for mode in self.mode_names]
+            handling = (legs * np.array([curve['handling_per_tonne'] for curve in curves])).sum(axis=-1)
+            self._prices = (np.where(valid, handling, np.inf),      # (node, demand, candidate)
+                            [np.ascontiguousarray(km[..., m]) * curve['cost_per_ton_km']
+                             for m, curve in enumerate(curves)],    # per mode: (node, demand, candidate)
+                            np.array([curve['scale_exponent'] for curve in curves]))
+        return self._prices
+
+    def node_costs(self, volume_tonne=REFERENCE_VOLUME_TONNE):
+        """(node, demand center) cost per tonne of the cheapest candidate route at one volume."""
+        handling, distance_cost, exponent = self._candidate_prices()
+        scale = (float(volume_tonne) / REFERENCE_VOLUME_TONNE) ** -exponent
+        return (handling + sum(cost * factor for cost, factor in zip(distance_cost, scale))).min(axis=-1)
+
+    def site_costs(self, lat, lon, volume_tonne=REFERENCE_VOLUME_TONNE, access_nodes=ACCESS_NODES):
+        """(site, demand center) delivered transport cost per tonne, and the network entry node used.
+
+        Each site trucks to one of its `access_nodes` nearest network nodes
+        (a demand center among them is reached directly); the rest of the
+        route is priced from route_candidates at the site's volume.
+        `volume_tonne` may be one volume or one per site. Sites are taken in
+        chunks of SITE_ELEMENTS // (access nodes * demand centers *
+        candidates); within a chunk, volumes shared by many sites are priced
+        once per (node, demand center) pair instead of once per site.
+        """
+        if not len(self.demand):
+            raise ValueError("The network has no demand centers (nodes of kind 'demand')")
+        lat = np.asarray(lat, dtype=float).reshape(-1)
+        lon = np.broadcast_to(np.asarray(lon, dtype=float).reshape(-1), lat.shape)
+        volumes = np.broadcast_to(np.asarray(volume_tonne, dtype=float), lat.shape)
+        handling, distance_cost, exponent = self._candidate_prices()
+
+        k = min(access_nodes, len(self.names))
+        detour = self.modes[ACCESS_MODE]['detour_factor']
+        chunk = max(1, SITE_ELEMENTS // (k * handling.shape[1] * handling.shape[2]))
+        costs = np.empty((len(lat), len(self.demand)))
+        entry = np.empty((len(lat), len(self.demand)), dtype=np.intp)
+        for start in range(0, len(lat), chunk):
+            rows = slice(start, start + chunk)
+            volume = volumes[rows]
+            distance = haversine_km(lat[rows, None], lon[rows, None], self.lat[None, :], self.lon[None, :])
+            if k < len(self.names):
+                nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.broadcast_to(np.arange(k), distance.shape)
+            access = transport_cost(ACCESS_MODE, np.take_along_axis(distance, nearest, axis=1) * detour,
+                                    volume[:, None], self.modes)
+            unique, inverse = np.unique(volume, return_inverse=True)
+            if len(unique) * len(self.names) <= len(volume) * k:
+                route = np.stack([self.node_costs(v) for v in unique])[inverse[:, None], nearest]
+            else:
+                scale = (volume[:, None] / REFERENCE_VOLUME_TONNE) ** -exponent     # (site, mode)
+                route = handling[nearest]                           # (site, access node, demand, candidate)
+                for m, cost in enumerate(distance_cost):
+                    route += cost[nearest] * scale[:, m, None, None, None]
+                route = route.min(axis=-1)
+            total = access[:, :, None] + route                      # (site, access node, demand center)
+            best = np.argmin(total, axis=1)
+            costs[rows] = np.take_along_axis(total, best[:, None, :], axis=1)[:, 0]
+            entry[rows] = np.take_along_axis(nearest, best, axis=1)
+        return costs, entry
+
+    def assign(self, lat, lon, volume_tonne=REFERENCE_VOLUME_TONNE, access_nodes=ACCESS_NODES):
+        """Assigns every site to its cheapest demand center; returns per-site columns.
+
+        `volume_tonne` may be one volume or one per site; every volume is
+        priced from the same precomputed route candidates. Demand center
+        capacities are not modelled.
+        """
+        costs, entry = self.site_costs(lat, lon, volume_tonne, access_nodes)
+        best = np.argmin(costs, axis=1)
+        rows = np.arange(len(costs))
+        cost = costs[rows, best]
+        names = np.array(self.names, dtype=object)
+        reachable = np.isfinite(cost)
+        return {
+            "demand_center": np.where(reachable, names[self.demand[best]], None),
+            "entry_node": np.where(reachable, names[entry[rows, best]], None),
+            "transport_cost_per_tonne": np.where(reachable, cost, np.nan),
+        }
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    import calculator
+
+    parser = argparse.ArgumentParser(description="Assign production sites to their cheapest demand centers.")
+    parser.add_argument('network', help="Network JSON file")
+    parser.add_argument('sites', help="CSV with site_id, lat and lon columns")
+    parser.add_argument('--volume', type=float, default=calculator.SCENARIO_DEFAULTS['target_ammonia_tonne'],
+                        help="Annual tonnes shipped per site (default: the app's production target)")
+    parser.add_argument('-o', '--output', help="Write the assignments to this CSV")
+    args = parser.parse_args()
+
+    network = Network.load(args.network)
+    sites = pd.read_csv(args.sites)
+    volume = sites['target_ammonia_tonne'].to_numpy() if 'target_ammonia_tonne' in sites else args.volume
+    frame = pd.DataFrame({'site_id': sites['site_id'],
+                          **network.assign(sites['lat'].to_numpy(), sites['lon'].to_numpy(), volume)})
+    if args.output:
+        frame.to_csv(args.output, index=False)
+    print(frame.groupby('demand_center')['transport_cost_per_tonne'].describe()[['count', 'mean', 'min', 'max']])
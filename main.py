@@ -1,127 +1,272 @@
- app.py
-import streamlit as st
-import pandas as pd
-import calculator # 수정된 calculator 모듈
-
-# --- 페이지 기본 설정 ---
-st.set_page_config(
-    page_title="Green Ammonia LCOA Simulator",
-    page_icon="💡",
-    layout="wide"
-)
-
-# --- 사이드바: 사용자 입력 ---
-st.sidebar.header("Simulation Parameters")
-
-# 재무 가정
-st.sidebar.subheader("Financial Assumptions")
-discount_rate = st.sidebar.slider("Discount Rate (%)", 1.0, 15.0, 8.0, 0.1) / 100
-plant_lifetime = st.sidebar.slider("Plant Lifetime (years)", 10, 40, 25, 1)
-inflation_rate = st.sidebar.slider("Inflation Rate (%)", 0.0, 5.0, 2.0, 0.1) / 100
-
-# 플랜트 사양
-st.sidebar.subheader("Plant Specifications")
-plant_capacity_mw = st.sidebar.number_input("Plant Capacity (MW)", min_value=100, max_value=5000, value=1000, step=100)
-capacity_factor = st.sidebar.slider("Capacity Factor (%)", 50.0, 100.0, 90.0, 0.5) / 100
-electricity_cost = st.sidebar.number_input("Electricity Cost ($/kWh)", min_value=0.01, max_value=0.20, value=0.05, step=0.01, format="%.3f")
-
-# 운송
-st.sidebar.subheader("Transportation")
-transport_distance_km = st.sidebar.number_input("Transport Distance (km)", min_value=0, max_value=10000, value=1000, step=100)
-
-# --- 메인 페이지 ---
-st.title("💡 Green Ammonia LCOA Simulator")
-st.markdown("This tool calculates the Levelized Cost of Ammonia (LCOA) based on your input parameters.")
-
-# 시뮬레이션 실행 버튼
-if st.button("Run Simulation"):
-    # 사용자 입력을 기반으로 config 딕셔너리 생성
-    user_config = {
-        'PLANT_CAPACITY_KW': plant_capacity_mw * 1000,
-        'CAPACITY_FACTOR': capacity_factor,
-        'H2_LHV': 33.33,
-        'ELECTROLYZER_EFFICIENCY': 0.70,
-        'ELECTROLYZER_CAPEX': 450,
-        'ELECTROLYZER_LIFETIME': 10,
-        'ASU_CAPEX': 150,
-        'HB_CAPEX': 550,
-        'STORAGE_CAPEX': 500,
-        'ELECTROLYZER_OPEX_RATE': 0.015,
-        'ASU_OPEX_RATE': 0.02,
-        'HB_OPEX_RATE': 0.025,
-        'STORAGE_OPEX_RATE': 0.01,
-        'ELECTRICITY_COST': electricity_cost,
-        'DISCOUNT_RATE': discount_rate,
-        'PLANT_LIFETIME': plant_lifetime,
-        'INFLATION_RATE': inflation_rate,
-        'TRANSPORT_DISTANCE_KM': transport_distance_km,
-        'TRANSPORT_COST_PER_TON_KM': 0.05
+"""Headless parameter-sweep runner for the LCOA cost model.
+
+Usage:
+    python main.py sweep.json --output results/ --workers 8
+    python main.py scenarios.csv --output results/ --format parquet
+    python main.py scenarios.yaml --output results/
+
+A JSON sweep spec lists parameter ranges whose cartesian product is swept:
+
+    {
+      "parameters": {
+        "solar_cf": {"start": 0.10, "stop": 0.30, "num": 21},
+        "discount_rate": [0.05, 0.08, 0.11],
+        "strategy": ["Grid Balancing", "ESS Balancing"]
+      },
+      "fixed": {"target_ammonia_tonne": 180000}
     }
 
-    with st.spinner('Calculating LCOA...'):
-        # 1. 연간 생산량 계산
-        annual_h2_kg, annual_nh3_tonne = calculator.calculate_annual_production(user_config)
+The spec may also be written in YAML or TOML, and YAML/TOML scenario files
+(see config_loader) are accepted as well. Column names are those of
+calculator.SCENARIO_DEFAULTS. Scenarios are split
+into chunks that are evaluated in a process pool and written as
+part-NNNNNN files. Finished parts act as the checkpoint: rerunning the same
+command resumes an interrupted sweep. Parquet and Feather parts carry the
+columnar schema of results.py; Feather parts are memory-mapped when read
+back. `--profile profile.json` records the
+time spent in each calculator stage across all workers.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-        # 2. CAPEX 계산
-        capex_costs = calculator.calculate_capital_costs(user_config, annual_nh3_tonne)
+import numpy as np
 
-        # 3. OPEX 계산
-        opex_costs = calculator.calculate_annual_operating_costs(user_config, capex_costs)
+import calculator
+import config_loader
+import instrument
+import results
 
-        # 4. LCOA 계산
-        lcoa_results = calculator.calculate_lcoa(user_config, capex_costs['total_capex_with_replacement'], opex_costs['total_annual_opex'], annual_nh3_tonne)
+DEFAULT_CHUNK_SIZE = 100_000
 
-    st.success("Calculation Complete!")
+# --- Sweep Specification ---
+def _axis_values(values):
+    if isinstance(values, dict):
+        return np.linspace(values['start'], values['stop'], int(values['num']))
+    return np.asarray(values)
 
-    # --- 결과 표시 ---
-    st.header("Simulation Results")
+class GridSweep:
+    """Cartesian product of parameter axes, decoded chunk by chunk without materializing it."""
 
-    # 최종 LCOA 메트릭
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Final LCOA", f"${lcoa_results['lcoa_final']:.2f}", "/tonne")
-    col2.metric("Production Cost", f"${lcoa_results['lcoa_production']:.2f}", "/tonne")
-    col3.metric("Transport Cost", f"${lcoa_results['transport_cost_per_tonne']:.2f}", "/tonne")
+    def __init__(self, spec):
+        self.names = list(spec['parameters'])
+        self.axes = [_axis_values(spec['parameters'][name]) for name in self.names]
+        self.fixed = spec.get('fixed', {})
+        self.total = int(np.prod([len(axis) for axis in self.axes]))
+        self.fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
 
-    # 비용 구성 바 차트
-    st.subheader("Cost Breakdown ($/tonne)")
-    cost_breakdown_data = {
-        'Annualized CAPEX': lcoa_results['annualized_capex'] / annual_nh3_tonne if annual_nh3_tonne > 0 else 0,
-        'Annual OPEX': opex_costs['total_annual_opex'] / annual_nh3_tonne if annual_nh3_tonne > 0 else 0,
-        'Transport Cost': lcoa_results['transport_cost_per_tonne']
-    }
-    cost_df = pd.DataFrame.from_dict(cost_breakdown_data, orient='index', columns=['Cost per Tonne'])
-    st.bar_chart(cost_df)
-
-    # 상세 결과 expander
-    with st.expander("Show Detailed Results"):
-        st.subheader("Production")
-        st.text(f"Annual Ammonia Production: {annual_nh3_tonne:,.2f} tonnes")
-        
-        st.subheader("Capital Expenditures (CAPEX)")
-        st.dataframe(pd.DataFrame([capex_costs]))
-
-        st.subheader("Operating Expenditures (OPEX)")
-        st.dataframe(pd.DataFrame([opex_costs]))
-        
-        st.subheader("Levelized Cost Analysis")
-        st.dataframe(pd.DataFrame([lcoa_results]))
-
-        # 다운로드용 전체 결과 취합
-        final_results = {
-            "Plant Capacity (MW)": plant_capacity_mw,
-            "Capacity Factor (%)": capacity_factor * 100,
-            "Electricity Cost ($/kWh)": electricity_cost,
-            "Discount Rate (%)": discount_rate * 100,
-            "Annual NH3 Production (tonne)": annual_nh3_tonne,
-            **{f"CAPEX - {k.replace('_', ' ').title()} ($)": v for k, v in capex_costs.items()},
-            **{f"OPEX - {k.replace('_', ' ').title()} ($)": v for k, v in opex_costs.items()},
-            **{f"LCOA - {k.replace('_', ' ').title()} ($/tonne)": v for k, v in lcoa_results.items()},
-        }
-        csv = pd.DataFrame([final_results]).to_csv(index=False).encode('utf-8')
-        
-        st.download_button(
-            label="Download Full Results as CSV",
-            data=csv,
-            file_name='LCOA_results.csv',
-            mime='text/csv',
-        )
+    def chunks(self, chunk_size):
+        for index, start in enumerate(range(0, self.total, chunk_size)):
+            yield index, (start, min(start + chunk_size, self.total))
+
+    def chunk_source(self, bounds):
+        return self  # axes only; small to send to a worker
+
+    def columns(self, bounds):
+        flat = np.arange(*bounds)
+        positions = np.unravel_index(flat, [len(axis) for axis in self.axes])
+        columns = {name: axis[position] for name, axis, position in zip(self.names, self.axes, positions)}
+        for name, value in self.fixed.items():
+            columns[name] = np.full(len(flat), value)
+        return columns
+
+class CsvSweep:
+    """Scenario rows from a CSV file, read in chunks by byte offset."""
+
+    def __init__(self, path):
+        import pandas as pd
+
+        self.path = path
+        self.header = list(pd.read_csv(path, nrows=0).columns)
+        digest = hashlib.sha1()
+        self.total = 0
+        with open(path, 'rb') as f:
+            digest.update(f.readline())
+            for line in f:
+                digest.update(line)
+                self.total += bool(line.strip())
+        self.fingerprint = digest.hexdigest()
+
+    def chunks(self, chunk_size):
+        """Yields (index, (start, stop, byte_offset)) for each chunk, recording only chunk offsets."""
+        with open(self.path, 'rb') as f:
+            offset = len(f.readline())
+            row = 0
+            for line in f:
+                if line.strip():
+                    if row % chunk_size == 0:
+                        yield row // chunk_size, (row, min(row + chunk_size, self.total), offset)
+                    row += 1
+                offset += len(line)
+
+    def chunk_source(self, bounds):
+        return self  # path and header; the worker reads its own rows
+
+    def columns(self, bounds):
+        import pandas as pd
+
+        start, stop, offset = bounds
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            frame = pd.read_csv(f, header=None, names=self.header, nrows=stop - start)
+        return {name: frame[name].to_numpy() for name in frame.columns}
+
+class ScenarioFileSweep:
+    """Scenarios from YAML/TOML scenario files, validated and loaded as columns."""
+
+    def __init__(self, path):
+        self._columns = config_loader.load_batch(path)
+        self.total = len(self._columns['name'])
+        with open(path, 'rb') as f:
+            self.fingerprint = hashlib.sha1(f.read()).hexdigest()
+
+    def chunks(self, chunk_size):
+        for index, start in enumerate(range(0, self.total, chunk_size)):
+            yield index, (start, min(start + chunk_size, self.total))
+
+    def chunk_source(self, bounds):
+        return LoadedChunk(self.columns(bounds))  # only this chunk's rows are pickled, not every column
+
+    def columns(self, bounds):
+        return {name: values[bounds[0]:bounds[1]] for name, values in self._columns.items()}
+
+class LoadedChunk:
+    """Columns of one chunk already in memory, sent to a worker in place of the whole sweep."""
+
+    def __init__(self, columns):
+        self._columns = columns
+
+    def columns(self, bounds):
+        return self._columns
+
+def load_sweep(path):
+    """Sweep for a scenario CSV, a JSON/YAML/TOML sweep spec, or a YAML/TOML scenario file."""
+    if path.endswith('.csv'):
+        return CsvSweep(path)
+    if path.endswith('.json'):
+        with open(path) as f:
+            return GridSweep(json.load(f))
+    spec = config_loader.load_config(path)
+    if 'parameters' in spec:
+        return GridSweep(spec)
+    return ScenarioFileSweep(path)
+
+# --- Chunk Evaluation ---
+def _part_path(output_dir, index, fmt):
+    return os.path.join(output_dir, f"part-{index:06d}.{fmt}")
+
+def run_chunk(source, index, bounds, output_dir, fmt):
+    """Evaluates one chunk and writes every RESULT_SCHEMA column atomically; returns the number of scenarios.
+
+    `source` is the sweep's chunk_source(bounds), whatever is cheapest to send
+    to a worker that loads the chunk's columns from it.
+    """
+    columns = source.columns(bounds)
+    table = results.to_table(calculator.evaluate_batch(columns),
+                             {'scenario_id': np.arange(bounds[0], bounds[1]), **columns})
+
+    path = _part_path(output_dir, index, fmt)
+    if fmt in results.FORMATS:
+        results.write(table, path, fmt)
+    else:
+        tmp = path + '.tmp'
+        results.to_pandas(table).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return bounds[1] - bounds[0]
+
+def _profiled_chunk(source, index, bounds, output_dir, fmt):
+    """run_chunk under instrumentation; returns the scenario count with the recorded events and cache counters."""
+    with instrument.recording() as recorder:
+        with recorder.span("run_chunk", 'sweep', items=bounds[1] - bounds[0]):
+            scenarios = run_chunk(source, index, bounds, output_dir, fmt)
+    return scenarios, recorder.events, recorder.cache_counts
+
+# --- Sweep Runner ---
+def _check_manifest(output_dir, sweep, chunk_size, fmt):
+    """Writes the manifest, or verifies that an existing one describes the same sweep."""
+    manifest = {'fingerprint': sweep.fingerprint, 'total': sweep.total, 'chunk_size': chunk_size, 'format': fmt,
+                'columns': list(results.RESULT_SCHEMA)}
+    path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            raise SystemExit(f"Error: '{output_dir}' holds a different sweep; use a new output directory.")
+    else:
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+def run_sweep(sweep, output_dir, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, fmt='csv', report=print, recorder=None):
+    """Runs every chunk that has no output yet, keeping at most 2 * workers chunks in flight.
+
+    With an instrument.Recorder as `recorder`, each worker records its chunks
+    and the events are merged into it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    _check_manifest(output_dir, sweep, chunk_size, fmt)
+
+    chunks = list(sweep.chunks(chunk_size))
+    pending = [(index, bounds) for index, bounds in chunks if not os.path.exists(_part_path(output_dir, index, fmt))]
+    done_chunks = len(chunks) - len(pending)
+    if done_chunks:
+        report(f"Resuming: {done_chunks}/{len(chunks)} chunks already complete.")
+
+    workers = workers or os.cpu_count()
+    started = time.perf_counter()
+    scenarios = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(pending)
+        in_flight = set()
+        while True:
+            for index, bounds in queue:
+                in_flight.add(pool.submit(run_chunk if recorder is None else _profiled_chunk,
+                                          sweep.chunk_source(bounds), index, bounds, output_dir, fmt))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if recorder is None:
+                    scenarios += future.result()
+                else:
+                    count, events, cache_counts = future.result()
+                    recorder.merge(events, cache_counts)
+                    scenarios += count
+                done_chunks += 1
+            elapsed = time.perf_counter() - started
+            rate = scenarios / elapsed if elapsed else 0.0
+            remaining = (sweep.total - done_chunks * chunk_size) / rate if rate else 0.0
+            report(f"[{done_chunks}/{len(chunks)} chunks] {scenarios:,} scenarios in {elapsed:.1f}s "
+                   f"({rate:,.0f} scenarios/s, ~{max(remaining, 0):.0f}s left)")
+    return {'chunks': len(chunks), 'scenarios': scenarios, 'seconds': time.perf_counter() - started}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an LCOA parameter sweep.")
+    parser.add_argument('spec', help="Sweep spec (JSON/YAML/TOML) or scenario file (CSV/YAML/TOML)")
+    parser.add_argument('-o', '--output', default='results', help="Output directory (default: results)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--format', choices=('csv', 'parquet', 'feather'), default='csv')
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Write a per-stage timing summary to PATH and a Chrome trace next to it")
+    args = parser.parse_args(argv)
+
+    sweep = load_sweep(args.spec)
+    recorder = instrument.Recorder() if args.profile else None
+    summary = run_sweep(sweep, args.output, args.chunk_size, args.workers, args.format, recorder=recorder)
+    print(f"Done: {summary['scenarios']:,} scenarios evaluated in {summary['seconds']:.1f}s.")
+    if recorder is not None:
+        recorder.stopped = time.perf_counter()
+        trace_path = os.path.splitext(args.profile)[0] + '.trace.json'
+        recorder.write_json(args.profile)
+        recorder.write_chrome_trace(trace_path)
+        print(f"Profile written to {args.profile} (Chrome trace: {trace_path}).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+
+import calculator
+
+# --- Default Uncertainty Assumptions ---
+# Each entry is (kind, *params):
+#   ('fixed', value), ('uniform', low, high), ('normal', mean, std),
+#   ('lognormal', median, sigma), ('triangular', low, mode, high)
+# Names in calculator.COST_CONSTANTS override cost constants; any other name
+# is a scenario column of calculator.evaluate_batch.
+DEFAULT_DISTRIBUTIONS = {
+    'ELECTROLYZER_CAPEX_PER_KW': ('triangular', 350, 450, 700),
+    'SOLAR_CAPEX_PER_KW': ('triangular', 450, 600, 800),
+    'WIND_CAPEX_PER_KW': ('triangular', 1000, 1200, 1600),
+    'ELECTROLYZER_OPEX_RATE': ('uniform', 0.01, 0.03),
+    'RE_OPEX_RATE': ('uniform', 0.01, 0.025),
+    'HB_OPEX_RATE': ('uniform', 0.02, 0.03),
+    'INFLATION_RATE': ('triangular', 0.01, 0.02, 0.04),
+    'solar_cf': ('triangular', 0.14, 0.18, 0.22),
+    'wind_cf': ('triangular', 0.28, 0.35, 0.42),
+    'discount_rate': ('uniform', 0.05, 0.11),
+}
+
+DEFAULT_METRICS = {
+    'lcoa_final': (0.0, 5000.0),
+}
+
+def sample(distributions, n, rng):
+    """Draws `n` samples per distribution; returns a dict of arrays."""
+    draws = {}
+    for name, (kind, *params) in distributions.items():
+        if kind == 'fixed':
+            draws[name] = np.full(n, float(params[0]))
+        elif kind == 'uniform':
+            draws[name] = rng.uniform(params[0], params[1], n)
+        elif kind == 'normal':
+            draws[name] = rng.normal(params[0], params[1], n)
+        elif kind == 'lognormal':
+            draws[name] = rng.lognormal(math.log(params[0]), params[1], n)
+        elif kind == 'triangular':
+            draws[name] = rng.triangular(params[0], params[1], params[2], n)
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for '{name}'")
+    return draws
+
+def chunk_rng(seed, chunk_index):
+    """Independent generator per chunk, so results do not depend on how chunks are scheduled."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+# --- Streaming Estimators ---
+class StreamingStats:
+    """Mergeable summary of a stream of values: moments, extremes and a fixed-bin histogram.
+
+    Sums are kept as exact fractions and the histogram as integer counts, so
+    merging partial results in any order or grouping gives exactly the same
+    answer as accumulating everything in one pass. Percentiles are read from
+    the histogram and are accurate to one bin width.
+    """
+
+    def __init__(self, value_range, bins=1000):
+        self.low, self.high = float(value_range[0]), float(value_range[1])
+        self.bins = bins
+        self.count = 0
+        self.invalid = 0
+        self.total = Fraction(0)
+        self.total_sq = Fraction(0)
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        self.invalid += int(values.size - finite.sum())
+        values = values[finite]
+        if values.size == 0:
+            return self
+
+        center = float(values.mean())
+        chunk_sum = float(values.sum())
+        centered_sq = float(np.square(values - center).sum())
+        center = Fraction(center)
+        # sum(x^2) = sum((x - c)^2) + 2c * sum(x) - n * c^2, evaluated exactly
+        self.count += values.size
+        self.total += Fraction(chunk_sum)
+        self.total_sq += Fraction(centered_sq) + 2 * center * Fraction(chunk_sum) - values.size * center * center
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+        self.histogram += np.histogram(values, bins=self.bins, range=(self.low, self.high))[0]
+        self.underflow += int((values < self.low).sum())
+        self.overflow += int((values > self.high).sum())
+        return self
+
+    def merge(self, other):
+        if (self.low, self.high, self.bins) != (other.low, other.high, other.bins):
+            raise ValueError("Cannot merge statistics with different histogram layouts")
+        merged = StreamingStats((self.low, self.high), self.bins)
+        merged.count = self.count + other.count
+        merged.invalid = self.invalid + other.invalid
+        merged.total = self.total + other.total
+        merged.total_sq = self.total_sq + other.total_sq
+        merged.minimum = min(self.minimum, other.minimum)
+        merged.maximum = max(self.maximum, other.maximum)
+        merged.histogram = self.histogram + other.histogram
+        merged.underflow = self.underflow + other.underflow
+        merged.overflow = self.overflow + other.overflow
+        return merged
+
+    @property
+    def mean(self):
+        return float(self.total / self.count) if self.count else math.nan
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return math.nan
+        return float((self.total_sq - self.total * self.total / self.count) / (self.count - 1))
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) by linear interpolation within histogram bins."""
+        if self.count == 0:
+            return math.nan
+        edges = np.linspace(self.low, self.high, self.bins + 1)
+        counts = np.concatenate(([self.underflow], self.histogram, [self.overflow]))
+        lower = np.concatenate(([min(self.minimum, self.low)], edges))
+        upper = np.concatenate((edges, [max(self.maximum, self.high)]))
+
+        rank = q / 100 * self.count
+        cumulative = np.cumsum(counts)
+        i = int(np.searchsorted(cumulative, rank, side='left'))
+        i = min(i, counts.size - 1)
+        before = cumulative[i] - counts[i]
+        fraction = (rank - before) / counts[i] if counts[i] else 0.0
+        value = lower[i] + fraction * (upper[i] - lower[i])
+        return float(min(max(value, self.minimum), self.maximum))
+
+    def summary(self, percentiles=(10, 50, 90)):
+        result = {"count": self.count, "mean": self.mean, "std": self.std,
+                  "min": self.minimum, "max": self.maximum}
+        for q in percentiles:
+            result[f"p{q}"] = self.percentile(q)
+        return result
+
+# --- Monte Carlo Engine ---
+def _chunk_bounds(n_samples, chunk_size):
+    n_chunks = -(-n_samples // chunk_size)
+    return [(i, min(chunk_size, n_samples - i * chunk_size)) for i in range(n_chunks)]
+
+def run_chunks(chunks, distributions, scenario, seed, metrics, bins):
+    """Evaluates the given (chunk_index, size) pairs and returns their merged statistics."""
+    stats = {name: StreamingStats(value_range, bins) for name, value_range in metrics.items()}
+    for chunk_index, size in chunks:
+        draws = sample(distributions, size, chunk_rng(seed, chunk_index))
+        costs = {name: draws.pop(name) for name in list(draws) if name in calculator.COST_CONSTANTS}
+        results = calculator.evaluate_batch(dict(scenario, **draws), costs=costs)
+        for name in stats:
+            stats[name].update(results[name])
+    return stats
+
+def run_monte_carlo(n_samples, distributions=None, scenario=None, seed=0, chunk_size=100_000,
+                    metrics=None, bins=1000, workers=1):
+    """Probabilistic LCOA: samples inputs in fixed-size chunks and streams them into StreamingStats.
+
+    `scenario` holds the fixed scenario columns (see calculator.SCENARIO_DEFAULTS);
+    `metrics` maps result columns to histogram ranges. Memory use depends only on
+    `chunk_size` and `bins`, and for a given seed and chunk size the result is
+    identical for any number of `workers`.
+
+    Returns a dict of StreamingStats keyed by metric name.
+    """
+    distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+    scenario = {} if scenario is None else scenario
+    metrics = DEFAULT_METRICS if metrics is None else metrics
+    chunks = _chunk_bounds(n_samples, chunk_size)
+
+    if workers <= 1:
+        return run_chunks(chunks, distributions, scenario, seed, metrics, bins)
+
+    groups = [chunks[i::workers] for i in range(workers) if chunks[i::workers]]
+    with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+        partials = list(pool.map(run_chunks, groups, *[[arg] * len(groups) for arg in
+                                                        (distributions, scenario, seed, metrics, bins)]))
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged = {name: merged[name].merge(partial[name]) for name in merged}
+    return merged
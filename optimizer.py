@@ -0,0 +1,115 @@
+import itertools
+
+import numpy as np
+
+import calculator
+import dispatch
+
+DESIGN_VARIABLES = ('electrolyzer_capacity_kw', 'solar_capacity_kw', 'wind_capacity_kw', 'ess_capacity_kwh')
+
+def initial_design(target_ammonia_tonne, strategy, scenario):
+    """Starting point from the app's sizing rules (electrolyzer = required RE capacity)."""
+    results = calculator.evaluate_batch(scenario, target_ammonia_tonne=target_ammonia_tonne, strategy=strategy)
+    design = {name: float(results[name]) for name in DESIGN_VARIABLES[:3]}
+    design['ess_capacity_kwh'] = float(results['ess_capacity_mwh']) * 1000
+    return design
+
+def evaluate_designs(designs, target_ammonia_tonne, strategy, solar_profile, wind_profile, scenario=None,
+                     efficiency=0.85, tolerance=1e-3):
+    """Dispatch-based LCOA of a batch of designs (dict of arrays keyed by DESIGN_VARIABLES).
+
+    Designs that miss the annual production target by more than `tolerance`
+    get an infinite LCOA.
+    """
+    scenario = {} if scenario is None else scenario
+    is_ess = strategy == 'ESS Balancing'
+    total_kwh_needed = calculator.calculate_required_kwh(target_ammonia_tonne)
+    ess_kwh = designs['ess_capacity_kwh'] if is_ess else 0.0
+
+    flows = dispatch.simulate_dispatch(
+        solar_profile, wind_profile, designs['solar_capacity_kw'], designs['wind_capacity_kw'],
+        designs['electrolyzer_capacity_kw'], dispatch.firm_load_kw(total_kwh_needed),
+        ess_kwh=ess_kwh, efficiency=efficiency, allow_grid=not is_ess,
+    )
+    results = calculator.evaluate_batch(
+        scenario, target_ammonia_tonne=target_ammonia_tonne, strategy=strategy,
+        electrolyzer_capacity_kw=designs['electrolyzer_capacity_kw'],
+        solar_capacity_kw=designs['solar_capacity_kw'], wind_capacity_kw=designs['wind_capacity_kw'],
+        ess_capacity_kwh=flows['ess_capacity_kwh'], grid_kwh=flows['grid_kwh'],
+    )
+    feasible = flows['electrolyzer_kwh'] >= total_kwh_needed * (1 - tolerance)
+    results['lcoa_final'] = np.where(feasible, results['lcoa_final'], np.inf)
+    results['feasible'] = feasible
+    results.update({f"dispatch_{name}": value for name, value in flows.items()})
+    return results
+
+def optimize_capacity(target_ammonia_tonne, strategy, solar_profile=None, wind_profile=None, scenario=None,
+                      initial=None, step=None, min_step=0.01, max_iterations=60, efficiency=0.85, tolerance=1e-3):
+    """Finds the electrolyzer, solar, wind and ESS sizes with the least LCOA that meet the target.
+
+    Uses a batched pattern search in log-capacity space: each iteration
+    evaluates every combination of {-step, 0, +step} around the incumbent in
+    one dispatch batch, moves to the best candidate, and halves the bracket
+    when the incumbent is already best. Pass the previous result as `initial`
+    to warm start with a small bracket (capacities are rescaled if the target
+    changed). Profiles default to synthetic ones built from the scenario's
+    capacity factors.
+
+    Returns a dict with the optimal design, its LCOA and the search statistics.
+    """
+    scenario = dict(calculator.SCENARIO_DEFAULTS, **(scenario or {}))
+    if solar_profile is None or wind_profile is None:
+        solar_profile, wind_profile = dispatch.synthetic_profiles(scenario['solar_cf'], scenario['wind_cf'])
+    variables = list(DESIGN_VARIABLES if strategy == 'ESS Balancing' else DESIGN_VARIABLES[:3])
+
+    if initial is not None:
+        scale = target_ammonia_tonne / initial['target_ammonia_tonne']
+        design = {name: initial['design'][name] * scale for name in DESIGN_VARIABLES}
+        step = 0.1 if step is None else step
+    else:
+        design = initial_design(target_ammonia_tonne, strategy, scenario)
+        step = 0.5 if step is None else step
+
+    # Search in log space; a small floor lets a technology shrink towards zero.
+    floor = 1e-3 * max(design[name] for name in DESIGN_VARIABLES[:3])
+    x = np.log(np.array([max(design[name], floor) for name in variables]))
+    directions = np.array(list(itertools.product((-1.0, 0.0, 1.0), repeat=len(variables))))
+    center = np.flatnonzero(~directions.any(axis=1))[0]
+
+    def evaluate(points):
+        designs = {name: np.zeros(len(points)) for name in DESIGN_VARIABLES}
+        designs.update({name: np.exp(points[:, i]) for i, name in enumerate(variables)})
+        return evaluate_designs(designs, target_ammonia_tonne, strategy, solar_profile, wind_profile,
+                                scenario, efficiency, tolerance)
+
+    evaluations = iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        candidates = x + step * directions
+        results = evaluate(candidates)
+        evaluations += len(candidates)
+        best = int(np.argmin(results['lcoa_final']))
+
+        if not np.isfinite(results['lcoa_final'][best]):
+            # Nothing in the bracket meets the target yet: grow capacities.
+            x = x + step
+            continue
+        if best == center:
+            step /= 2
+            if step < min_step:
+                break
+        else:
+            x = candidates[best]
+
+    final = evaluate(x[None, :])
+    design = {name: 0.0 for name in DESIGN_VARIABLES}
+    design.update({name: float(np.exp(x[i])) for i, name in enumerate(variables)})
+    return {
+        "target_ammonia_tonne": target_ammonia_tonne,
+        "strategy": strategy,
+        "design": design,
+        "lcoa_final": float(final['lcoa_final'][0]),
+        "feasible": bool(final['feasible'][0]),
+        "results": {name: value[0] for name, value in final.items()},
+        "iterations": iterations,
+        "evaluations": evaluations + 1,
+    }
@@ -0,0 +1,235 @@
+"""Pareto frontier of batch-evaluated designs: LCOA vs CAPEX vs grid share vs ESS size.
+
+Usage:
+    python pareto.py results/ -o frontier.npz
+    python pareto.py --random 2000000 -o frontier.csv --max-points 2000
+
+Reads the part files of a sweep (see main.py) chunk by chunk, or evaluates
+random designs across both strategies, and keeps only the non-dominated
+designs. All objectives are minimized unless listed in `maximize`.
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+
+import calculator
+
+OBJECTIVES = ('lcoa_final', 'total_capex', 'grid_share', 'ess_capacity_mwh')
+BLOCK_ROWS = 4096
+BLOCK_ELEMENTS = 1 << 22
+
+# --- Dominance ---
+def objective_columns(columns):
+    """Adds `grid_share` (grid energy over electrolyzer demand) to evaluate_batch-style result columns."""
+    if 'grid_share' in columns:
+        return columns
+    needed = np.asarray(columns['total_kwh_needed'], dtype=float)
+    is_ess = columns['ess'] if 'ess' in columns else np.asarray(columns['ess_capacity_mwh']) > 0
+    grid_kwh = columns['grid_kwh'] if 'grid_kwh' in columns else needed * calculator.GRID_SHARE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(is_ess | (needed == 0), 0.0, grid_kwh / needed)
+    return dict(columns, grid_share=share)
+
+def dominated(points, front):
+    """Mask of the rows of `points` that some row of `front` dominates (no worse everywhere, better somewhere)."""
+    mask = np.zeros(len(points), dtype=bool)
+    if not len(front) or not len(points):
+        return mask
+    rows = max(1, BLOCK_ELEMENTS // (len(front) * points.shape[1]))
+    for start in range(0, len(points), rows):
+        block = points[start:start + rows, None, :]
+        mask[start:start + rows] = ((front[None] <= block).all(axis=2) & (front[None] < block).any(axis=2)).any(axis=1)
+    return mask
+
+def skyline(values):
+    """Indices of the non-dominated rows of `values` (all minimized), by blocked sort-filter-skyline.
+
+    Rows are sorted by the sum of their range-normalized objectives, so no
+    row can be dominated by a later one. Rows are cut first against a few
+    pivot rows (the best in each objective and overall), then taken in blocks:
+    each block is filtered against the frontier found so far and against
+    itself, and its survivors are final. The cost grows with the frontier
+    size, so it suits the correlated objectives of cost studies; two
+    objectives take an O(n log n) sweep instead.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.shape[1] == 2:
+        return _skyline_2d(values)
+    span = values.max(axis=0) - values.min(axis=0)
+    score = ((values - values.min(axis=0)) / np.where(span > 0, span, 1)).sum(axis=1)
+    pivots = np.unique(np.append(values.argmin(axis=0), score.argmin()))
+    candidates = np.flatnonzero(~dominated(values, values[pivots]))
+    order = candidates[np.argsort(score[candidates], kind='stable')]
+
+    kept = []
+    front = values[:0]
+    for start in range(0, len(order), BLOCK_ROWS):
+        index = order[start:start + BLOCK_ROWS]
+        index = index[~dominated(values[index], front)]
+        block = values[index]
+        index = index[~dominated(block, block)]
+        kept.append(index)
+        front = np.concatenate([front, values[index]])
+    return np.concatenate(kept) if kept else np.zeros(0, dtype=np.intp)
+
+def _skyline_2d(values):
+    """Two objectives: sort on the first and keep each row that beats the best second objective so far."""
+    order = np.lexsort((values[:, 1], values[:, 0]))
+    ordered = values[order]
+    best_before = np.concatenate([[np.inf], np.minimum.accumulate(ordered[:-1, 1])])
+    keep = ordered[:, 1] < best_before
+    # Exact duplicates of a frontier row are not dominated by it either.
+    group = np.cumsum(np.concatenate([[True], (ordered[1:] != ordered[:-1]).any(axis=1)])) - 1
+    first = np.flatnonzero(np.concatenate([[True], np.diff(group) > 0]))
+    return order[keep[first][group]]
+
+# --- Streaming Frontier ---
+class ParetoFront:
+    """Non-dominated designs of a stream of result chunks, with every column of those designs kept.
+
+    Each chunk's own skyline is merged into the current frontier: frontier
+    rows dominated by the chunk are dropped and chunk rows dominated by the
+    frontier are discarded, so memory follows the frontier, not the sweep.
+    Rows with a non-finite objective (e.g. infeasible designs) are ignored.
+    """
+
+    def __init__(self, objectives=OBJECTIVES, maximize=()):
+        self.objectives = tuple(objectives)
+        self.sign = np.array([-1.0 if name in maximize else 1.0 for name in self.objectives])
+        self.front = {}
+        self.values = np.zeros((0, len(self.objectives)))
+        self.rows_seen = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def _values(self, columns):
+        return np.column_stack([np.asarray(columns[name], dtype=float) for name in self.objectives]) * self.sign
+
+    def update(self, columns):
+        """Merges a chunk of result columns (e.g. from calculator.evaluate_batch or a sweep part)."""
+        columns = objective_columns(columns) if 'grid_share' in self.objectives else columns
+        n = len(np.asarray(columns[self.objectives[0]]))
+        columns = {name: np.broadcast_to(np.asarray(value), (n,)) for name, value in columns.items()
+                   if np.ndim(value) <= 1}
+        values = self._values(columns)
+        self.rows_seen += n
+        finite = np.flatnonzero(np.isfinite(values).all(axis=1))
+        if not finite.size:
+            return self
+        index = finite[skyline(values[finite])]
+        index = index[~dominated(values[index], self.values)]
+        chunk = values[index]
+
+        keep = ~dominated(self.values, chunk)
+        if self.front and set(columns) != set(self.front):
+            raise ValueError("Every chunk must have the same columns")
+        self.front = {name: np.concatenate([self.front[name][keep], columns[name][index]]) if self.front
+                      else np.array(columns[name][index]) for name in columns}
+        self.values = np.concatenate([self.values[keep], chunk])
+        return self
+
+    def columns(self, max_points=None):
+        """The frontier as a dict of columns sorted by the first objective, optionally thinned."""
+        order = np.argsort(self.values[:, 0], kind='stable')
+        if max_points is not None and len(order) > max_points:
+            order = order[self.spread(max_points)]
+        return {name: values[order] for name, values in self.front.items()}
+
+    def spread(self, max_points):
+        """Positions (in first-objective order) of at most `max_points` rows spread over the frontier.
+
+        Rows are bucketed on a grid over the range-normalized objectives and
+        one row per occupied cell is kept, refining the grid until the budget
+        is filled.
+        """
+        values = self.values[np.argsort(self.values[:, 0], kind='stable')]
+        span = values.max(axis=0) - values.min(axis=0)
+        unit = (values - values.min(axis=0)) / np.where(span > 0, span, 1)
+        chosen = np.zeros(0, dtype=np.intp)
+        cells = 1
+        while True:
+            key = np.minimum((unit * cells).astype(np.int64), cells - 1)
+            _, first = np.unique(key, axis=0, return_index=True)
+            if len(first) > max_points:
+                break
+            chosen = np.sort(first)
+            if len(first) == len(values):
+                break
+            cells *= 2
+        return chosen if chosen.size else np.arange(min(max_points, len(values)))
+
+    def to_frame(self, max_points=None):
+        import pandas as pd
+
+        return pd.DataFrame(self.columns(max_points))
+
+    def save(self, path, max_points=None):
+        """Writes the frontier as .npz (objectives as float32, compact for plotting), .csv or .parquet."""
+        columns = self.columns(max_points)
+        if path.endswith('.npz'):
+            compact = {name: values.astype(np.float32) if name in self.objectives else values
+                       for name, values in columns.items()}
+            compact = {name: values.astype(str) if values.dtype == object else values for name, values in compact.items()}
+            np.savez_compressed(path, **compact)
+        elif path.endswith('.parquet'):
+            self.to_frame(max_points).to_parquet(path, index=False)
+        else:
+            self.to_frame(max_points).to_csv(path, index=False)
+
+# --- Sources ---
+def sweep_parts(output_dir):
+    """Yields the part files of a sweep output directory as dicts of columns, in order."""
+    import pandas as pd
+
+    import results
+
+    for path in sorted(glob.glob(os.path.join(output_dir, 'part-*.*'))):
+        if path.endswith('.tmp'):
+            continue
+        if path.endswith('.csv'):
+            frame = pd.read_csv(path)
+            yield {name: frame[name].to_numpy() for name in frame.columns}
+        else:
+            yield results.columns_of(results.read(path))
+
+def random_designs(count, chunk_size=500_000, seed=0):
+    """Yields evaluate_batch results of random designs across both strategies, `chunk_size` at a time."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        columns = {
+            'scenario_id': np.arange(start, start + n),
+            'strategy': np.where(rng.random(n) < 0.5, 'ESS Balancing', 'Grid Balancing'),
+            'solar_cf': rng.uniform(0.10, 0.30, n),
+            'wind_cf': rng.uniform(0.20, 0.50, n),
+            'solar_wind_ratio': rng.uniform(0, 1, n),
+            'discount_rate': rng.uniform(0.04, 0.12, n),
+            'ess_capex_per_kwh': rng.uniform(150, 500, n),
+            'grid_purchase_price': rng.uniform(0.05, 0.25, n),
+        }
+        yield dict(columns, **calculator.evaluate_batch(columns))
+
+if __name__ == '__main__':
+    import time
+
+    parser = argparse.ArgumentParser(description="Extract the Pareto frontier of evaluated designs.")
+    parser.add_argument('results', nargs='?', help="Sweep output directory (part-NNNNNN files)")
+    parser.add_argument('--random', type=int, default=0, help="Evaluate this many random designs instead")
+    parser.add_argument('--objectives', default=','.join(OBJECTIVES), help="Comma-separated result columns")
+    parser.add_argument('--maximize', default='', help="Comma-separated objectives to maximize")
+    parser.add_argument('-o', '--output', default='frontier.npz', help="Output (.npz, .csv or .parquet)")
+    parser.add_argument('--max-points', type=int, default=None, help="Thin the exported frontier to this many points")
+    args = parser.parse_args()
+    if not args.results and not args.random:
+        parser.error("give a sweep output directory or --random N")
+
+    front = ParetoFront(args.objectives.split(','), [name for name in args.maximize.split(',') if name])
+    started = time.perf_counter()
+    for chunk in (random_designs(args.random) if args.random else sweep_parts(args.results)):
+        front.update(chunk)
+        print(f"{front.rows_seen:,} designs -> {len(front):,} on the frontier ({time.perf_counter() - started:.1f}s)")
+    front.save(args.output, args.max_points)
+    print(f"Frontier written to {args.output}.")
@@ -0,0 +1,156 @@
+import argparse
+
+import numpy as np
+
+import calculator
+
+# Flat delivery cost used to turn production LCOA into delivered LCOA.
+TRANSPORT_COST_PER_TON_KM = 0.05
+
+DEFAULT_BATCH_ROWS = 100_000
+
+# --- Catalog Streaming ---
+def stream_catalog(path, batch_rows=DEFAULT_BATCH_ROWS):
+    """Yields a site catalog as dicts of column arrays: Parquet row group by row group, CSV in chunks.
+
+    Expected columns are `site_id` and `distance_km` plus any column of
+    calculator.SCENARIO_DEFAULTS (solar_cf, wind_cf, grid_purchase_price,
+    ess_capex_per_kwh, ...); missing ones fall back to the defaults.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for i in range(parquet.num_row_groups):
+            table = parquet.read_row_group(i)
+            yield {name: table.column(name).to_numpy() for name in table.column_names}
+    else:
+        import pandas as pd
+
+        for frame in pd.read_csv(path, chunksize=batch_rows):
+            yield {name: frame[name].to_numpy() for name in frame.columns}
+
+def score_sites(sites, scenario=None, transport_cost_per_ton_km=TRANSPORT_COST_PER_TON_KM, network=None):
+    """Evaluates every site under both strategies; returns per-site LCOA columns and the best strategy.
+
+    With a logistics.Network, sites (which then need `lat` and `lon`) are
+    assigned to their cheapest demand center instead of paying the flat
+    per-km rate on `distance_km`.
+    """
+    scenario = {} if scenario is None else scenario
+    columns = {name: values for name, values in sites.items() if name in calculator.SCENARIO_DEFAULTS}
+    n = len(sites['site_id'])
+    stacked = {name: np.concatenate([np.broadcast_to(values, (n,))] * 2) for name, values in columns.items()}
+    stacked['ess'] = np.repeat([False, True], n)
+    lcoa = calculator.evaluate_batch(dict(scenario, **stacked))['lcoa_final'].reshape(2, n)
+
+    extra = {}
+    if network is None:
+        transport = np.asarray(sites.get('distance_km', np.zeros(n)), dtype=float) * transport_cost_per_ton_km
+    else:
+        volume = columns.get('target_ammonia_tonne', scenario.get('target_ammonia_tonne',
+                                                                  calculator.SCENARIO_DEFAULTS['target_ammonia_tonne']))
+        assignment = network.assign(sites['lat'], sites['lon'], volume)
+        transport = assignment['transport_cost_per_tonne']
+        extra = {"demand_center": assignment['demand_center']}
+    best_ess = lcoa[1] < lcoa[0]
+    production = np.where(best_ess, lcoa[1], lcoa[0])
+    return {
+        "site_id": np.asarray(sites['site_id']),
+        "lcoa_grid": lcoa[0],
+        "lcoa_ess": lcoa[1],
+        "best_strategy": np.where(best_ess, 'ESS Balancing', 'Grid Balancing'),
+        **extra,
+        "transport_cost_per_tonne": transport,
+        "delivered_lcoa": production + transport,
+    }
+
+# --- Top-K Ranking ---
+class PortfolioScreen:
+    """Running top-K ranking of sites by delivered LCOA with flat memory.
+
+    Only the best `k + reserve` sites are retained. `floor` is the lowest
+    score ever evicted, so no site outside the ranking scores below it. The
+    reserve lets `rescore` absorb changed sites incrementally: the top K is
+    still exact (`certified`) as long as K retained sites score at or below
+    the floor; otherwise the catalog must be screened again.
+    """
+
+    def __init__(self, k=100, reserve=None, scenario=None, transport_cost_per_ton_km=TRANSPORT_COST_PER_TON_KM,
+                 network=None):
+        self.k = k
+        self.capacity = k + (k if reserve is None else reserve)
+        self.scenario = scenario
+        self.transport_cost_per_ton_km = transport_cost_per_ton_km
+        self.network = network
+        self.ranking = None
+        self.floor = np.inf
+        self.sites_scored = 0
+
+    def _merge(self, scored):
+        if self.ranking is not None:
+            scored = {name: np.concatenate([self.ranking[name], values]) for name, values in scored.items()}
+        score = scored['delivered_lcoa']
+        if len(score) > self.capacity:
+            order = np.argpartition(score, self.capacity)
+            kept, evicted = order[:self.capacity], order[self.capacity:]
+            self.floor = min(self.floor, float(score[evicted].min()))
+        else:
+            kept = np.arange(len(score))
+        kept = kept[np.argsort(score[kept], kind='stable')]
+        self.ranking = {name: values[kept] for name, values in scored.items()}
+
+    def update(self, sites):
+        """Scores a batch of catalog rows and merges it into the ranking."""
+        scored = score_sites(sites, self.scenario, self.transport_cost_per_ton_km, self.network)
+        self.sites_scored += len(scored['site_id'])
+        self._merge(scored)
+        return self
+
+    def screen(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        """Streams a whole catalog file through the ranking."""
+        for sites in stream_catalog(path, batch_rows):
+            self.update(sites)
+        return self
+
+    def rescore(self, sites):
+        """Re-scores sites whose inputs changed, replacing any retained entries for them."""
+        if self.ranking is not None:
+            keep = ~np.isin(self.ranking['site_id'], np.asarray(sites['site_id']))
+            self.ranking = {name: values[keep] for name, values in self.ranking.items()}
+        self._merge(score_sites(sites, self.scenario, self.transport_cost_per_ton_km, self.network))
+        return self
+
+    @property
+    def certified(self):
+        """True when the current top K is guaranteed to be the catalog's true top K."""
+        if self.ranking is None:
+            return False
+        known = self.ranking['delivered_lcoa'] <= self.floor
+        return bool(known[:self.k].all()) and len(self.ranking['site_id']) >= min(self.k, self.sites_scored)
+
+    def top(self, k=None):
+        """The best `k` sites (default K) as a dict of columns, cheapest first."""
+        k = self.k if k is None else k
+        return {name: values[:k] for name, values in (self.ranking or {}).items()}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rank the sites of a catalog by delivered LCOA.")
+    parser.add_argument('catalog', help="Site catalog (CSV or Parquet)")
+    parser.add_argument('-k', type=int, default=20, help="Number of sites to report (default 20)")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--transport-cost', type=float, default=TRANSPORT_COST_PER_TON_KM, help="USD per tonne-km")
+    parser.add_argument('--network', help="Logistics network JSON; sites then need lat/lon columns")
+    args = parser.parse_args()
+    network = None
+    if args.network:
+        import logistics
+        network = logistics.Network.load(args.network)
+    screen = PortfolioScreen(k=args.k, transport_cost_per_ton_km=args.transport_cost, network=network)
+    screen.screen(args.catalog, args.batch_rows)
+    top = screen.top()
+    for i in range(len(top['site_id'])):
+        destination = f" to {top['demand_center'][i]}" if 'demand_center' in top else ""
+        print(f"{i + 1:4d}. {top['site_id'][i]!s:20s} {top['delivered_lcoa'][i]:10.2f} USD/t "
+              f"({top['best_strategy'][i]}, transport {top['transport_cost_per_tonne'][i]:.2f}{destination})")
+    print(f"Screened {screen.sites_scored:,} sites.")
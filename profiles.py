@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+DEFAULT_PATH = 'profile_store'
+VARIABLES = ('solar_cf', 'wind_cf')
+
+# --- On-Disk Layout ---
+# One .npy file per variable and year, shaped (site, hour of year), plus an
+# index.json holding the site order and the years present. Every year file uses
+# the same site order, so a site's row is looked up once from the index.
+
+def _year_hours(year):
+    return 24 * (366 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 365)
+
+def _filename(variable, year, dtype):
+    return f"{variable}-{year}-{dtype}.npy"
+
+def _read_index(path):
+    index_path = os.path.join(path, 'index.json')
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        return json.load(f)
+
+def _write_index(path, index):
+    tmp = os.path.join(path, 'index.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, os.path.join(path, 'index.json'))
+
+class _YearWriter:
+    """Fills per-year memory-mapped files for a set of sites, then publishes them in the index."""
+
+    def __init__(self, path, sites, dtype):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.index = _read_index(path) or {'dtype': dtype, 'sites': [], 'years': {}}
+        if self.index['dtype'] != dtype:
+            raise ValueError(f"Store '{path}' holds {self.index['dtype']} profiles, not {dtype}")
+        known = set(self.index['sites'])
+        new = sorted(site for site in set(sites) if site not in known)
+        if new and self.index['years']:
+            raise ValueError("New sites cannot be added to a store that already holds years; ingest into a new store")
+        self.index['sites'] += new
+        self.rows = {site: row for row, site in enumerate(self.index['sites'])}
+        self.dtype = dtype
+        self.arrays = {}
+
+    def array(self, variable, year):
+        key = (variable, year)
+        if key not in self.arrays:
+            tmp = os.path.join(self.path, _filename(variable, year, self.dtype) + '.tmp')
+            array = np.lib.format.open_memmap(tmp, mode='w+', dtype=self.dtype,
+                                              shape=(len(self.index['sites']), _year_hours(year)))
+            array[:] = np.nan
+            self.arrays[key] = array
+        return self.arrays[key]
+
+    def close(self):
+        for (variable, year), array in self.arrays.items():
+            array.flush()
+            filename = _filename(variable, year, self.dtype)
+            os.replace(os.path.join(self.path, filename + '.tmp'), os.path.join(self.path, filename))
+            entry = self.index['years'].setdefault(str(year), {'hours': _year_hours(year), 'files': {}})
+            entry['files'][variable] = filename
+        self.arrays = {}
+        _write_index(self.path, self.index)
+        return self.index
+
+# --- Ingest ---
+def ingest_csv(csv_path, path=DEFAULT_PATH, dtype='float32', variables=VARIABLES, chunksize=1_000_000):
+    """Ingests a long-format hourly CSV (site_id, timestamp, solar_cf, wind_cf) into the store.
+
+    The file is read twice in chunks, once to collect the sites and once to
+    fill the year files, so memory stays bounded by the chunk size. Hours
+    missing from the CSV are stored as NaN; a year ingested again is replaced.
+    """
+    import pandas as pd
+
+    sites = {}
+    for frame in pd.read_csv(csv_path, usecols=['site_id'], dtype={'site_id': str}, chunksize=chunksize):
+        sites.update(dict.fromkeys(frame['site_id'].unique()))
+    writer = _YearWriter(path, list(sites), dtype)
+
+    for frame in pd.read_csv(csv_path, usecols=['site_id', 'timestamp', *variables], dtype={'site_id': str},
+                             chunksize=chunksize):
+        timestamp = pd.to_datetime(frame['timestamp'])
+        year = timestamp.dt.year.to_numpy()
+        hour = ((timestamp - pd.to_datetime(year.astype(str), format='%Y')) // pd.Timedelta(hours=1)).to_numpy()
+        rows = frame['site_id'].map(writer.rows).to_numpy()
+        for y in np.unique(year):
+            mask = year == y
+            for variable in variables:
+                writer.array(variable, int(y))[rows[mask], hour[mask]] = frame[variable].to_numpy()[mask]
+    return writer.close()
+
+def ingest_netcdf(nc_path, path=DEFAULT_PATH, dtype='float32', variables=VARIABLES, site_dim='site', time_dim='time'):
+    """Ingests a NetCDF dataset with (site, time) capacity-factor variables. Requires xarray."""
+    try:
+        import xarray as xr
+    except ImportError:
+        raise ImportError("NetCDF ingest requires xarray (pip install xarray netCDF4)") from None
+
+    with xr.open_dataset(nc_path) as dataset:
+        sites = [str(site) for site in dataset[site_dim].values]
+        writer = _YearWriter(path, sites, dtype)
+        rows = np.array([writer.rows[site] for site in sites])
+        times = dataset[time_dim].to_index()
+        for y in np.unique(times.year):
+            mask = times.year == y
+            hour = ((times[mask] - np.datetime64(f"{y}-01-01")) // np.timedelta64(1, 'h')).to_numpy()
+            for variable in variables:
+                values = dataset[variable].isel({time_dim: np.flatnonzero(mask)}).transpose(site_dim, time_dim)
+                writer.array(variable, int(y))[rows[:, None], hour[None, :]] = values.values
+    return writer.close()
+
+# --- Reading ---
+class ProfileStore:
+    """Memory-mapped hourly capacity-factor profiles, indexed by site ID and year.
+
+    Only index.json is read at construction. Year files are memory-mapped on
+    first use, and windows over a contiguous run of sites are views into the
+    mapping, so only the pages a study touches are read from disk.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.index = _read_index(path)
+        if self.index is None:
+            raise FileNotFoundError(f"No profile store at '{path}' (index.json missing)")
+        self.sites = self.index['sites']
+        self.years = sorted(int(year) for year in self.index['years'])
+        self._rows = {site: row for row, site in enumerate(self.sites)}
+        self._arrays = {}
+
+    def _array(self, variable, year):
+        key = (variable, year)
+        if key not in self._arrays:
+            try:
+                filename = self.index['years'][str(year)]['files'][variable]
+            except KeyError:
+                raise KeyError(f"No '{variable}' profiles for {year} in '{self.path}'") from None
+            self._arrays[key] = np.load(os.path.join(self.path, filename), mmap_mode='r')
+        return self._arrays[key]
+
+    def site_rows(self, sites=None):
+        """Row selector for site IDs: a slice (zero-copy) when they form a contiguous run."""
+        if sites is None:
+            return slice(None)
+        if isinstance(sites, str):
+            return self._rows[sites]
+        rows = np.array([self._rows[site] for site in sites], dtype=np.intp)
+        if rows.size and np.array_equal(rows, np.arange(rows[0], rows[0] + rows.size)):
+            return slice(int(rows[0]), int(rows[0] + rows.size))
+        return rows
+
+    def profile(self, variable, year, sites=None, start=0, hours=None):
+        """Profiles of `sites` for `hours` hours from hour `start` of `year`, shaped (site, hour).
+
+        Returns a read-only memmap view unless the sites are non-contiguous.
+        """
+        stop = None if hours is None else start + hours
+        return self._array(variable, year)[self.site_rows(sites), start:stop]
+
+    def profiles(self, variable, sites=None, years=None, start=0, hours=None):
+        """Profiles spanning several years, concatenated along the hour axis (a copy if more than one)."""
+        years = self.years if years is None else list(years)
+        windows = [self.profile(variable, year, sites, start, hours) for year in years]
+        return windows[0] if len(windows) == 1 else np.concatenate(windows, axis=-1)
+
+    def capacity_factors(self, sites=None, years=None, start=0, hours=None, block=4096):
+        """Mean solar and wind CF per site over a window, as evaluate_batch input columns.
+
+        Means are accumulated in float64, `block` sites at a time, ignoring
+        missing (NaN) hours. The result replaces the scalar `solar_cf` and
+        `wind_cf` scenario inputs with one value per site.
+        """
+        years = self.years if years is None else list(years)
+        site_ids = self.sites if sites is None else [sites] if isinstance(sites, str) else list(sites)
+        rows = np.array([self._rows[site] for site in site_ids], dtype=np.intp)
+        stop = None if hours is None else start + hours
+
+        columns = {'site_id': np.array(site_ids)}
+        for variable in VARIABLES:
+            total = np.zeros(len(rows))
+            count = np.zeros(len(rows))
+            for year in years:
+                array = self._array(variable, year)
+                for i in range(0, len(rows), block):
+                    chunk = rows[i:i + block]
+                    contiguous = np.array_equal(chunk, np.arange(chunk[0], chunk[-1] + 1))
+                    selector = slice(chunk[0], chunk[-1] + 1) if contiguous else chunk
+                    window = array[selector, start:stop]
+                    total[i:i + block] += np.nansum(window, axis=1, dtype=np.float64)
+                    count[i:i + block] += np.count_nonzero(~np.isnan(window), axis=1)
+            with np.errstate(invalid='ignore'):
+                columns[variable] = total / count
+        return columns
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest hourly capacity-factor profiles into a profile store.")
+    parser.add_argument('source', help="Long-format CSV (site_id, timestamp, solar_cf, wind_cf) or NetCDF file")
+    parser.add_argument('--path', default=DEFAULT_PATH, help="Store directory")
+    parser.add_argument('--dtype', default='float32', choices=('float16', 'float32'))
+    args = parser.parse_args()
+    ingest = ingest_netcdf if args.source.endswith(('.nc', '.nc4')) else ingest_csv
+    index = ingest(args.source, args.path, args.dtype)
+    print(f"Stored {len(index['sites'])} sites for years {', '.join(sorted(index['years']))} in '{args.path}'.")
@@ -0,0 +1,178 @@
+"""Columnar result schema with Arrow-backed Parquet/Feather storage.
+
+Every result column of calculator.evaluate_batch is listed in RESULT_SCHEMA
+with its group and unit, so a study output is a flat table with one row per
+scenario. Tables are built from the NumPy result arrays without copying,
+Feather files are written uncompressed so that reading them memory-maps the
+buffers instead of parsing them, and to_pandas hands those buffers to pandas
+without consolidating them. pyarrow is imported on first use.
+"""
+import io
+import os
+
+import numpy as np
+
+# --- Schema ---
+# name -> (group, unit); the order is the column order of a results table.
+RESULT_SCHEMA = {
+    'total_kwh_needed': ('sizing', 'kWh/year'),
+    'electrolyzer_capacity_kw': ('sizing', 'kW'),
+    'solar_capacity_kw': ('sizing', 'kW'),
+    'wind_capacity_kw': ('sizing', 'kW'),
+    'electrolyzer_utilization': ('sizing', 'fraction'),
+    'ess': ('sizing', 'bool'),
+    'electrolyzer_capex': ('capex', 'USD'),
+    'solar_capex': ('capex', 'USD'),
+    'wind_capex': ('capex', 'USD'),
+    'haber_bosch_capex': ('capex', 'USD'),
+    'storage_capex': ('capex', 'USD'),
+    'electrolyzer_replacement_pv': ('capex', 'USD'),
+    'ess_capex': ('capex', 'USD'),
+    'ess_capacity_mwh': ('capex', 'MWh'),
+    'calculated_storage_duration_hours': ('capex', 'h'),
+    'total_capex': ('capex', 'USD'),
+    'fixed_opex': ('opex', 'USD/year'),
+    'variable_opex (grid_cost)': ('opex', 'USD/year'),
+    'total_annual_opex': ('opex', 'USD/year'),
+    'crf': ('lcoa', 'fraction'),
+    'annualized_capex_per_tonne': ('lcoa', 'USD/t'),
+    'opex_per_tonne': ('lcoa', 'USD/t'),
+    'lcoa_final': ('lcoa', 'USD/t'),
+    'transport_cost_per_tonne': ('lcoa', 'USD/t'),
+    'delivered_lcoa': ('lcoa', 'USD/t'),
+}
+FORMATS = ('parquet', 'feather')
+
+def _field(pa, name, array):
+    group, unit = RESULT_SCHEMA.get(name, ('input', ''))
+    return pa.field(name, array.type, metadata={'group': group, 'unit': unit})
+
+def _arrow_array(pa, values, n):
+    values = np.asarray(values)
+    if values.ndim == 0 or len(values) != n:
+        values = np.broadcast_to(values, (n,))
+    if values.dtype.kind in 'OUS':
+        return pa.array(values.astype(str)).dictionary_encode()  # strategy names repeat
+    return pa.array(np.ascontiguousarray(values))  # numeric buffers are wrapped, not copied
+
+# --- Tables ---
+def to_table(results, inputs=None, columns=None):
+    """Arrow table of result columns (from evaluate_batch or graph.Graph.results), with input columns first.
+
+    `inputs` adds the scenario columns that were evaluated, in their own
+    order; `columns` restricts the result columns, which default to every
+    RESULT_SCHEMA column present. Scalars are broadcast to the row count.
+    """
+    import pyarrow as pa
+
+    names = [name for name in (RESULT_SCHEMA if columns is None else columns) if name in results]
+    n = max(np.size(results[name]) for name in names)
+    arrays, fields = [], []
+    for name, values in list((inputs or {}).items()) + [(name, results[name]) for name in names]:
+        array = _arrow_array(pa, values, n)
+        arrays.append(array)
+        fields.append(_field(pa, name, array))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+def to_pandas(table):
+    """DataFrame over the table's buffers; numeric columns without nulls are not copied."""
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+def columns_of(table, names=None):
+    """Dict of NumPy arrays viewing the table's numeric columns (strings are decoded)."""
+    names = table.column_names if names is None else names
+    return {name: table.column(name).to_numpy() for name in names}
+
+# --- Writers ---
+def write(table, path, fmt=None):
+    """Writes a table atomically as Parquet (compressed) or Feather (uncompressed, memory-mappable)."""
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    fmt = fmt or _format(path)
+    tmp = path + '.tmp'
+    if fmt == 'parquet':
+        pq.write_table(table, tmp)
+    else:
+        feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    return path
+
+def to_bytes(table, fmt='parquet'):
+    """The table serialized in memory, e.g. for a download button."""
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    if fmt == 'parquet':
+        pq.write_table(table, buffer)
+    else:
+        feather.write_feather(table, buffer, compression='uncompressed')
+    return buffer.getvalue()
+
+# --- Readers ---
+def _format(path):
+    extension = os.path.splitext(path)[1].lstrip('.')
+    if extension in ('feather', 'arrow', 'ipc'):
+        return 'feather'
+    if extension == 'parquet':
+        return 'parquet'
+    raise ValueError(f"Unknown results format for '{path}'; expected one of {FORMATS}")
+
+def read(path, columns=None):
+    """Reads a results file; Feather files are memory-mapped, so only the columns used are paged in."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if _format(path) == 'parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table if columns is None else table.select(columns)
+
+def scan(path, columns=None, where=None):
+    """Reads the matching rows of a results file or a directory of sweep parts.
+
+    `where` maps column names to (low, high) bounds (None for open ends),
+    e.g. {'lcoa_final': (None, 900), 'strategy': 'ESS Balancing'}, or is a
+    pyarrow.dataset expression. Filters are pushed down to the files, so
+    Parquet row groups outside the bounds are skipped.
+    """
+    import pyarrow.dataset as ds
+
+    if os.path.isdir(path):
+        parts = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if name.startswith('part-') and not name.endswith('.tmp') and name.rsplit('.', 1)[-1] != 'csv')
+        fmt = _format(parts[0]) if parts else 'parquet'
+    else:
+        parts, fmt = path, _format(path)
+    dataset = ds.dataset(parts, format='ipc' if fmt == 'feather' else 'parquet')
+    if isinstance(where, dict):
+        expression = None
+        for name, bounds in where.items():
+            if isinstance(bounds, tuple):
+                low, high = bounds
+                terms = ([ds.field(name) >= low] if low is not None else []) + \
+                        ([ds.field(name) <= high] if high is not None else [])
+            else:
+                terms = [ds.field(name) == bounds]
+            for term in terms:
+                expression = term if expression is None else expression & term
+        where = expression
+    return dataset.to_table(columns=columns, filter=where)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize or convert a results file or sweep output directory.")
+    parser.add_argument('path', help="Results file (.parquet/.feather) or sweep output directory")
+    parser.add_argument('--columns', help="Comma-separated columns to read")
+    parser.add_argument('-o', '--output', help="Write the (filtered) table to this .parquet or .feather file")
+    parser.add_argument('--max-lcoa', type=float, help="Keep rows with lcoa_final at or below this value")
+    args = parser.parse_args()
+    table = scan(args.path, args.columns.split(',') if args.columns else None,
+                 {'lcoa_final': (None, args.max_lcoa)} if args.max_lcoa is not None else None)
+    print(f"{table.num_rows:,} rows, {table.num_columns} columns, {table.nbytes / 2**20:.1f} MiB")
+    print(to_pandas(table).describe().T.to_string())
+    if args.output:
+        write(table, args.output)
+        print(f"Written to {args.output}.")
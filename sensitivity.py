@@ -0,0 +1,148 @@
+import numpy as np
+
+import calculator
+
+# Parameters with closed-form elasticities: LCOA is linear in the cost constants
+# and prices, and the CRF and replacement PV have analytic derivatives in the
+# discount rate, lifetime and inflation.
+ANALYTIC_PARAMETERS = (
+    'ELECTROLYZER_CAPEX_PER_KW', 'SOLAR_CAPEX_PER_KW', 'WIND_CAPEX_PER_KW',
+    'HB_CAPEX_PER_KW_ELECTROLYZER', 'STORAGE_CAPEX_PER_TONNE',
+    'ELECTROLYZER_OPEX_RATE', 'RE_OPEX_RATE', 'HB_OPEX_RATE', 'STORAGE_OPEX_RATE', 'ESS_OPEX_RATE',
+    'INFLATION_RATE', 'ess_capex_per_kwh', 'grid_purchase_price', 'discount_rate', 'plant_lifetime',
+)
+# Parameters that enter through capacity sizing, evaluated by central finite differences.
+NUMERIC_PARAMETERS = (
+    'target_ammonia_tonne', 'solar_cf', 'wind_cf', 'solar_wind_ratio', 'H2_LHV', 'ELECTROLYZER_EFFICIENCY',
+)
+PARAMETERS = ANALYTIC_PARAMETERS + NUMERIC_PARAMETERS
+
+RELATIVE_STEP = 1e-4
+
+def _base_columns(scenarios, columns):
+    """Scenario columns as a dict of equal-length arrays, filled from SCENARIO_DEFAULTS."""
+    base = dict(calculator.SCENARIO_DEFAULTS)
+    if scenarios is not None:
+        names = scenarios.dtype.names if hasattr(scenarios, 'dtype') and scenarios.dtype.names else list(scenarios)
+        base.update({name: np.asarray(scenarios[name]) for name in names if name in base or name == 'ess'})
+    base.update(columns)
+    if 'ess' in base:
+        base['strategy'] = np.where(calculator.ess_mask(base.pop('ess')), 'ESS Balancing', 'Grid Balancing')
+    n = np.broadcast(*(np.asarray(value) for value in base.values())).size
+    return {name: np.broadcast_to(np.asarray(value), (n,)) for name, value in base.items()}
+
+def _base_value(base, costs, name, n):
+    if name in base:
+        return np.asarray(base[name], dtype=float)
+    value = costs.get(name, getattr(calculator, name)) if costs else getattr(calculator, name)
+    return np.broadcast_to(np.asarray(value, dtype=float), (n,))
+
+def _evaluate_perturbed(base, costs, parameters, factors):
+    """LCOA with each parameter scaled by each factor, as one stacked batch.
+
+    Returns an array of shape (len(parameters), len(factors), n).
+    """
+    n = len(next(iter(base.values())))
+    blocks = len(parameters) * len(factors)
+    columns = {name: np.tile(value, blocks) for name, value in base.items()}
+    stacked_costs = {name: np.tile(_base_value(base, costs, name, n), blocks) for name in calculator.COST_CONSTANTS}
+    columns.update({name: columns[name].astype(float) for name in parameters if name in columns})
+
+    for p, name in enumerate(parameters):
+        for f, factor in enumerate(factors):
+            rows = slice((p * len(factors) + f) * n, (p * len(factors) + f + 1) * n)
+            target = columns if name in base else stacked_costs
+            value = _base_value(base, costs, name, n) * factor
+            if name in ('solar_cf', 'wind_cf', 'solar_wind_ratio'):
+                value = np.clip(value, 0, 1)
+            target[name][rows] = value
+
+    lcoa = calculator.evaluate_batch(columns, costs=stacked_costs)['lcoa_final']
+    return lcoa.reshape(len(parameters), len(factors), n)
+
+# --- Elasticities ---
+def elasticities(scenarios=None, costs=None, **columns):
+    """Elasticity (dLCOA/dx * x/LCOA) of the LCOA to every input and cost constant.
+
+    Accepts scenarios the same way as calculator.evaluate_batch and evaluates
+    all base cases together. Returns a dict of arrays keyed by parameter name.
+    """
+    base = _base_columns(scenarios, columns)
+    n = len(next(iter(base.values())))
+    r = calculator.evaluate_batch(base, costs=costs)
+    constant = {name: _base_value(base, costs, name, n) for name in calculator.COST_CONSTANTS}
+
+    crf = r['crf']
+    rate = np.asarray(base['discount_rate'], dtype=float)
+    lifetime = np.asarray(base['plant_lifetime'], dtype=float)
+    growth = (1 + rate) ** lifetime
+    dcrf_drate = (growth * (growth - 1) - rate * lifetime * growth / (1 + rate)) / (growth - 1) ** 2
+    dcrf_dlifetime = -rate * growth * np.log1p(rate) / (growth - 1) ** 2
+
+    replacement = r['electrolyzer_replacement_pv']
+    years = calculator.REPLACEMENT_YEAR
+    inflation = constant['INFLATION_RATE']
+    ess_opex_rate = np.where(r['ess'], constant['ESS_OPEX_RATE'], 0.0)
+
+    # Each entry is x * dAnnualCost/dx; dividing by annual cost gives the elasticity.
+    scaled = {
+        'ELECTROLYZER_CAPEX_PER_KW': (r['electrolyzer_capex'] + replacement) * crf
+                                     + r['electrolyzer_capex'] * constant['ELECTROLYZER_OPEX_RATE'],
+        'SOLAR_CAPEX_PER_KW': r['solar_capex'] * (crf + constant['RE_OPEX_RATE']),
+        'WIND_CAPEX_PER_KW': r['wind_capex'] * (crf + constant['RE_OPEX_RATE']),
+        'HB_CAPEX_PER_KW_ELECTROLYZER': r['haber_bosch_capex'] * (crf + constant['HB_OPEX_RATE']),
+        'STORAGE_CAPEX_PER_TONNE': r['storage_capex'] * (crf + constant['STORAGE_OPEX_RATE']),
+        'ELECTROLYZER_OPEX_RATE': r['electrolyzer_capex'] * constant['ELECTROLYZER_OPEX_RATE'],
+        'RE_OPEX_RATE': (r['solar_capex'] + r['wind_capex']) * constant['RE_OPEX_RATE'],
+        'HB_OPEX_RATE': r['haber_bosch_capex'] * constant['HB_OPEX_RATE'],
+        'STORAGE_OPEX_RATE': r['storage_capex'] * constant['STORAGE_OPEX_RATE'],
+        'ESS_OPEX_RATE': r['ess_capex'] * ess_opex_rate,
+        'INFLATION_RATE': crf * replacement * years * inflation / (1 + inflation),
+        'ess_capex_per_kwh': r['ess_capex'] * (crf + ess_opex_rate),
+        'grid_purchase_price': r['variable_opex (grid_cost)'],
+        'discount_rate': rate * (r['total_capex'] * dcrf_drate - crf * replacement * years / (1 + rate)),
+        'plant_lifetime': lifetime * r['total_capex'] * dcrf_dlifetime,
+    }
+    annual_cost = r['lcoa_final'] * np.asarray(base['target_ammonia_tonne'], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = {name: np.where(annual_cost != 0, value / annual_cost, np.nan) for name, value in scaled.items()}
+
+        # Central differences for the sizing inputs, all in one batch.
+        lcoa = _evaluate_perturbed(base, costs, NUMERIC_PARAMETERS, (1 - RELATIVE_STEP, 1 + RELATIVE_STEP))
+        for p, name in enumerate(NUMERIC_PARAMETERS):
+            result[name] = np.where(r['lcoa_final'] != 0,
+                                    (lcoa[p, 1] - lcoa[p, 0]) / (2 * RELATIVE_STEP * r['lcoa_final']), np.nan)
+    return result
+
+# --- Tornado and Variance Decomposition ---
+def tornado(scenarios=None, costs=None, swing=0.2, parameters=PARAMETERS, **columns):
+    """LCOA with each parameter moved to (1 - swing) and (1 + swing) times its base value.
+
+    All perturbations of all base cases run in one batch. Returns a dict with
+    the `base` LCOA, `low`/`high` arrays of shape (len(parameters), n), and
+    `parameters` ordered from the largest mean swing to the smallest.
+    """
+    base = _base_columns(scenarios, columns)
+    lcoa = _evaluate_perturbed(base, costs, parameters, (1 - swing, 1 + swing))
+    order = np.argsort(-np.abs(lcoa[:, 1] - lcoa[:, 0]).mean(axis=1))
+    return {
+        "base": calculator.evaluate_batch(base, costs=costs)['lcoa_final'],
+        "parameters": [parameters[i] for i in order],
+        "low": lcoa[order, 0],
+        "high": lcoa[order, 1],
+    }
+
+def variance_shares(scenarios=None, costs=None, relative_std=0.1, **columns):
+    """First-order (linearized) Sobol-style shares of LCOA variance per parameter.
+
+    Each parameter is treated as independent with a standard deviation of
+    `relative_std` times its base value (a float, or a dict per parameter).
+    Returns a dict of arrays that sum to 1 for every base case.
+    """
+    result = elasticities(scenarios, costs, **columns)
+    if not isinstance(relative_std, dict):
+        relative_std = {name: relative_std for name in result}
+    contributions = {name: np.nan_to_num(value * relative_std.get(name, 0.0)) ** 2 for name, value in result.items()}
+    total = sum(contributions.values())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {name: np.where(total > 0, value / total, 0.0) for name, value in contributions.items()}
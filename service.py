@@ -0,0 +1,295 @@
+"""Local HTTP/JSON service for LCOA scenario evaluation.
+
+Usage:
+    python service.py --port 8750 --window-ms 2 --max-batch 1024
+
+Endpoints:
+    POST /evaluate   {"scenarios": [{"target_ammonia_tonne": 180000, "strategy": "ESS Balancing"}, ...]}
+                     (or a single scenario object); fields are those of config_loader.Scenario.
+                     Returns {"results": [{"name": ..., "lcoa_final": ..., ...}, ...]}.
+    GET  /metrics    Latency, throughput, batching and cache statistics.
+    GET  /health
+
+Scenarios that arrive within `window_ms` of each other are evaluated together
+in one calculator.evaluate_batch call, off the event loop. At most
+`queue_size` scenarios wait for evaluation; beyond that requests get 503
+with a Retry-After header, and a request with more new scenarios than
+`queue_size` gets 413 since it could never fit. Results are cached by scenario inputs. Only the
+standard library and NumPy are needed; see loadgen.py for a load generator.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import calculator
+import cache
+import config_loader
+from montecarlo import StreamingStats
+from results import RESULT_SCHEMA
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8750
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 1024
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_CACHE_SIZE = 100_000
+MAX_BODY_BYTES = 1 << 20
+LATENCY_FLUSH = 1024
+RESULT_COLUMNS = tuple(RESULT_SCHEMA)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+def evaluate_scenarios(scenarios):
+    """Evaluates Scenario objects in one batch; returns one result dict per scenario."""
+    results = calculator.evaluate_batch(config_loader.to_columns(scenarios))
+    columns = {name: results[name].tolist() for name in RESULT_COLUMNS}
+    return [{name: values[i] for name, values in columns.items()} for i in range(len(scenarios))]
+
+def _cache_key(scenario):
+    values = scenario.as_dict()
+    del values['name']
+    return cache.normalize_key(values)
+
+class Overloaded(Exception):
+    """Raised when the evaluation queue has no room for a request."""
+
+class RequestTooLarge(Exception):
+    """Raised when a request has more new scenarios than the whole queue holds."""
+
+def _milliseconds(summary):
+    return {key: value * 1e3 if math.isfinite(value) else None for key, value in summary.items() if key != 'count'}
+
+class ServiceMetrics:
+    """Request, batching and latency counters of a running service."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.scenarios = 0
+        self.batches = 0
+        self.batched_scenarios = 0
+        self.largest_batch = 0
+        self.latency = StreamingStats((0.0, 1.0), bins=10_000)  # seconds
+        self.batch_seconds = StreamingStats((0.0, 1.0), bins=10_000)
+        self._latencies = []
+
+    def record_latency(self, seconds):
+        """Buffers a request latency; the histogram is updated in bulk, off the per-request path."""
+        self._latencies.append(seconds)
+        if len(self._latencies) >= LATENCY_FLUSH:
+            self._flush()
+
+    def _flush(self):
+        if self._latencies:
+            self.latency.update(self._latencies)
+            self._latencies = []
+
+    def summary(self, results_cache, queued):
+        self._flush()
+        uptime = time.perf_counter() - self.started
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "scenarios": self.scenarios,
+            "throughput_scenarios_per_s": self.scenarios / uptime if uptime else 0.0,
+            "latency_ms": _milliseconds(self.latency.summary((50, 95, 99))),
+            "batches": self.batches,
+            "mean_batch_size": self.batched_scenarios / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "batch_ms": _milliseconds(self.batch_seconds.summary((50, 99))),
+            "queued": queued,
+            "cache": results_cache.stats(),
+        }
+
+class EvaluationService:
+    """Micro-batching evaluator behind the HTTP front end."""
+
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, queue_size=DEFAULT_QUEUE_SIZE,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        self.window = window_ms / 1e3
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.results = cache.LRUCache(cache_size)
+        self.metrics = ServiceMetrics()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self):
+        self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def evaluate(self, scenarios):
+        """Results for a list of Scenario objects, from the cache or the next batch."""
+        loop = asyncio.get_running_loop()
+        keys = [_cache_key(scenario) for scenario in scenarios]
+        futures = [None] * len(scenarios)
+        new = []
+        for i, (scenario, key) in enumerate(zip(scenarios, keys)):
+            cached = self.results.get(key)
+            if cached is not None:
+                futures[i] = loop.create_future()
+                futures[i].set_result(cached)
+            elif key in self._pending:
+                futures[i] = self._pending[key]
+            else:
+                new.append((i, scenario, key))
+
+        distinct = len({key for _, _, key in new})
+        if distinct > self.queue.maxsize:
+            raise RequestTooLarge(f"{distinct} new scenarios; send at most {self.queue.maxsize} per request")
+        if distinct > self.queue.maxsize - self.queue.qsize():
+            raise Overloaded(f"{self.queue.qsize()} scenarios queued")
+        for i, scenario, key in new:
+            if key in self._pending:  # repeated within this request
+                futures[i] = self._pending[key]
+                continue
+            futures[i] = self._pending[key] = loop.create_future()
+            self.queue.put_nowait((scenario, key, futures[i]))
+        # Shielded: a client that disconnects must not cancel results other requests share.
+        results = await asyncio.gather(*(asyncio.shield(future) for future in futures))
+        return [dict(result, name=scenario.name) for scenario, result in zip(scenarios, results)]
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            if self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window)
+            while len(items) < self.max_batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, evaluate_scenarios,
+                                                     [scenario for scenario, _, _ in items])
+            except Exception as e:
+                for _, key, future in items:
+                    self._pending.pop(key, None)
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.batch_seconds.update([time.perf_counter() - started])
+            self.metrics.batches += 1
+            self.metrics.batched_scenarios += len(items)
+            self.metrics.largest_batch = max(self.metrics.largest_batch, len(items))
+            for (_, key, future), result in zip(items, results):
+                self.results.put(key, result)
+                self._pending.pop(key, None)
+                if not future.done():
+                    future.set_result(result)
+
+    # --- HTTP ---
+    async def handle(self, method, path, body):
+        """Routes one request; returns (status, payload, extra headers)."""
+        if path == '/health':
+            return 200, {"status": "ok"}, {}
+        if path == '/metrics':
+            return 200, self.metrics.summary(self.results, self.queue.qsize()), {}
+        if path != '/evaluate':
+            return 404, {"error": f"Unknown path '{path}'"}, {}
+        if method != 'POST':
+            return 405, {"error": "Use POST for /evaluate"}, {'Allow': 'POST'}
+
+        started = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            payload = json.loads(body or b'{}')
+            records = payload['scenarios'] if isinstance(payload, dict) and 'scenarios' in payload else [payload]
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                raise config_loader.ConfigError("'scenarios' must be a list of objects")
+            scenarios = [config_loader.Scenario(**record) for record in records]
+            results = await self.evaluate(scenarios)
+        except (ValueError, TypeError) as e:  # includes ConfigError and JSON errors
+            self.metrics.errors += 1
+            return 400, {"error": str(e)}, {}
+        except RequestTooLarge as e:
+            self.metrics.rejected += 1
+            return 413, {"error": f"Request too large: {e}"}, {}
+        except Overloaded as e:
+            self.metrics.rejected += 1
+            return 503, {"error": f"Service overloaded: {e}"}, {'Retry-After': '1'}
+        except Exception as e:
+            self.metrics.errors += 1
+            return 500, {"error": f"Evaluation failed: {e}"}, {}
+        self.metrics.scenarios += len(results)
+        self.metrics.record_latency(time.perf_counter() - started)
+        return 200, {"results": results}, {}
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive; one request at a time per connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload, extra = 413, {"error": f"Body larger than {MAX_BODY_BYTES} bytes"}, {}
+                    headers['connection'] = 'close'
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload, extra = await self.handle(method, target.split('?', 1)[0], body)
+
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                        f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None, **options):
+    """Runs the service until cancelled. `ready`, if given, is an asyncio.Event set once listening."""
+    service = EvaluationService(**options)
+    service.start()
+    server = await asyncio.start_server(service.serve_connection, host, port, backlog=1024)
+    print(f"Serving LCOA evaluation on http://{host}:{port}", flush=True)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve LCOA evaluations over HTTP/JSON on localhost.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS, help="Batching window")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help="Max scenarios waiting")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, window_ms=args.window_ms, max_batch=args.max_batch,
+                          queue_size=args.queue_size, cache_size=args.cache_size))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import calculator
+
+DEFAULT_PATH = 'surrogate_tables'
+
+# --- Grid Definition ---
+# Axis order of every stored table. The first axis is the slicing axis: each of
+# its values is stored (and rebuilt) as a separate .npy file. The slider domain
+# of app.py is covered; LCOA is linear in target, grid price and ESS CAPEX, so
+# two points on those axes are exact. Only discount-rate slices rebuild
+# incrementally: changing any inner axis or model constant changes every
+# slice's fingerprint, so every slice is rebuilt.
+AXES = ('discount_rate', 'plant_lifetime', 'solar_cf', 'wind_cf', 'solar_wind_ratio',
+        'target_ammonia_tonne', 'price')
+PRICE_COLUMNS = {'Grid Balancing': 'grid_purchase_price', 'ESS Balancing': 'ess_capex_per_kwh'}
+
+DEFAULT_GRID = {
+    'discount_rate': np.linspace(0.01, 0.15, 15),
+    'plant_lifetime': np.linspace(10, 40, 16),
+    'solar_cf': np.linspace(0.10, 0.30, 11),
+    'wind_cf': np.linspace(0.20, 0.50, 13),
+    'solar_wind_ratio': np.linspace(0.0, 1.0, 11),
+    'target_ammonia_tonne': np.array([10_000.0, 10_000_000.0]),
+    'price': {'Grid Balancing': np.array([0.01, 0.5]), 'ESS Balancing': np.array([100.0, 1000.0])},
+}
+
+def _strategy_slug(strategy):
+    return strategy.lower().replace(' ', '_')
+
+def _axes_for(grid, strategy):
+    return [np.asarray(grid[name][strategy] if name == 'price' else grid[name], dtype=float) for name in AXES]
+
+def _model_constants():
+    names = calculator.COST_CONSTANTS + ('H2_KG_PER_TONNE_NH3', 'HOURS_PER_YEAR', 'GRID_SHARE', 'MIN_STORAGE_HOURS',
+                                         'MAX_STORAGE_HOURS', 'REPLACEMENT_YEAR', 'STORAGE_BUFFER_SHARE')
+    return {name: getattr(calculator, name) for name in names}
+
+def _slice_fingerprint(strategy, axes, index):
+    """Hash of everything that determines one stored slice."""
+    spec = {
+        'strategy': strategy,
+        'slice_value': float(axes[0][index]),
+        'axes': [axis.tolist() for axis in axes[1:]],
+        'constants': _model_constants(),
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+def _evaluate_slice(strategy, axes, index, dtype):
+    mesh = np.meshgrid(*axes[1:], indexing='ij')
+    columns = {name: values.ravel() for name, values in zip(AXES[1:], mesh)}
+    columns[PRICE_COLUMNS[strategy]] = columns.pop('price')
+    columns['discount_rate'] = axes[0][index]
+    lcoa = calculator.evaluate_batch(columns, strategy=strategy)['lcoa_final']
+    return lcoa.reshape(mesh[0].shape).astype(dtype)
+
+# --- Build Step ---
+def build_surrogate(path=DEFAULT_PATH, grid=None, strategies=calculator.STRATEGIES, dtype='float64',
+                    error_samples=2000, seed=0):
+    """Evaluates the cost model on the grid and writes one .npy file per slice.
+
+    Slices whose fingerprint (grid axes and model constants) is unchanged
+    are reused from disk; stale files are deleted. Since every fingerprint
+    covers all inner axes and the model constants, only adding or removing
+    discount rates is incremental. After the build, the interpolation error
+    is measured against the exact model at random points and stored with the
+    metadata; it is the largest error seen in that sample, not a bound.
+
+    Returns a dict with the number of slices built and reused.
+    """
+    grid = DEFAULT_GRID if grid is None else grid
+    os.makedirs(path, exist_ok=True)
+    meta = {'axes': AXES, 'dtype': dtype, 'tables': {}}
+    built = reused = 0
+    keep = {'meta.json'}
+
+    for strategy in strategies:
+        axes = _axes_for(grid, strategy)
+        files = []
+        for index in range(len(axes[0])):
+            filename = f"{_strategy_slug(strategy)}-{_slice_fingerprint(strategy, axes, index)}-{dtype}.npy"
+            if os.path.exists(os.path.join(path, filename)):
+                reused += 1
+            else:
+                table = _evaluate_slice(strategy, axes, index, dtype)
+                tmp = os.path.join(path, filename + '.tmp')
+                with open(tmp, 'wb') as f:
+                    np.save(f, table)
+                os.replace(tmp, os.path.join(path, filename))
+                built += 1
+            files.append(filename)
+        keep.update(files)
+        meta['tables'][strategy] = {'grid': [axis.tolist() for axis in axes], 'files': files}
+
+    for filename in os.listdir(path):
+        if filename not in keep and filename.endswith('.npy'):
+            os.remove(os.path.join(path, filename))
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    table = SurrogateTable(path)
+    meta['sampled_max_error'] = {strategy: table.measure_error(strategy, error_samples, seed) for strategy in strategies}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return {'built': built, 'reused': reused}
+
+# --- Runtime Lookup ---
+class SurrogateTable:
+    """Memory-mapped LCOA tables answered by multilinear interpolation.
+
+    Only meta.json is read at construction; slice files are memory-mapped on
+    first use, so a lookup pages in just the cells it touches.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._grids = {strategy: [np.asarray(axis) for axis in table['grid']]
+                       for strategy, table in self.meta['tables'].items()}
+        self._slices = {}
+
+    def _slice(self, strategy, index):
+        key = (strategy, index)
+        if key not in self._slices:
+            filename = self.meta['tables'][strategy]['files'][index]
+            self._slices[key] = np.load(os.path.join(self.path, filename), mmap_mode='r').reshape(-1)
+        return self._slices[key]
+
+    @property
+    def sampled_max_error(self):
+        """Interpolation error per strategy over build_surrogate's random sample; an estimate, not a bound."""
+        return self.meta.get('sampled_max_error', {})
+
+    def domain(self, strategy):
+        return {name: (float(axis[0]), float(axis[-1])) for name, axis in zip(AXES, self._grids[strategy])}
+
+    def lcoa(self, strategy, discount_rate, plant_lifetime, solar_cf, wind_cf, solar_wind_ratio,
+             target_ammonia_tonne=180000, price=None):
+        """Interpolated LCOA; `price` is the grid price or ESS CAPEX/kWh depending on the strategy.
+
+        Inputs are scalars or broadcastable arrays and are clipped to the grid domain.
+        """
+        grid = self._grids[strategy]
+        if price is None:
+            price = calculator.SCENARIO_DEFAULTS[PRICE_COLUMNS[strategy]]
+        values = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (
+            discount_rate, plant_lifetime, solar_cf, wind_cf, solar_wind_ratio, target_ammonia_tonne, price)))
+        shape = values[0].shape
+        values = [value.ravel() for value in values]
+
+        lower, weight = [], []
+        for axis, value in zip(grid, values):
+            value = np.clip(value, axis[0], axis[-1])
+            i = np.clip(np.searchsorted(axis, value, side='right') - 1, 0, len(axis) - 2)
+            lower.append(i)
+            weight.append((value - axis[i]) / (axis[i + 1] - axis[i]))
+
+        # Flat offsets and weights of the 2^(d-1) corners within a slice.
+        inner = grid[1:]
+        strides = np.cumprod([1] + [len(axis) for axis in inner[::-1]])[::-1][1:]
+        corners = np.array(np.meshgrid(*[[0, 1]] * len(inner), indexing='ij')).reshape(len(inner), -1).T
+        base = sum(lower[d + 1] * strides[d] for d in range(len(inner)))
+        offsets = base[:, None] + corners @ strides
+        corner_weight = np.ones((len(base), len(corners)))
+        for d in range(len(inner)):
+            w = weight[d + 1][:, None]
+            corner_weight *= np.where(corners[:, d], w, 1 - w)
+
+        result = np.empty(len(base))
+        for index in np.unique(lower[0]):
+            rows = np.flatnonzero(lower[0] == index)
+            below = (self._slice(strategy, index)[offsets[rows]] * corner_weight[rows]).sum(axis=1)
+            above = (self._slice(strategy, index + 1)[offsets[rows]] * corner_weight[rows]).sum(axis=1)
+            result[rows] = below + weight[0][rows] * (above - below)
+        return result.reshape(shape)
+
+    def measure_error(self, strategy, samples=2000, seed=0):
+        """Interpolation error against the exact cost model at random points in the domain (sample statistics)."""
+        rng = np.random.default_rng(seed)
+        domain = self.domain(strategy)
+        points = {name: rng.uniform(low, high, samples) for name, (low, high) in domain.items()}
+        approx = self.lcoa(strategy, **points)
+        points[PRICE_COLUMNS[strategy]] = points.pop('price')
+        exact = calculator.evaluate_batch(points, strategy=strategy)['lcoa_final']
+        error = np.abs(approx - exact)
+        relative = error / np.abs(exact)
+        return {
+            'max_abs': float(error.max()),
+            'p99_abs': float(np.percentile(error, 99)),
+            'max_rel': float(relative.max()),
+            'mean_rel': float(relative.mean()),
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the precomputed LCOA surrogate tables.")
+    parser.add_argument('--path', default=DEFAULT_PATH, help="Output directory for the .npy slices")
+    parser.add_argument('--dtype', default='float64', choices=('float32', 'float64'))
+    args = parser.parse_args()
+    summary = build_surrogate(args.path, dtype=args.dtype)
+    print(f"Built {summary['built']} slices, reused {summary['reused']}.")
+    print("Interpolation error over a random sample (not a bound):")
+    print(json.dumps(SurrogateTable(args.path).sampled_max_error, indent=1))
@@ -0,0 +1,63 @@
+import heapq
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logistics
+
+def _network(seed=3, nodes=14):
+    rng = np.random.default_rng(seed)
+    spec = [{'name': f"n{i}", 'kind': 'demand' if i % 5 == 0 else 'port',
+             'lat': float(rng.uniform(-30, 30)), 'lon': float(rng.uniform(100, 150))} for i in range(nodes)]
+    links = [{'from': f"n{i}", 'to': f"n{(i + 1) % nodes}", 'mode': 'ship'} for i in range(nodes)]
+    for _ in range(2 * nodes):
+        a, b = rng.choice(nodes, 2, replace=False)
+        links.append({'from': f"n{a}", 'to': f"n{b}", 'mode': str(rng.choice(list(logistics.TRANSPORT_MODES)))})
+    return logistics.Network(spec, links)
+
+def _dijkstra(network, lat, lon, volume):
+    """Cheapest delivered cost of one site over the network, searched directly at its volume."""
+    edges = {}
+    for a, b, mode, distance in network.links:
+        cost = float(logistics.transport_cost(mode, distance, volume))
+        for i, j in ((a, b), (b, a)):
+            edges.setdefault(i, {})
+            edges[i][j] = min(edges[i].get(j, np.inf), cost)
+    distance = logistics.haversine_km(lat, lon, network.lat, network.lon)
+    nearest = np.argsort(distance)[:logistics.ACCESS_NODES]
+    detour = logistics.TRANSPORT_MODES[logistics.ACCESS_MODE]['detour_factor']
+    queue = [(float(logistics.transport_cost(logistics.ACCESS_MODE, distance[i] * detour, volume)), int(i))
+             for i in nearest]
+    heapq.heapify(queue)
+    settled = {}
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if node in settled:
+            continue
+        settled[node] = cost
+        for neighbour, link_cost in edges.get(node, {}).items():
+            if neighbour not in settled:
+                heapq.heappush(queue, (cost + link_cost, neighbour))
+    return min(settled.get(int(d), np.inf) for d in network.demand)
+
+@pytest.mark.parametrize('volumes', ['grid', 'random'])
+def test_assign_matches_per_site_dijkstra(volumes):
+    network = _network()
+    rng = np.random.default_rng(7)
+    lat, lon = rng.uniform(-30, 30, 40), rng.uniform(100, 150, 40)
+    if volumes == 'grid':
+        volume = rng.choice(logistics.ROUTE_VOLUMES, 40)
+    else:
+        volume = rng.uniform(2e4, 5e7, 40)
+    assigned = network.assign(lat, lon, volume)['transport_cost_per_tonne']
+    expected = [_dijkstra(network, lat[i], lon[i], volume[i]) for i in range(40)]
+    np.testing.assert_allclose(assigned, expected, rtol=1e-9)
+
+def test_assign_without_demand_centers():
+    network = logistics.Network([{'name': 'a', 'lat': 0.0, 'lon': 0.0}], [])
+    with pytest.raises(ValueError, match="no demand centers"):
+        network.assign([1.0], [1.0])
@@ -0,0 +1,34 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator
+import main
+
+def test_csv_sweep_reads_quoted_header(tmp_path):
+    path = tmp_path / 'scenarios.csv'
+    path.write_text('"solar_cf","wind_cf","strategy"\n0.2,0.3,"Grid Balancing"\n0.25,0.35,"ESS Balancing"\n')
+    sweep = main.CsvSweep(str(path))
+    assert sweep.header == ['solar_cf', 'wind_cf', 'strategy']
+    (_, bounds), = sweep.chunks(10)
+    np.testing.assert_allclose(sweep.columns(bounds)['wind_cf'], [0.3, 0.35])
+
+def test_scenario_file_sweep_sends_only_its_chunk(tmp_path):
+    path = tmp_path / 'scenarios.yaml'
+    path.write_text('scenarios:\n' + ''.join(f"  - {{solar_cf: {0.1 + i / 1000}}}\n" for i in range(200)))
+    sweep = main.load_sweep(str(path))
+    source = sweep.chunk_source((0, 10))
+    assert len(pickle.dumps(source)) < len(pickle.dumps(sweep)) / 5
+    np.testing.assert_allclose(source.columns((0, 10))['solar_cf'], 0.1 + np.arange(10) / 1000)
+
+    output = tmp_path / 'results'
+    summary = main.run_sweep(sweep, str(output), chunk_size=64, workers=2, report=lambda message: None)
+    assert summary['scenarios'] == 200
+    frame = pd.concat(pd.read_csv(output / name) for name in sorted(os.listdir(output)) if name.startswith('part-'))
+    expected = calculator.evaluate_batch(sweep.columns((0, 200)))['lcoa_final']
+    np.testing.assert_allclose(frame['lcoa_final'], expected)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiles
+
+SITES = ('a', 'b', 'c', 'd')
+
+def _store(tmp_path):
+    """A store of four sites whose solar and wind CF are constant per site."""
+    hours = pd.date_range('2021-01-01', periods=48, freq='h')
+    frame = pd.DataFrame({
+        'site_id': np.repeat(SITES, len(hours)),
+        'timestamp': np.tile(hours.astype(str), len(SITES)),
+        'solar_cf': np.repeat([0.1, 0.2, 0.3, 0.4], len(hours)),
+        'wind_cf': np.repeat([0.5, 0.6, 0.7, 0.8], len(hours)),
+    })
+    csv_path = tmp_path / 'profiles.csv'
+    frame.to_csv(csv_path, index=False)
+    profiles.ingest_csv(str(csv_path), str(tmp_path / 'store'))
+    return profiles.ProfileStore(str(tmp_path / 'store'))
+
+def test_capacity_factors_follow_requested_site_order(tmp_path):
+    store = _store(tmp_path)
+    columns = store.capacity_factors(['a', 'c', 'b', 'd'], hours=48)
+    assert list(columns['site_id']) == ['a', 'c', 'b', 'd']
+    np.testing.assert_allclose(columns['solar_cf'], [0.1, 0.3, 0.2, 0.4], rtol=1e-6)
+    np.testing.assert_allclose(columns['wind_cf'], [0.5, 0.7, 0.6, 0.8], rtol=1e-6)
+
+def test_capacity_factors_with_repeated_sites(tmp_path):
+    store = _store(tmp_path)
+    columns = store.capacity_factors(['b', 'b', 'c'], hours=48)
+    np.testing.assert_allclose(columns['solar_cf'], [0.2, 0.2, 0.3], rtol=1e-6)